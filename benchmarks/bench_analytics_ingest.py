@@ -0,0 +1,82 @@
+"""
+Benchmark: request-side cost of analytics writes, inline vs queued.
+
+Replays register_request / save_query_terms / register_click calls as a
+request handler would, against AnalyticsData directly (inline) and through
+AnalyticsIngestQueue with each overflow policy. `--store-delay` adds a
+per-event delay to the store (a slow disk / contended database), applied
+in the background for the queued runs. Reports the caller-side p50 / p99 /
+max latency per call, events dropped and the time for the queue to drain.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_analytics_ingest --events 20000 --store-delay 0.0002 --queue-size 2000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from myapp.analytics.analytics_data import AnalyticsData
+from myapp.analytics.ingest import POLICIES, AnalyticsIngestQueue
+
+
+class SlowAnalytics(AnalyticsData):
+    """AnalyticsData whose writes take `delay` extra seconds each."""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def _append(self, table, row):
+        time.sleep(self.delay)
+        super()._append(table, row)
+
+    def register_query(self, *args, **kwargs):
+        time.sleep(self.delay)
+        super().register_query(*args, **kwargs)
+
+
+def _replay(sink, n: int, rate: float) -> np.ndarray:
+    """Per-call latency (s); calls are paced at `rate` per second (0 = as fast as possible)."""
+    lat = np.empty(n)
+    start = time.perf_counter()
+    for i in range(n):
+        if rate:
+            wait = start + i / rate - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        t0 = time.perf_counter()
+        kind = i % 3
+        if kind == 0:
+            sink.register_request("/search", "POST", "bench", "127.0.0.1", "s1")
+        elif kind == 1:
+            sink.save_query_terms("slim fit jeans", "127.0.0.1", "bench", "chrome", "s1")
+        else:
+            sink.register_click("PID0000001", i, 1, "slim fit jeans", "127.0.0.1", "bench", "s1")
+        lat[i] = time.perf_counter() - t0
+    return lat
+
+def _row(name: str, lat: np.ndarray, dropped: int, drain: float):
+    us = lat * 1e6
+    print(f"{name:<14}{np.percentile(us, 50):>9.1f}{np.percentile(us, 99):>10.1f}{us.max():>11.0f}"
+          f"{dropped:>10}{drain * 1e3:>11.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--store-delay", type=float, default=0.0002, help="extra seconds per event in the store")
+    parser.add_argument("--queue-size", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=0.0, help="calls per second (0 = back to back)")
+    args = parser.parse_args()
+
+    print(f"{args.events} calls, store +{args.store_delay * 1e6:.0f} us/event, queue {args.queue_size}")
+    print(f"\n{'mode':<14}{'p50 us':>9}{'p99 us':>10}{'max us':>11}{'dropped':>10}{'drain ms':>11}")
+    lat = _replay(SlowAnalytics(args.store_delay), args.events, args.rate)
+    _row("inline", lat, 0, 0.0)
+    for policy in POLICIES:
+        ingest = AnalyticsIngestQueue(SlowAnalytics(args.store_delay), maxsize=args.queue_size, policy=policy)
+        lat = _replay(ingest, args.events, args.rate)
+        t0 = time.perf_counter()
+        ingest.join()
+        _row(policy, lat, ingest.stats()["dropped"], time.perf_counter() - t0)
@@ -0,0 +1,81 @@
+"""
+Benchmark: analytics event logging cost, memory and dashboard latency.
+
+Registers a synthetic stream of requests / queries / clicks / dwell events
+into AnalyticsData backed by a SQLite file (batched background writes,
+bounded hot window) and reports the per-event `register_*` cost, RSS growth,
+the write batches, the dashboard helpers' latency at the end of the stream
+and how long re-opening the log (restart) takes.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_analytics_store --events 200000 --hot-window 10000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import psutil
+
+from myapp.analytics.analytics_data import AnalyticsData
+
+WORDS = ["jeans", "men", "blue", "shirt", "women", "kurta", "cotton", "slim", "black", "shoes",
+         "sleeve", "printed", "casual", "round", "neck", "regular", "fit", "white", "track", "pants"]
+
+
+def _rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 1e6
+
+def _register(data: AnalyticsData, n: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(n):
+        r = rng.random()
+        sid = f"s{rng.randrange(2000)}"
+        if r < 0.4:
+            data.register_request(rng.choice(["/", "/search", "/doc_details", "/dashboard"]), "GET", "ua", "127.0.0.1", sid)
+        elif r < 0.7:
+            q = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+            data.register_query(q, i, "127.0.0.1", "ua", "chrome", sid)
+        elif r < 0.9:
+            data.register_click(f"PID{rng.randrange(5000):07d}", i, rng.randint(1, 20), "q", "127.0.0.1", "ua", sid)
+        else:
+            data.register_dwell(f"PID{rng.randrange(5000):07d}", i, rng.random() * 30)
+
+def _time_ms(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--hot-window", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "analytics.db"
+        data = AnalyticsData(path, hot_window=args.hot_window, batch_size=args.batch_size)
+        rss0 = _rss_mb()
+        t0 = time.perf_counter()
+        _register(data, args.events, args.seed)
+        reg_s = time.perf_counter() - t0
+        data.store.flush()
+        total_s = time.perf_counter() - t0
+        print(f"{args.events} events: register {reg_s / args.events * 1e6:.2f} us/event, "
+              f"{args.events / total_s:,.0f} events/s including the final flush")
+        print(f"RSS +{_rss_mb() - rss0:.1f} MB, hot window {len(data.queries)} queries, "
+              f"{data.store.batches} write batches, db {path.stat().st_size / 1e6:.1f} MB")
+
+        for name in ["summary_stats", "funnel_metrics", "intent_clusters", "session_paths"]:
+            print(f"{name:<16}{_time_ms(getattr(data, name)):>10.1f} ms")
+        data.store.close()
+
+        t0 = time.perf_counter()
+        reopened = AnalyticsData(path, hot_window=args.hot_window)
+        print(f"restart: log reopened in {(time.perf_counter() - t0) * 1e3:.1f} ms, "
+              f"{reopened.summary_stats()['total_searches']} searches recovered")
+        reopened.store.close()
@@ -0,0 +1,75 @@
+"""
+Benchmark: replaying a query log one query at a time vs `search_batch`.
+
+The log is a Zipf-like stream over the labelled queries and corpus title
+prefixes (with repeats, like a real log). For every method / AND-OR mode it
+times `rank_documents` per query against one `rank_documents_batch` call,
+checks the batch returns the same ids and scores, and optionally times the
+process-parallel batch.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_batch --queries 5000 --workers 2
+"""
+import argparse
+import csv
+import json
+import random
+import time
+
+import numpy as np
+
+from myapp.search import algorithms
+from myapp.search.index_snapshot import DATA_DIR, ENRICHED_PATH
+
+LABELS_PATH = DATA_DIR / "annotations" / "queries_label_template.csv"
+
+
+def query_log(n: int, seed: int = 0):
+    with open(ENRICHED_PATH, "r", encoding="utf-8") as f:
+        docs = json.load(f)
+    labelled = []
+    if LABELS_PATH.exists():
+        with open(LABELS_PATH, newline="", encoding="utf-8") as f:
+            labelled = sorted({row["query_text"] for row in csv.DictReader(f)})
+    rng = random.Random(seed)
+    pool = labelled + [" ".join(str(d.get("title") or "").split()[:rng.randint(1, 4)]) for d in docs]
+    pool = [q for q in pool if q.strip()]
+    rng.shuffle(pool)
+    return rng.choices(pool, [1.0 / (i + 1) for i in range(len(pool))], k=n)
+
+def _same(a, b) -> bool:
+    return np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=0, help="also time the batch on this many processes")
+    args = parser.parse_args()
+
+    raw = query_log(args.queries)
+    t0 = time.perf_counter()
+    analyzed = [algorithms.analyze_query(q) for q in raw]
+    print(f"{algorithms.index_view().n_docs} docs, {len(raw)} queries ({len(set(raw))} distinct), "
+          f"analyzed in {time.perf_counter() - t0:.2f}s")
+    print(f"{'method':<8}{'mode':<5}{'single s':>10}{'batch s':>9}{'speedup':>9}"
+          + (f"{'workers s':>11}" if args.workers > 1 else "") + "  equal")
+    for method in ["bm25", "tfidf", "custom"]:
+        for use_and in [True, False]:
+            t0 = time.perf_counter()
+            ref = [algorithms.rank_documents(p, n, method=method, k=args.k, use_and=use_and) for p, n in analyzed]
+            t_single = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            got = algorithms.rank_documents_batch(analyzed, method=method, k=args.k, use_and=use_and)
+            t_batch = time.perf_counter() - t0
+            line = (f"{method:<8}{'AND' if use_and else 'OR':<5}{t_single:>10.2f}{t_batch:>9.2f}"
+                    f"{t_single / max(t_batch, 1e-9):>8.1f}x")
+            equal = all(_same(a, b) for a, b in zip(ref, got))
+            if args.workers > 1:
+                t0 = time.perf_counter()
+                par = algorithms.rank_documents_batch(analyzed, method=method, k=args.k, use_and=use_and,
+                                                      workers=args.workers)
+                line += f"{time.perf_counter() - t0:>11.2f}"
+                equal = equal and all(_same(a, b) for a, b in zip(ref, par))
+            print(f"{line}  {equal}")
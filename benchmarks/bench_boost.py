@@ -0,0 +1,61 @@
+"""
+Benchmark: "custom" ranker boost, per-candidate Python function vs the
+precomputed boost array, plus the cost of changing boost weights.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_boost --sizes 100 1000 10000
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from myapp.search.boost import NumericBoost
+from myapp.search.index_snapshot import SNAPSHOT_PATH, IndexSnapshot, load_or_build_snapshot
+
+
+def reference_boost(snap: IndexSnapshot, did: int) -> float:
+    """The per-doc function the array replaces."""
+    rating = float(snap.rating[did])
+    discount = float(snap.discount[did])
+    price = float(snap.price[did])
+    rating_norm = max(0.0, min(rating / 5.0, 1.0))
+    discount_norm = max(0.0, min(discount / 80.0, 1.0))
+    price_norm = 0.5 if price <= 0 else 1.0 - min(price, 4000.0) / 4000.0
+    stock_factor = 1.0 if not bool(snap.out_of_stock[did]) else 0.2
+    return (1.0 + 0.5 * rating_norm + 0.4 * discount_norm + 0.3 * price_norm) * stock_factor
+
+def _ms(fn, repeat=20):
+    ts = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        ts.append(time.perf_counter() - t0)
+    return statistics.median(ts) * 1e3, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    snap = load_or_build_snapshot(SNAPSHOT_PATH)
+    boost = NumericBoost.from_snapshot(snap)
+    rng = np.random.default_rng(0)
+    print(f"{snap.n_docs} docs")
+    print(f"{'cands':>8}{'loop ms':>10}{'array ms':>10}{'speedup':>9}  equal")
+    for n in args.sizes:
+        ids = np.sort(rng.choice(snap.n_docs, size=min(n, snap.n_docs), replace=False))
+        scores = rng.random(len(ids))
+        t_loop, ref = _ms(lambda: scores * np.array([reference_boost(snap, d) for d in ids.tolist()]))
+        t_vec, out = _ms(lambda: boost.apply(ids, scores))
+        print(f"{len(ids):>8}{t_loop:>10.3f}{t_vec:>10.4f}{t_loop / max(t_vec, 1e-9):>8.0f}x  {np.array_equal(ref, out)}")
+
+    t_full, _ = _ms(lambda: NumericBoost(snap.rating, snap.discount, snap.price, snap.out_of_stock).values)
+    flip = iter([0.6, 0.5] * 20)
+    t_weight, _ = _ms(lambda: boost.set_weights(rating=next(flip)))
+    flip = iter([3000.0, 4000.0] * 20)
+    t_scale, _ = _ms(lambda: boost.set_weights(price_cap=next(flip)))
+    print(f"\nfull recompute {t_full:.3f} ms | weight change {t_weight:.3f} ms | "
+          f"price_cap change (re-normalizes price only) {t_scale:.3f} ms")
@@ -0,0 +1,57 @@
+"""
+Benchmark: candidate generation backends (sorted-list merge vs packed bitmaps)
+for AND, OR and NOT (exclusion) across query lengths. Both backends must
+return identical doc id sets.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_candidates --lengths 1 2 3 4 6 --queries 200
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.bench_scoring import sample_queries
+from myapp.search.index_snapshot import SNAPSHOT_PATH, load_or_build_snapshot
+from myapp.search.postings import CANDIDATE_BACKENDS
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1, 2, 3, 4, 6])
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    snap = load_or_build_snapshot(SNAPSHOT_PATH)
+    backends = {name: cls(snap) for name, cls in CANDIDATE_BACKENDS.items()}
+    print(f"{snap.n_docs} docs, {len(snap.bitmap_terms)} of {snap.n_terms} terms with bitmaps "
+          f"({snap.bitmaps.nbytes / 1e6:.1f} MB)")
+    header = "".join(f"{name + ' ms':>12}" for name in backends)
+    print(f"{'op':<5}{'len':>4}{header}  equal")
+
+    for op in ["and", "or", "not"]:
+        for length in args.lengths:
+            times = {name: [] for name in backends}
+            equal = True
+            for q in sample_queries(snap, length + (op == "not"), args.queries):
+                outs = []
+                for name, be in backends.items():
+                    if op == "and":
+                        out, dt = _timed(be.and_, q)
+                    elif op == "or":
+                        out, dt = _timed(be.or_, q)
+                    else:
+                        # first `length` terms OR-ed, minus docs with the last term
+                        out, dt = _timed(lambda: be.exclude(be.or_(q[:-1]), q[-1:]))
+                    times[name].append(dt)
+                    outs.append(out)
+                equal &= all(np.array_equal(outs[0], o) for o in outs[1:])
+            cols = "".join(f"{statistics.median(t) * 1e3:>12.3f}" for t in times.values())
+            print(f"{op:<5}{length:>4}{cols}  {equal}")
@@ -0,0 +1,77 @@
+"""
+Benchmark: corpus loading at web-app start-up, wall time and peak RSS.
+
+Each scenario runs in a fresh interpreter (peak RSS is per process):
+  - pandas:         pd.read_json + iterrows + Document(**row) (the old loader)
+  - stream:         load_corpus (incremental JSON parse, batched validation)
+  - rebuild-twice:  snapshot rebuild + load_corpus, each parsing the catalog
+  - rebuild-shared: snapshot rebuild with share_records=True + load_corpus,
+                    which reuses the parsed records (one parse total)
+
+Usage (from the repo root):
+    python -m benchmarks.bench_corpus_load [--path data/fashion_products_dataset_enriched.json]
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from myapp.search.index_snapshot import ENRICHED_PATH, INVERTED_PATH, DOCMAP_PATH
+
+SCENARIOS = ["pandas", "stream", "rebuild-twice", "rebuild-shared"]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _child(scenario: str, path: Path, inverted: Path, docmap: Path):
+    import pandas as pd
+    from myapp.search.objects import Document
+    from myapp.search.load_corpus import load_corpus
+    from myapp.search.index_snapshot import build_snapshot
+
+    base = _peak_rss_mb()
+    t0 = time.perf_counter()
+    if scenario == "pandas":
+        corpus = {}
+        for _, row in pd.read_json(path).iterrows():
+            doc = Document(**row.to_dict())
+            corpus[doc.pid] = doc
+    elif scenario == "stream":
+        corpus = load_corpus(path)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            build_snapshot(Path(tmp) / "snap.bin", path, inverted, docmap,
+                           share_records=scenario == "rebuild-shared")
+        corpus = load_corpus(path)
+    dt = time.perf_counter() - t0
+    print(json.dumps({"seconds": dt, "peak_mb": _peak_rss_mb(), "base_mb": base, "docs": len(corpus)}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", type=Path, default=ENRICHED_PATH)
+    parser.add_argument("--inverted", type=Path, default=INVERTED_PATH)
+    parser.add_argument("--docmap", type=Path, default=DOCMAP_PATH)
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.path, args.inverted, args.docmap)
+        raise SystemExit(0)
+
+    print(f"{args.path} ({args.path.stat().st_size / 1e6:.1f} MB)")
+    print(f"{'scenario':<16}{'docs':>8}{'wall s':>9}{'peak RSS MB':>13}{'+ over imports':>16}")
+    for scenario in SCENARIOS:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_corpus_load", "--child", scenario,
+             "--path", str(args.path), "--inverted", str(args.inverted), "--docmap", str(args.docmap)],
+            check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        print(f"{scenario:<16}{r['docs']:>8}{r['seconds']:>9.2f}{r['peak_mb']:>13.0f}{r['peak_mb'] - r['base_mb']:>16.0f}")
@@ -0,0 +1,73 @@
+"""
+Benchmark: faceted search, filters applied before scoring vs after.
+
+Ranks a seeded Zipf query stream (AND and OR semantics, bm25 and tfidf)
+unfiltered, with facet filters intersected with the text candidates
+before scoring (`rank_documents(filters=...)`), and with the same filters
+applied to the full ranking afterwards (the alternative: score every
+match, then drop). Also times `rank_with_facets`, which adds the facet
+counts of every match. Checks that the pre- and post-filtered top k are
+the same.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_facets --queries 2000 --k 20
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.harness.queries import title_vocabulary, zipf_queries
+from myapp.search import algorithms
+from myapp.search.facets import FacetFilters, filter_mask
+from myapp.search.scoring import top_k
+
+FILTERS = {
+    "brand=Nike,HRX": FacetFilters(brand=["Nike", "HRX"]),
+    "category=Footwear, in stock": FacetFilters(category=["Footwear"], in_stock=True),
+    "price 500-2000, rating >= 4": FacetFilters(price_min=500, price_max=2000, min_rating=4),
+}
+
+
+def _post_filtered(q, neg, method, k, use_and, view, filters):
+    ids, scores = algorithms.rank_documents(q, neg, method=method, k=view.n_docs, use_and=use_and, view=view)
+    keep = filter_mask(view.segments[0].snapshot, ids, filters)
+    return top_k(ids[keep], scores[keep], k)
+
+def _time(fn, analyzed) -> np.ndarray:
+    lat = np.empty(len(analyzed))
+    for i, (q, neg) in enumerate(analyzed):
+        t0 = time.perf_counter()
+        fn(q, neg)
+        lat[i] = time.perf_counter() - t0
+    return lat * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    view = algorithms.index_view()
+    analyzed = [algorithms.analyze_query(q) for q in zipf_queries(title_vocabulary(), args.queries, seed=args.seed)]
+    k = args.k
+    print(f"{view.n_docs} docs, {len(analyzed)} queries, k={k}; mean ms per query\n")
+    print(f"{'':<44}{'none':>8}{'before':>8}{'after':>8}{'+counts':>9}{'same':>7}")
+    for method in ("bm25", "tfidf"):
+        for use_and in (True, False):
+            rank = lambda q, neg, **kw: algorithms.rank_documents(q, neg, method=method, k=k, use_and=use_and,
+                                                                  view=view, **kw)
+            base = _time(rank, analyzed).mean()
+            for name, filters in FILTERS.items():
+                before = _time(lambda q, neg: rank(q, neg, filters=filters), analyzed).mean()
+                after = _time(lambda q, neg: _post_filtered(q, neg, method, k, use_and, view, filters), analyzed).mean()
+                counts = _time(lambda q, neg: algorithms.rank_with_facets(
+                    q, neg, method=method, k=k, use_and=use_and, view=view, filters=filters), analyzed).mean()
+                same = sum(np.allclose(rank(q, neg, filters=filters)[1],
+                                       _post_filtered(q, neg, method, k, use_and, view, filters)[1])
+                           for q, neg in analyzed)
+                mode = "AND" if use_and else "OR"
+                print(f"{method + ' ' + mode + ', ' + name:<44}{base:>8.3f}{before:>8.3f}{after:>8.3f}{counts:>9.3f}"
+                      f"{same * 100 // len(analyzed):>6}%")
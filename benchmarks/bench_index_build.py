@@ -0,0 +1,40 @@
+"""
+Benchmark: parallel index build scaling (map + reduce, no JSON writes).
+
+Runs `index_builder.build_index` on the raw catalog with an increasing number
+of worker processes, checks every run produces the same enriched records and
+inverted index as the single-process build, and reports wall time, speedup
+and parallel efficiency. `--repeat` concatenates the catalog with itself to
+get a larger build.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_index_build --workers 1 2 4 8 --repeat 4
+"""
+import argparse
+import os
+import time
+
+from myapp.search.index_builder import RAW_PATH, SHARD_SIZE, build_index, read_catalog
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--input", default=RAW_PATH)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    args = parser.parse_args()
+
+    records = read_catalog(args.input) * args.repeat
+    print(f"{len(records)} records, shard size {args.shard_size}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'build s':>9}{'speedup':>9}{'efficiency':>12}  equal")
+
+    ref, t_ref = None, None
+    for w in args.workers:
+        t0 = time.perf_counter()
+        out = build_index(records, workers=w, shard_size=args.shard_size)
+        dt = time.perf_counter() - t0
+        if ref is None:
+            ref, t_ref = out, dt
+        speedup = t_ref / dt
+        print(f"{w:>8}{dt:>9.2f}{speedup:>8.2f}x{100 * speedup / w * args.workers[0]:>11.0f}%  {out == ref}")
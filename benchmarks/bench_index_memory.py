@@ -0,0 +1,113 @@
+"""
+Per-worker memory of the search index: legacy dict-of-dicts layout vs the
+binary snapshot read into private memory vs the shared memory-mapped snapshot.
+
+Each run starts N worker processes that load the index the given way, touch
+every array/table (as serving queries eventually would) and then report
+RSS / USS / PSS while all workers are alive. USS is memory private to a
+worker; PSS splits shared pages between the processes mapping them, so the
+sum of PSS is the real host footprint.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_index_memory --workers 1 2 4 8
+"""
+import argparse
+import json
+import math
+import multiprocessing as mp
+from collections import Counter
+from typing import Dict, Any, List
+
+import psutil
+
+from myapp.search.index_snapshot import (
+    ENRICHED_PATH, INVERTED_PATH, DOCMAP_PATH, SNAPSHOT_PATH, INDEXED_TEXT_FIELDS,
+    _doc_tokens, load_or_build_snapshot, load_snapshot
+)
+
+MODES = ["legacy", "snapshot", "mmap"]
+
+
+def _legacy_layout() -> Dict[str, Any]:
+    """The tables algorithms.py used to build at import time."""
+    docs_raw = json.loads(ENRICHED_PATH.read_text(encoding="utf-8"))
+    inverted_index = json.loads(INVERTED_PATH.read_text(encoding="utf-8"))
+    docid_to_pid = json.loads(DOCMAP_PATH.read_text(encoding="utf-8"))["docid_to_pid"]
+    n_docs = len(docs_raw)
+
+    term_df = {t: len(pl) for t, pl in inverted_index.items()}
+    doc_tf, doc_len = {}, {}
+    for did, rec in enumerate(docs_raw):
+        tf = Counter(_doc_tokens(rec, INDEXED_TEXT_FIELDS))
+        doc_tf[did] = dict(tf)
+        doc_len[did] = sum(tf.values())
+
+    idf_tfidf = {t: math.log2(n_docs / df) if df > 0 else 0.0 for t, df in term_df.items()}
+    tfidf_weights, doc_norms = {}, {}
+    for did, tf_map in doc_tf.items():
+        w_map = {}
+        for t, f in tf_map.items():
+            w = (1.0 + math.log2(f)) * idf_tfidf.get(t, 0.0)
+            if w != 0:
+                w_map[t] = w
+        tfidf_weights[did] = w_map
+        doc_norms[did] = math.sqrt(sum(w * w for w in w_map.values()))
+    idf_bm25 = {t: math.log((n_docs - df + 0.5) / (df + 0.5) + 1.0) for t, df in term_df.items()}
+
+    return {
+        "docs_raw": docs_raw, "inverted_index": inverted_index, "docid_to_pid": docid_to_pid,
+        "doc_tf": doc_tf, "doc_len": doc_len, "tfidf_weights": tfidf_weights,
+        "doc_norms": doc_norms, "idf_tfidf": idf_tfidf, "idf_bm25": idf_bm25,
+    }
+
+def _worker(mode: str, ready, done, out):
+    if mode == "legacy":
+        index = _legacy_layout()
+    else:
+        snap = load_snapshot(SNAPSHOT_PATH, mmap=(mode == "mmap"))
+        # fault in every page, as a long-running worker eventually would
+        for arr in (snap.term_ptr, snap.post_bytes, snap.block_first, snap.post_tf, snap.post_tfidf,
+                    snap.doc_len, snap.doc_norms, snap.idf_tfidf, snap.idf_bm25):
+            arr.sum()
+        index = snap
+
+    ready.wait()
+    mem = psutil.Process().memory_full_info()
+    out.put({"rss": mem.rss, "uss": mem.uss, "pss": getattr(mem, "pss", 0)})
+    done.wait()
+    del index
+
+def run(mode: str, n_workers: int) -> Dict[str, float]:
+    ctx = mp.get_context("spawn")
+    ready, done = ctx.Barrier(n_workers + 1), ctx.Barrier(n_workers + 1)
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(mode, ready, done, out)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    ready.wait()
+    rows: List[Dict[str, int]] = [out.get() for _ in procs]
+    done.wait()
+    for p in procs:
+        p.join()
+
+    mb = 1024 * 1024
+    return {
+        "rss_per_worker": sum(r["rss"] for r in rows) / n_workers / mb,
+        "uss_per_worker": sum(r["uss"] for r in rows) / n_workers / mb,
+        "pss_total": sum(r["pss"] for r in rows) / mb,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    args = parser.parse_args()
+
+    load_or_build_snapshot(SNAPSHOT_PATH)
+
+    print(f"{'mode':<10}{'workers':>8}{'RSS/worker MB':>16}{'USS/worker MB':>16}{'PSS total MB':>15}")
+    for mode in args.modes:
+        for n in args.workers:
+            r = run(mode, n)
+            print(f"{mode:<10}{n:>8}{r['rss_per_worker']:>16.1f}{r['uss_per_worker']:>16.1f}{r['pss_total']:>15.1f}")
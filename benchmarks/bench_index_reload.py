@@ -0,0 +1,129 @@
+"""
+Benchmark: hot index reload under query load vs an app restart.
+
+Reader threads rank a seeded Zipf query stream without pause while the
+snapshot file is replaced every `--every` seconds (write + rename, as the
+index build does) and IndexReloader, watching it, swaps each new copy in.
+Reports query latency without reloads, during reloads and right after each
+swap (`--window` ms), the reload time and failed queries. It then checks
+that every replaced snapshot was released: no IndexSnapshot object left
+alive and no memory map of a replaced file in /proc/self/maps. The time
+to import the search module in a fresh process is the downtime a restart
+would cost instead.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_index_reload --threads 4 --seconds 5 --every 0.5
+"""
+import argparse
+import gc
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.harness.queries import title_vocabulary, zipf_queries
+from myapp.search import algorithms
+from myapp.search.index_reload import IndexReloader
+from myapp.search.index_snapshot import SNAPSHOT_PATH
+
+
+def _reader(analyzed, stop: threading.Event, out: list, errors: list):
+    i = 0
+    while not stop.is_set():
+        q, neg = analyzed[i % len(analyzed)]
+        t0 = time.perf_counter()
+        try:
+            view = algorithms.index_view()
+            ids, scores = algorithms.rank_documents(q, neg, view=view)
+            [view.pid(did) for did in ids.tolist()]
+        except Exception as e:
+            errors.append(e)
+        out.append((t0, time.perf_counter() - t0))
+        i += 1
+
+def _run(analyzed, threads: int, seconds: float, during=None):
+    stop, errors = threading.Event(), []
+    outs = [[] for _ in range(threads)]
+    workers = [threading.Thread(target=_reader, args=(analyzed[t::threads], stop, outs[t], errors))
+               for t in range(threads)]
+    for w in workers:
+        w.start()
+    if during is None:
+        time.sleep(seconds)
+    else:
+        during(time.perf_counter() + seconds)
+    stop.set()
+    for w in workers:
+        w.join()
+    samples = np.array([s for out in outs for s in out])
+    return samples[:, 0], samples[:, 1] * 1e3, errors
+
+def _mapped(directory: str) -> int:
+    with open("/proc/self/maps") as f:
+        return sum(directory in line for line in f)
+
+def _row(name: str, lat: np.ndarray):
+    print(f"{name:<28}{len(lat):>9}{np.percentile(lat, 50):>9.2f}{np.percentile(lat, 99):>9.2f}{lat.max():>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=4, help="query threads")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--every", type=float, default=0.5, help="seconds between snapshot file replacements")
+    parser.add_argument("--window", type=float, default=50.0, help="ms after a swap counted as 'right after'")
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    analyzed = [algorithms.analyze_query(q) for q in zipf_queries(title_vocabulary(), args.queries, seed=0)]
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import myapp.search.algorithms"], check=True)
+    restart = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "index_snapshot.bin"
+        shutil.copyfile(SNAPSHOT_PATH, path)
+        reloader = IndexReloader(path, interval=0.02)
+        reloader.reload()
+        _run(analyzed, args.threads, 0.5)   # warm up
+
+        swaps, replaced = [], []
+        def replace_files(stop: float):
+            while time.perf_counter() < stop:
+                time.sleep(args.every)
+                replaced.append(weakref.ref(algorithms._live.main))
+                shutil.copyfile(SNAPSHOT_PATH, Path(tmp) / "next.bin")
+                (Path(tmp) / "next.bin").replace(path)
+                n = reloader.counts["reloads"]
+                while reloader.counts["reloads"] == n and not reloader.counts["errors"]:
+                    time.sleep(0.001)
+                swaps.append(time.perf_counter())
+
+        print(f"{args.threads} query threads, snapshot replaced every {args.every:.1f} s, "
+              f"{args.seconds:.0f} s per run\n")
+        print(f"{'':<28}{'queries':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        _, base, base_errors = _run(analyzed, args.threads, args.seconds)
+        _row("no reloads", base)
+        starts, lat, errors = _run(analyzed, args.threads, args.seconds, during=replace_files)
+        _row("reloading", lat)
+        after = np.zeros(len(starts), dtype=bool)
+        for t in swaps:
+            after |= (starts >= t) & (starts < t + args.window / 1e3)
+        if after.any():
+            _row(f"within {args.window:.0f} ms of a swap", lat[after])
+
+        stats = reloader.stats()
+        reloader.close()
+        gc.collect()
+        alive = sum(ref() is not None for ref in replaced)
+        print(f"\nreloads: {stats['reloads']} ({stats['errors']} errors), last took {stats['last_reload_ms']:.1f} ms;"
+              f" failed queries: {len(base_errors) + len(errors)}")
+        print(f"replaced snapshots still alive: {alive}/{len(replaced)}; "
+              f"snapshot files mapped: {_mapped(tmp)} (the current one)")
+        print(f"restart instead: {restart * 1e3:.0f} ms to import the search module, no queries served meanwhile")
@@ -0,0 +1,120 @@
+"""
+Benchmark: AND candidate generation over the compressed postings.
+
+Sweeps query length and selectivity. Selectivity is controlled by drawing one
+term from a df quantile band (rare ... common) and the rest from the most
+common terms, so the shortest/longest list ratio grows as the band gets rarer.
+Per query it times a linear list merge and a binary-search intersection, both
+over fully decoded lists (decode time included), against `ListCandidates.and_`, which decodes the
+shortest list and probes the longer ones through their skip tables
+(exponential search, only the touched blocks decoded). The "decode ms"
+column is what decoding every query list in full costs. Also reports the doc
+id storage (int32 vs packed gaps + skip table) and the snapshot size.
+`--tile N` runs over N copies of the corpus, for longer lists.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_intersection --lengths 2 3 4 --queries 200 --tile 8
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List
+
+import numpy as np
+
+from benchmarks.bench_pruning import tiled
+from myapp.search.index_snapshot import SNAPSHOT_PATH, load_or_build_snapshot
+from myapp.search.postings import ListCandidates, intersect_sorted
+
+BANDS = {"rare": (0.0, 0.5), "mid": (0.5, 0.9), "common": (0.9, 1.0)}
+
+
+def _merge(a: List[int], b: List[int]) -> List[int]:
+    """The linear two-pointer merge used before."""
+    i = j = 0
+    out = []
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            out.append(a[i]); i += 1; j += 1
+        elif a[i] < b[j]:
+            i += 1
+        else:
+            j += 1
+    return out
+
+def and_merge(postings: List[np.ndarray]) -> List[int]:
+    lists = sorted((pl.tolist() for pl in postings), key=len)
+    res = lists[0]
+    for pl in lists[1:]:
+        res = _merge(res, pl)
+        if not res:
+            break
+    return res
+
+def and_binary_search(postings: List[np.ndarray]) -> np.ndarray:
+    postings = sorted(postings, key=len)
+    res = postings[0]
+    for pl in postings[1:]:
+        res = intersect_sorted(res, pl)
+        if not len(res):
+            break
+    return res
+
+def _ms(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - t0) * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--tile", type=int, default=1, help="copies of the corpus to index")
+    args = parser.parse_args()
+
+    base = load_or_build_snapshot(SNAPSHOT_PATH)
+    snap = tiled(base, args.tile)
+    backend = ListCandidates(snap)
+    df = np.diff(snap.term_ptr)
+    by_df = [t for t, _ in sorted(snap.term_ids.items(), key=lambda x: df[x[1]])]
+    common = by_df[int(0.95 * len(by_df)):]
+
+    n_post = len(snap.post_tf)
+    packed = snap.post_bytes.nbytes + snap.post_offset.nbytes + snap.post_width.nbytes
+    skips = snap.block_first.nbytes + snap.block_ptr.nbytes
+    print(f"{snap.n_docs} docs, {n_post} postings; tf column {snap.post_tf.dtype} "
+          f"{snap.post_tf.nbytes / 1e6:.1f} MB (int32: {4 * n_post / 1e6:.1f} MB)")
+    print(f"{len(snap.block_first)} skip blocks; doc ids: "
+          f"int32 {4 * n_post / 1e6:.2f} MB, packed gaps {packed / 1e6:.2f} MB + skip table {skips / 1e6:.2f} MB "
+          f"({(packed + skips) / n_post:.2f} bytes/posting)")
+    if args.tile <= 1:
+        print(f"snapshot file {SNAPSHOT_PATH.stat().st_size / 1e6:.2f} MB "
+              f"({(4 * n_post - packed - skips) / 1e6:.2f} MB less than with int32 doc ids)")
+    print(f"{'len':>4}{'band':>8}{'short/long':>12}{'merge ms':>10}{'search ms':>11}{'skip ms':>9}"
+          f"{'decode ms':>11}  equal")
+
+    rng = random.Random(0)
+    for length in args.lengths:
+        for band, (lo, hi) in BANDS.items():
+            pool = by_df[int(lo * len(by_df)):max(int(hi * len(by_df)), int(lo * len(by_df)) + 1)]
+            t_merge, t_search, t_skip, t_decode, ratio, equal = [], [], [], [], [], True
+            for _ in range(args.queries):
+                q = [rng.choice(pool)] + rng.sample(common, length - 1)
+                postings, ms = _ms(lambda: [snap.postings(t) for t in q])
+                t_decode.append(ms)
+                lens = [len(p) for p in postings]
+                ratio.append(min(lens) / max(max(lens), 1))
+
+                ref, ms = _ms(and_merge, postings)
+                t_merge.append(ms + t_decode[-1])
+                res, ms = _ms(and_binary_search, postings)
+                t_search.append(ms + t_decode[-1])
+                skip, ms = _ms(backend.and_, q)
+                t_skip.append(ms)
+                equal &= ref == res.tolist() == skip.tolist()
+
+            m_merge, m_search, m_skip = map(statistics.median, (t_merge, t_search, t_skip))
+            print(f"{length:>4}{band:>8}{statistics.median(ratio):>12.4f}{m_merge:>10.3f}{m_search:>11.3f}"
+                  f"{m_skip:>9.3f}{statistics.median(t_decode):>11.3f}  {equal}")
@@ -0,0 +1,133 @@
+"""
+Benchmark: catalog updates through the live index vs a full index rebuild.
+
+Applies a stream of product updates (price / text changes), deletions and
+new products to the LSM-style live index and reports the cost per update
+batch, query latency with the changes pending in the delta segment, the
+merge time, query latency while merges run in the background, and the time
+a full snapshot rebuild from the source JSON takes (what every change cost
+before). Finally checks that BM25 rankings with the changes pending match
+the rankings after merging them.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_live_index --changes 2000 --batch 20 --queries 500
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.harness.queries import title_vocabulary, zipf_queries
+from myapp.search import algorithms
+from myapp.search.index_snapshot import build_snapshot
+from myapp.search.load_corpus import load_records
+
+WORDS = ["denim", "jean", "shirt", "black", "cotton", "slim", "kurta", "printed", "casual", "white"]
+
+
+def _changes(records, n: int, seed: int):
+    """(kind, payload) stream: 60% updates, 20% deletions, 20% new products."""
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        r = rng.random()
+        rec = dict(records[rng.randrange(len(records))])
+        if r < 0.6:
+            rec["title_clean"] = f"{rec['title_clean']} {rng.choice(WORDS)}"
+            rec["selling_price_num"] = round((rec.get("selling_price_num") or 500.0) * rng.uniform(0.7, 1.1), 2)
+            out.append(("upsert", rec))
+        elif r < 0.8:
+            out.append(("delete", rec["pid"]))
+        else:
+            rec["pid"] = f"NEW{i:07d}"
+            rec["description_clean"] = f"{rec.get('description_clean') or ''} {rng.choice(WORDS)}"
+            out.append(("upsert", rec))
+    return out
+
+def _apply(batch):
+    ups = [p for kind, p in batch if kind == "upsert"]
+    dels = [p for kind, p in batch if kind == "delete"]
+    if ups:
+        algorithms.upsert_documents(ups)
+    if dels:
+        algorithms.delete_documents(dels)
+
+def _query_ms(analyzed) -> np.ndarray:
+    lat = np.empty(len(analyzed))
+    for i, (q, neg) in enumerate(analyzed):
+        t0 = time.perf_counter()
+        algorithms.rank_documents(q, neg)
+        lat[i] = time.perf_counter() - t0
+    return lat * 1e3
+
+def _ranked(analyzed):
+    view = algorithms.index_view()
+    return [[view.pid(d) for d in algorithms.rank_documents(q, neg, view=view)[0].tolist()] for q, neg in analyzed]
+
+def _row(name: str, lat: np.ndarray):
+    print(f"{name:<34}{np.percentile(lat, 50):>9.2f}{np.percentile(lat, 99):>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--changes", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=20, help="changes per upsert / delete call")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    live = algorithms._live
+    live.merge_threshold = 10 ** 9   # merges are triggered explicitly below
+    records = load_records(algorithms.ENRICHED_PATH)
+    stream = _changes(records, args.changes, args.seed)
+    analyzed = [algorithms.analyze_query(q) for q in zipf_queries(title_vocabulary(), args.queries, seed=args.seed)]
+    _query_ms(analyzed)   # warm up
+
+    print(f"{algorithms.index_view().n_docs} docs, {args.changes} changes in batches of {args.batch}, {args.queries} queries")
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        build_snapshot(Path(tmp) / "snapshot.bin")
+        print(f"full snapshot rebuild: {(time.perf_counter() - t0) * 1e3:.0f} ms (plus an app restart)")
+
+    print(f"\n{'':<34}{'p50 ms':>9}{'p99 ms':>9}")
+    _row("queries, clean index", _query_ms(analyzed))
+    half = args.changes // 2
+    lat = []
+    for i in range(0, half, args.batch):
+        t0 = time.perf_counter()
+        _apply(stream[i:i + args.batch])
+        lat.append(time.perf_counter() - t0)
+    _row(f"update batch ({args.batch} changes)", np.array(lat) * 1e3)
+    t0 = time.perf_counter()
+    algorithms.index_view()
+    print(f"{'view rebuild after a change':<34}{(time.perf_counter() - t0) * 1e3:>9.2f}")
+    _row(f"queries, {live.pending} changes pending", _query_ms(analyzed))
+    pending = _ranked(analyzed)
+    t0 = time.perf_counter()
+    algorithms.merge_index()
+    print(f"{'merge':<34}{(time.perf_counter() - t0) * 1e3:>9.2f}")
+    same = sum(a == b for a, b in zip(pending, _ranked(analyzed)))
+    _row("queries, merged", _query_ms(analyzed))
+
+    # second half: updates keep coming while merges run in the background
+    stop = threading.Event()
+    def merger():
+        while not stop.is_set():
+            algorithms.merge_index()
+            time.sleep(0.01)
+    thread = threading.Thread(target=merger, daemon=True)
+    thread.start()
+    during = []
+    for i in range(half, args.changes, args.batch):
+        _apply(stream[i:i + args.batch])
+        during.append(_query_ms(analyzed[:20]))
+    stop.set()
+    thread.join()
+    _row("queries, updates + merges running", np.concatenate(during))
+
+    print(f"\nBM25 top-20 identical before / after merge: {same}/{len(analyzed)} queries")
+    print("index:", algorithms.index_stats())
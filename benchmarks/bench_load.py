@@ -0,0 +1,118 @@
+"""
+Benchmark: web app throughput under concurrent load, and counter integrity.
+
+Serves the Flask app in-process over HTTP (werkzeug, one thread per request,
+or one request at a time with --single-threaded as the baseline) with the
+offline stub LLM (RAG_CLIENT=stub, RAG summary inline so every search waits
+`--llm-delay` like a real LLM call) and the result / RAG caches off. Each
+client thread keeps its own session cookie and loops home -> search ->
+product page. Reports requests/s and p50 / p99 latency per client count,
+then checks that the analytics totals, click counts and LLM call count
+moved by exactly the number of requests issued.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_load --clients 1 2 4 8 --seconds 5 --llm-delay 0.05
+"""
+import argparse
+import contextlib
+import http.cookiejar
+import io
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+QUERIES = ["men jeans", "women kurta cotton", "full sleeve shirt", "slim fit jeans blue", "round neck t shirt",
+           "casual shirt", "track pants", "printed kurta", "black jeans women", "regular fit shirt"]
+_LINK_RE = re.compile(r'doc_details\?pid=(\w+)&amp;search_id=(\d+)')
+
+
+def _client_loop(base: str, stop: float, seed: int, lat: list, issued: dict, lock: threading.Lock):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    n = {"requests": 0, "queries": 0, "clicks": 0}
+    i = seed
+    while time.perf_counter() < stop:
+        t0 = time.perf_counter()
+        opener.open(base + "/").read()
+        lat.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        form = urllib.parse.urlencode({"search-query": QUERIES[i % len(QUERIES)]}).encode()
+        page = opener.open(base + "/search", data=form).read().decode("utf-8")
+        lat.append(time.perf_counter() - t0)
+        n["requests"] += 2
+        n["queries"] += 1
+        link = _LINK_RE.search(page)
+        if link:
+            t0 = time.perf_counter()
+            opener.open(f"{base}/doc_details?pid={link.group(1)}&search_id={link.group(2)}").read()
+            lat.append(time.perf_counter() - t0)
+            n["requests"] += 1
+            n["clicks"] += 1
+        i += 1
+    with lock:
+        for key, value in n.items():
+            issued[key] += value
+
+def _run(base: str, clients: int, seconds: float) -> dict:
+    lats = [[] for _ in range(clients)]
+    issued = {"requests": 0, "queries": 0, "clicks": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+    threads = [threading.Thread(target=_client_loop, args=(base, stop, c, lats[c], issued, lock))
+               for c in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    lat = np.concatenate([np.asarray(x) for x in lats]) * 1e3
+    return dict(issued, rps=len(lat) / elapsed, p50=np.percentile(lat, 50), p99=np.percentile(lat, 99))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="simulated LLM latency per search (s)")
+    parser.add_argument("--single-threaded", action="store_true", help="serve one request at a time")
+    args = parser.parse_args()
+
+    os.environ.update(RAG_CLIENT="stub", RAG_STUB_DELAY=str(args.llm_delay), RAG_ASYNC="0", RAG_CACHE_SIZE="0",
+                      SEARCH_CACHE_SIZE="0", ANALYTICS_DB="", METRICS_ENABLED="0")
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ.setdefault("DATA_FILE_PATH", "data/fashion_products_dataset_enriched.json")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import web_app
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    server = make_server("127.0.0.1", 0, web_app.app, threaded=not args.single_threaded)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    data, llm = web_app.analytics_data, web_app.rag_generator._client()
+
+    mode = "one request at a time" if args.single_threaded else "thread per request"
+    print(f"server: {mode}, simulated LLM latency {args.llm_delay * 1e3:.0f} ms, {args.seconds:.0f} s per run")
+    print(f"\n{'clients':>7}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'requests':>10}{'counters':>10}")
+    for clients in args.clients:
+        before = dict(data.totals), sum(data.click_counts().values()), llm.calls
+        with contextlib.redirect_stdout(io.StringIO()):   # the routes print every request
+            res = _run(base, clients, args.seconds)
+            if web_app.ANALYTICS_ASYNC:
+                web_app.analytics_ingest.join()
+        totals, clicks, calls = dict(data.totals), sum(data.click_counts().values()), llm.calls
+        ok = (totals["requests"] - before[0]["requests"] == res["requests"]
+              and totals["queries"] - before[0]["queries"] == res["queries"]
+              and totals["clicks"] - before[0]["clicks"] == clicks - before[1] == res["clicks"]
+              and calls - before[2] == res["queries"])
+        print(f"{clients:>7}{res['rps']:>10.1f}{res['p50']:>9.1f}{res['p99']:>9.1f}{res['requests']:>10}"
+              f"{'ok' if ok else 'MISMATCH':>10}")
+    if web_app.ANALYTICS_ASYNC:
+        print("ingest:", web_app.analytics_ingest.stats())
+    server.shutdown()
@@ -0,0 +1,60 @@
+"""
+Benchmark: overhead of the per-stage latency instrumentation.
+
+Times `search_in_corpus` over a Zipf query stream with the stage timers on
+and off (interleaved rounds, median per query), plus the raw cost of one
+`timed()` block.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_metrics --queries 3000 --rounds 5
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.harness.queries import title_vocabulary, zipf_queries
+from myapp.core import metrics
+from myapp.search import algorithms
+from myapp.search.index_snapshot import ENRICHED_PATH
+from myapp.search.load_corpus import load_product_store
+
+
+def _per_query_us(corpus, queries) -> float:
+    t0 = time.perf_counter()
+    for i, q in enumerate(queries):
+        algorithms.search_in_corpus(q, i, corpus)
+    return (time.perf_counter() - t0) / len(queries) * 1e6
+
+def _timer_ns(n: int = 200_000) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with metrics.timed("bench"):
+            pass
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_product_store(ENRICHED_PATH)
+    queries = zipf_queries(title_vocabulary(), args.queries)
+    _per_query_us(corpus, queries)   # warm the analyzer memo and page in the snapshot
+
+    runs = {True: [], False: []}
+    for _ in range(args.rounds):
+        for on in (False, True):
+            metrics.set_enabled(on)
+            runs[on].append(_per_query_us(corpus, queries))
+    timer = {}
+    for on in (False, True):
+        metrics.set_enabled(on)
+        timer[on] = _timer_ns()
+
+    off, on = statistics.median(runs[False]), statistics.median(runs[True])
+    print(f"{algorithms.index_view().n_docs} docs, {len(queries)} queries x {args.rounds} rounds")
+    print(f"search_in_corpus  off {off:8.1f} us/query   on {on:8.1f} us/query   overhead {on - off:+.1f} us "
+          f"({(on - off) / off * 100:+.1f}%)")
+    print(f"timed() block     off {timer[False]:8.0f} ns          on {timer[True]:8.0f} ns")
@@ -0,0 +1,116 @@
+"""
+Benchmark: dict of pydantic Documents vs the columnar ProductStore.
+
+  - memory: tracemalloc peak/retained bytes to hold the catalog, reported per
+    100k products (the catalog is replicated with suffixed pids up to --size)
+  - ResultItem construction for a top-k page: the old per-Document loop vs
+    `build_results` over the dict and over the store (bulk column gather)
+  - full Document materialization for the details page
+
+Usage (from the repo root):
+    python -m benchmarks.bench_product_store --size 100000 --k 20
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+
+from myapp.search import algorithms
+from myapp.search.index_snapshot import ENRICHED_PATH
+from myapp.search.load_corpus import _build_corpus, load_records
+from myapp.search.objects import ResultItem
+from myapp.search.product_store import ProductStore
+
+
+def _scaled(records, size):
+    out = []
+    for i in range(size):
+        rec = dict(records[i % len(records)])
+        if i >= len(records):
+            rec["pid"] = f"{rec['pid']}-{i // len(records)}"
+        out.append(rec)
+    return out
+
+def _measure(build, records):
+    gc.collect()
+    tracemalloc.start()
+    obj = build(records)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, retained, peak
+
+def old_results(ids, scores, corpus):
+    """build_results as it was: validated ResultItem per Document of the dict corpus."""
+    out = []
+    for did, score in zip(ids.tolist(), scores.tolist()):
+        pid = algorithms.pid_of(did)
+        doc = corpus.get(pid)
+        if not doc:
+            continue
+        out.append(ResultItem(
+            pid=doc.pid, title=doc.title, description=doc.description,
+            selling_price=doc.selling_price, discount=doc.discount, actual_price=doc.actual_price,
+            average_rating=doc.average_rating, out_of_stock=doc.out_of_stock, ranking=float(score),
+            url=None, source_url=doc.url
+        ))
+    return out
+
+def _median_us(fn, runs):
+    ts = []
+    for args in runs:
+        t0 = time.perf_counter()
+        fn(*args)
+        ts.append(time.perf_counter() - t0)
+    return statistics.median(ts) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=500)
+    args = parser.parse_args()
+
+    records = load_records(ENRICHED_PATH)
+    scaled = _scaled(records, args.size)
+    per_100k = 100_000 / args.size
+
+    dict_corpus, d_ret, d_peak = _measure(_build_corpus, scaled)
+    store, s_ret, s_peak = _measure(ProductStore, scaled)
+    print(f"{args.size} products (memory scaled to 100k)")
+    print(f"{'layout':<10}{'retained MB':>13}{'peak MB':>10}")
+    print(f"{'dict':<10}{d_ret * per_100k / 1e6:>13.1f}{d_peak * per_100k / 1e6:>10.1f}")
+    print(f"{'store':<10}{s_ret * per_100k / 1e6:>13.1f}{s_peak * per_100k / 1e6:>10.1f}"
+          f"   ({store.nbytes * per_100k / 1e6:.1f} MB in columns)")
+    del scaled, dict_corpus
+
+    # ResultItem pages over the real snapshot ids
+    small_dict = _build_corpus(records)
+    small_store = ProductStore(records)
+    rng = np.random.default_rng(0)
+    runs, n_docs = [], algorithms.index_view().n_docs
+    for _ in range(args.pages):
+        ids = np.sort(rng.choice(n_docs, size=min(args.k, n_docs), replace=False))
+        runs.append((ids, rng.random(len(ids))))
+    t_old = _median_us(lambda i, s: old_results(i, s, small_dict), runs)
+    t_dict = _median_us(lambda i, s: algorithms.build_results(i, s, small_dict), runs)
+    t_store = _median_us(lambda i, s: algorithms.build_results(i, s, small_store), runs)
+    same = all(
+        [r.model_dump() for r in old_results(i, s, small_dict)] ==
+        [r.model_dump() for r in algorithms.build_results(i, s, small_store)] for i, s in runs[:50]
+    )
+    print(f"\nResultItem page of {args.k} (median us)")
+    print(f"  dict, old loop                {t_old:>8.1f}")
+    print(f"  dict, build_results           {t_dict:>8.1f}")
+    print(f"  store, build_results          {t_store:>8.1f}   same output: {same}")
+
+    pids = list(small_store.keys())
+    sample = [(random.Random(i).choice(pids),) for i in range(args.pages)]
+    print(f"\nfull Document for /doc_details (median us)")
+    print(f"  dict lookup                   {_median_us(small_dict.get, sample):>8.1f}")
+    print(f"  store materialize             {_median_us(small_store.get, sample):>8.1f}")
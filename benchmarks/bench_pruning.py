@@ -0,0 +1,96 @@
+"""
+Benchmark: exhaustive OR BM25 scoring vs MaxScore-pruned top-k.
+
+For each query length, both strategies rank the OR union of the query
+postings; results are checked for equality and the median latency plus the
+share of the union the pruned evaluator actually scored are reported.
+Queries mix df-weighted (common) and uniformly drawn (mostly rare) terms.
+The "default" column is `bm25_top_k`, which only prunes on collections of
+at least PRUNE_MIN_DOCS docs and queries with PRUNE_MIN_POSTINGS postings.
+`--tile N` ranks over N copies of the corpus (doc ids offset per copy), to
+see where pruning starts to pay off.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_pruning --lengths 2 4 6 8 --k 20 --tile 12
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.bench_scoring import sample_queries
+from myapp.search.index_snapshot import SNAPSHOT_PATH, IndexSnapshot, load_or_build_snapshot
+from myapp.search.live_index import _build_segment, _pid_blob
+from myapp.search.scoring import ScoringEngine, top_k
+
+
+def tiled(snap: IndexSnapshot, n: int) -> IndexSnapshot:
+    """`n` copies of the snapshot's docs in one index (same vocabulary, n x the postings)."""
+    if n <= 1:
+        return snap
+    terms = sorted(snap.term_ids, key=snap.term_ids.get)
+    t = np.tile(np.repeat(np.arange(snap.n_terms), np.diff(snap.term_ptr)), n)
+    docs = snap.term_docs(0, snap.n_terms).astype(np.int64)
+    d = np.concatenate([docs + i * snap.n_docs for i in range(n)])
+    f = np.tile(snap.post_tf.astype(np.int64), n)
+    numeric = {c: np.tile(getattr(snap, c), n) for c in ("rating", "discount", "price", "out_of_stock")}
+    facets = {}
+    for field, codes in snap.facet_codes.items():
+        facets[f"{field}_codes"] = np.tile(codes, n)
+        facets[f"{field}_values"] = np.frombuffer("\n".join(snap.facet_values[field]).encode("utf-8"), dtype=np.uint8)
+    pids = _pid_blob([f"{snap.pid(did)}-{i}" for i in range(n) for did in range(snap.n_docs)])
+    return _build_segment({"checksum": f"{snap.checksum}x{n}"}, terms, (t, d, f), np.tile(snap.doc_len, n),
+                          numeric, pids, facets)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1, 2, 3, 4, 6, 8])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--tile", type=int, default=1, help="copies of the corpus to index")
+    args = parser.parse_args()
+
+    snap = tiled(load_or_build_snapshot(SNAPSHOT_PATH), args.tile)
+    engine = ScoringEngine(snap)
+    t0 = time.perf_counter()
+    engine.term_upper_bounds()
+    print(f"{snap.n_docs} docs, {snap.n_terms} terms; upper bounds built in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+    print(f"{'len':>4}{'union':>9}{'scored %':>10}{'exhaustive ms':>15}{'pruned ms':>11}{'speedup':>9}"
+          f"{'default ms':>12}  equal")
+
+    for length in args.lengths:
+        t_full, t_pruned, t_default, share, equal = [], [], [], [], True
+        n_union = []
+        rng = random.Random(length)
+        vocab = list(snap.term_ids)
+        for q in sample_queries(snap, length, args.queries):
+            # swap one term for a uniformly drawn one (usually rare) in half the queries
+            if rng.random() < 0.5:
+                q[rng.randrange(len(q))] = rng.choice(vocab)
+            total = len(np.unique(np.concatenate([snap.postings(t) for t in q])))
+
+            t0 = time.perf_counter()
+            ids_a, sc_a = top_k(*engine.bm25(q), args.k)
+            t_full.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            ids, scores, n_scored = engine._bm25_pruned(q, args.k)
+            ids_b, sc_b = top_k(ids, scores, args.k)
+            t_pruned.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            ids_c, sc_c = engine.bm25_top_k(q, args.k)
+            t_default.append(time.perf_counter() - t0)
+
+            equal &= np.array_equal(ids_a, ids_b) and np.allclose(sc_a, sc_b)
+            equal &= np.array_equal(ids_a, ids_c) and np.allclose(sc_a, sc_c)
+            share.append(n_scored / max(total, 1))
+            n_union.append(total)
+
+        m_full, m_pruned = statistics.median(t_full) * 1e3, statistics.median(t_pruned) * 1e3
+        print(f"{length:>4}{int(statistics.median(n_union)):>9}{100 * statistics.mean(share):>9.1f}%"
+              f"{m_full:>15.2f}{m_pruned:>11.2f}{m_full / max(m_pruned, 1e-9):>8.1f}x"
+              f"{statistics.median(t_default) * 1e3:>12.2f}  {equal}")
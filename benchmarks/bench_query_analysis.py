@@ -0,0 +1,91 @@
+"""
+Benchmark: per-query analysis, preprocess_text_field vs QueryAnalyzer.
+
+First checks that the fast path gives token-for-token the same output as
+`preprocess_text_field` on every raw text field of the corpus (plus the
+labelled queries and a few edge cases), then times analysis of a query
+stream drawn from the labelled queries and corpus titles:
+  - baseline: preprocess_text_field (regexes + word_tokenize + stem)
+  - cold:     QueryAnalyzer with the whole-query memo disabled (stem memo only)
+  - warm:     QueryAnalyzer with both memos (repeated queries)
+
+Usage (from the repo root):
+    python -m benchmarks.bench_query_analysis --queries 5000
+"""
+import argparse
+import csv
+import json
+import random
+import statistics
+import time
+from typing import Callable, List
+
+from myapp.search.index_snapshot import ENRICHED_PATH, DATA_DIR
+from myapp.search.query_analysis import QueryAnalyzer, verify_tokenizer, preprocess_text_field
+
+RAW_FIELDS = ["title", "description", "brand", "category", "sub_category", "seller"]
+LABELS_PATH = DATA_DIR / "annotations" / "queries_label_template.csv"
+
+EDGE_CASES = [
+    "I cannot find gonna-style jeans, gotta have them", "Wanna GIMME lemme",
+    "Café crème naïve 100% cotton", "see https://example.com/x?y=1 now", "t-shirt_men/women 2-pack",
+    "don't won't can't", "«quotes» … and ‘curly’ “ones”", "", "   ", "-blue jeans",
+]
+
+
+def _timed_each(fn: Callable[[str], List[str]], queries: List[str]) -> List[float]:
+    out = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        out.append(time.perf_counter() - t0)
+    return out
+
+def _pct(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p * len(xs)))] * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--skip-verify", action="store_true")
+    args = parser.parse_args()
+
+    with open(ENRICHED_PATH, "r", encoding="utf-8") as f:
+        docs = json.load(f)
+    labelled = []
+    if LABELS_PATH.exists():
+        with open(LABELS_PATH, newline="", encoding="utf-8") as f:
+            labelled = sorted({row["query_text"] for row in csv.DictReader(f)})
+
+    if not args.skip_verify:
+        texts = [str(d.get(k) or "") for d in docs for k in RAW_FIELDS] + labelled + EDGE_CASES
+        t0 = time.perf_counter()
+        bad = verify_tokenizer(texts)
+        print(f"verified {len(texts)} texts in {time.perf_counter() - t0:.1f}s: {len(bad)} mismatches")
+        for t in bad[:5]:
+            print("  mismatch:", repr(t[:120]))
+
+    # query stream: Zipf-like repetition over labelled queries + title prefixes
+    rng = random.Random(0)
+    pool = labelled + [" ".join(str(d.get("title") or "").split()[:rng.randint(1, 4)]) for d in docs]
+    pool = [q for q in pool if q.strip()]
+    rng.shuffle(pool)
+    weights = [1.0 / (i + 1) for i in range(len(pool))]
+    queries = rng.choices(pool, weights, k=args.queries)
+    print(f"{len(queries)} queries, {len(set(queries))} distinct")
+
+    cold = QueryAnalyzer(query_cache_size=0)
+    warm = QueryAnalyzer()
+    runs = {
+        "baseline": _timed_each(lambda q: preprocess_text_field(q)["tokens"], queries),
+        "cold": _timed_each(cold.tokens, queries),
+        "warm": _timed_each(warm.tokens, queries),
+    }
+    base = statistics.median(runs["baseline"])
+    print(f"{'path':<10}{'p50 us':>9}{'p95 us':>9}{'p99 us':>9}{'total ms':>10}{'speedup':>9}")
+    for name, ts in runs.items():
+        print(f"{name:<10}{_pct(ts, 0.5):>9.1f}{_pct(ts, 0.95):>9.1f}{_pct(ts, 0.99):>9.1f}"
+              f"{sum(ts) * 1e3:>10.1f}{base / max(statistics.median(ts), 1e-12):>8.1f}x")
+    print("cache:", warm.cache_info())
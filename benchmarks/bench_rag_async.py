@@ -0,0 +1,58 @@
+"""
+Benchmark: /search page latency with the RAG call inline vs asynchronous.
+
+Runs the Flask app in-process with the offline stub LLM client
+(RAG_CLIENT=stub) and a simulated LLM latency, then times POST /search with
+RAG_ASYNC off (page waits for the summary) and on (page renders at once,
+summary fetched from /rag/<job_id>), and how long the summary takes to
+arrive in the async case.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_rag_async --llm-delay 0.8 --searches 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import statistics
+import time
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--llm-delay", type=float, default=0.8, help="simulated LLM latency (s)")
+    parser.add_argument("--searches", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.update(RAG_CLIENT="stub", RAG_STUB_DELAY=str(args.llm_delay))
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ.setdefault("DATA_FILE_PATH", "data/fashion_products_dataset_enriched.json")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import web_app
+    client = web_app.app.test_client()
+    queries = ["men jeans", "women kurta cotton", "full sleeve shirt", "running shoes", "slim fit jeans blue"]
+
+    page = {}
+    ready = []
+    for mode in (False, True):
+        web_app.RAG_ASYNC = mode
+        times = []
+        for i in range(args.searches):
+            q = f"{queries[i % len(queries)]} {i}"   # distinct queries: no result-cache hits
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                r = client.post("/search", data={"search-query": q})
+            times.append(time.perf_counter() - t0)
+            if mode:
+                job = re.search(r"/rag/(\w+)", r.text).group(1)
+                while client.get(f"/rag/{job}").get_json()["state"] == "pending":
+                    time.sleep(0.01)
+                ready.append(time.perf_counter() - t0)
+        page[mode] = statistics.median(times) * 1e3
+
+    print(f"simulated LLM latency {args.llm_delay * 1e3:.0f} ms, {args.searches} searches per mode")
+    print(f"/search page, RAG inline   {page[False]:8.1f} ms (median)")
+    print(f"/search page, RAG async    {page[True]:8.1f} ms (median)")
+    print(f"async summary ready after  {statistics.median(ready) * 1e3:8.1f} ms (median)")
+    print("jobs:", web_app.rag_jobs.stats())
+    web_app.rag_jobs.shutdown()
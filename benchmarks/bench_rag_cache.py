@@ -0,0 +1,83 @@
+"""
+Benchmark: RAG answer cache on a Zipf query stream.
+
+Retrieves the results of every query once, then replays the stream through
+`RAGGenerator.generate_response` with the offline stub LLM client and a
+simulated LLM latency, without the answer cache, with the in-memory cache,
+and after a "restart" on a disk-backed cache warmed by a previous run.
+Reports LLM calls, hit rate, wall time and the latency / tokens / cost the
+cache reports as saved.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_rag_cache --queries 2000 --pool 300 --llm-delay 0.02
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.harness.queries import title_vocabulary, zipf_queries
+from myapp.generation.rag import RAGGenerator
+from myapp.generation.rag_cache import RAGResponseCache
+from myapp.generation.stub_client import StubLLMClient
+from myapp.search import algorithms
+from myapp.search.index_snapshot import ENRICHED_PATH
+from myapp.search.load_corpus import load_product_store
+
+
+def _replay(generator: RAGGenerator, stream, results):
+    t0 = time.perf_counter()
+    answers = [generator.generate_response(q, results[q]) for q in stream]
+    return answers, time.perf_counter() - t0
+
+def _report(name: str, client: StubLLMClient, wall: float, n: int, cache=None):
+    line = f"{name:<22}{client.calls:>10}{wall:>10.2f}{wall / n * 1e3:>12.2f}"
+    if cache is not None:
+        s = cache.stats()
+        line += f"{s['hit_rate']:>9.3f}{s['saved_seconds']:>10.2f}{s['saved_tokens']:>12}{s['saved_cost_usd']:>11.5f}"
+    print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--pool", type=int, default=300, help="distinct queries")
+    parser.add_argument("--zipf-s", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-delay", type=float, default=0.02, help="simulated LLM latency (s)")
+    parser.add_argument("--cache-size", type=int, default=512)
+    args = parser.parse_args()
+
+    corpus = load_product_store(ENRICHED_PATH)
+    stream = zipf_queries(title_vocabulary(), args.queries, args.zipf_s, args.pool, args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = {q: algorithms.search_in_corpus(q, 0, corpus) for q in set(stream)}
+    print(f"{len(stream)} queries ({len(results)} distinct), simulated LLM latency {args.llm_delay * 1e3:.0f} ms")
+    print(f"\n{'run':<22}{'LLM calls':>10}{'wall s':>10}{'ms/query':>12}{'hit rate':>9}"
+          f"{'saved s':>10}{'saved tok':>12}{'saved $':>11}")
+
+    client = StubLLMClient(delay=args.llm_delay)
+    uncached, wall = _replay(RAGGenerator(client, cache=RAGResponseCache(0)), stream, results)
+    _report("no cache", client, wall, len(stream))
+
+    client = StubLLMClient(delay=args.llm_delay)
+    cache = RAGResponseCache(args.cache_size)
+    cached, wall = _replay(RAGGenerator(client, cache=cache), stream, results)
+    _report("memory cache", client, wall, len(stream), cache)
+    assert cached == uncached, "cached answers differ from uncached ones"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "rag_cache.sqlite"
+        client = StubLLMClient(delay=args.llm_delay)
+        cache = RAGResponseCache(args.cache_size, path)
+        _, wall = _replay(RAGGenerator(client, cache=cache), stream, results)
+        _report("disk cache, cold", client, wall, len(stream), cache)
+        cache.close()
+
+        client = StubLLMClient(delay=args.llm_delay)
+        cache = RAGResponseCache(args.cache_size, path)
+        _, wall = _replay(RAGGenerator(client, cache=cache), stream, results)
+        _report("disk cache, restarted", client, wall, len(stream), cache)
+        cache.close()
@@ -0,0 +1,110 @@
+"""
+Benchmark: RAG prompt size, LLM latency and answer drift under context packing.
+
+Builds the RAG prompt of a set of Zipf-sampled queries unpacked (every
+top_N product, RAG_CONTEXT_TOKENS=0) and packed at several token budgets,
+and reports the estimated prompt tokens, products kept, prompt build time
+and LLM latency. The LLM is the offline stub with a per-prompt-token delay
+(or Groq itself with --groq). "Best Product" drift is the share of queries
+whose recommended PID differs from the unpacked prompt's, both for the
+stub's "first" strategy (top listed product) and its "best_value" one
+(highest helper_score in context), or for Groq's actual answers.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_rag_packing --queries 100 --budgets 400 600 800 1000 1500
+    python -m benchmarks.bench_rag_packing --queries 30 --groq      # needs GROQ_API_KEY
+"""
+import argparse
+import contextlib
+import io
+import re
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.harness.queries import title_vocabulary, zipf_queries
+from myapp.generation.context_packing import estimate_tokens
+from myapp.generation.rag import RAGGenerator
+from myapp.generation.rag_cache import RAGResponseCache
+from myapp.generation.stub_client import StubLLMClient
+from myapp.search import algorithms
+from myapp.search.index_snapshot import ENRICHED_PATH
+from myapp.search.load_corpus import load_product_store
+
+_BEST_RE = re.compile(r"Best Product:\s*(\S+)")
+
+
+def _best(answer: str) -> str:
+    m = _BEST_RE.search(answer)
+    return m.group(1) if m else ""
+
+def _run(budget: int, queries, results, client) -> dict:
+    gen = RAGGenerator(client, cache=RAGResponseCache(0), context_tokens=budget)
+    tokens, products, build_us, latency, best = [], [], [], [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        _, request, _ = gen._request(q, results[q], 20)
+        build_us.append((time.perf_counter() - t0) * 1e6)
+        prompt = request["messages"][-1]["content"]
+        tokens.append(sum(estimate_tokens(m["content"]) for m in request["messages"]))
+        products.append(prompt.count(". PID: "))
+        t0 = time.perf_counter()
+        answer = client.chat.completions.create(**request).choices[0].message.content
+        latency.append(time.perf_counter() - t0)
+        best.append(_best(answer))
+    return {"tokens": tokens, "products": products, "build_us": build_us, "latency": latency, "best": best}
+
+def _drift(best, base) -> float:
+    return sum(a != b for a, b in zip(best, base)) / len(base)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=100, help="distinct queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[400, 600, 800, 1000, 1500])
+    parser.add_argument("--token-delay", type=float, default=5e-5, help="stub latency per prompt token (s)")
+    parser.add_argument("--groq", action="store_true", help="call Groq instead of the stub")
+    args = parser.parse_args()
+
+    corpus = load_product_store(ENRICHED_PATH)
+    pool = zipf_queries(title_vocabulary(), args.queries * 20, 1.0, args.queries * 4, args.seed)
+    queries = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = {}
+        for q in dict.fromkeys(pool):
+            r = algorithms.search_in_corpus(q, 0, corpus)
+            if len(r) >= 5:
+                results[q] = r
+                queries.append(q)
+            if len(queries) == args.queries:
+                break
+    print(f"{len(queries)} queries with >= 5 results, "
+          f"{'Groq' if args.groq else f'stub LLM at {args.token_delay * 1e6:.0f} us/prompt token'}")
+
+    if args.groq:
+        clients = {"groq": RAGGenerator(cache=RAGResponseCache(0))._client()}
+        if clients["groq"] is None:
+            raise SystemExit("GROQ_API_KEY is not set")
+    else:
+        clients = {"first": StubLLMClient(token_delay=args.token_delay), "best_value": StubLLMClient(strategy="best_value")}
+
+    runs = {}
+    for budget in [0] + args.budgets:
+        runs[budget] = {name: _run(budget, queries, results, client) for name, client in clients.items()}
+
+    timing = next(iter(clients))
+    base = runs[0][timing]
+    print(f"\n{'budget':>8}{'tokens':>9}{'p95 tok':>9}{'products':>10}{'build us':>10}{'LLM ms':>9}"
+          + "".join(f"{f'drift {n}':>18}" for n in clients))
+    for budget, by_client in runs.items():
+        r = by_client[timing]
+        print(f"{budget or 'unpacked':>8}{statistics.mean(r['tokens']):>9.0f}{np.percentile(r['tokens'], 95):>9.0f}"
+              f"{statistics.mean(r['products']):>10.1f}{statistics.median(r['build_us']):>10.0f}"
+              f"{statistics.mean(r['latency']) * 1e3:>9.1f}"
+              + "".join(f"{_drift(by_client[n]['best'], runs[0][n]['best']):>18.1%}" for n in clients))
+    for budget in args.budgets:
+        r = runs[budget][timing]
+        print(f"budget {budget}: prompt tokens {statistics.mean(r['tokens']) / statistics.mean(base['tokens']) - 1:+.1%}, "
+              f"LLM latency {statistics.mean(r['latency']) / statistics.mean(base['latency']) - 1:+.1%}")
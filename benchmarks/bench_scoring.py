@@ -0,0 +1,124 @@
+"""
+Microbenchmark: per-doc Python scoring loops vs the vectorized ScoringEngine.
+
+Queries are sampled from the snapshot vocab with probability proportional to
+document frequency (broad, OR-fallback style queries). For every query length
+both implementations score the full OR candidate set; results are checked for
+equality (within float tolerance) and median latencies are reported.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_scoring --lengths 1 2 4 8 --queries 200
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+
+from myapp.search.index_snapshot import SNAPSHOT_PATH, IndexSnapshot, load_or_build_snapshot
+from myapp.search.scoring import ScoringEngine, top_k
+
+
+# Reference: the per-candidate loops the engine replaces
+def _term_values(snap: IndexSnapshot, t: str, values: np.ndarray) -> Dict[int, float]:
+    rng = snap.term_range(t)
+    if rng is None:
+        return {}
+    s, e = rng
+    return dict(zip(snap.term_docs(snap.term_ids[t]).tolist(), values[s:e].tolist()))
+
+def _term_idf(snap: IndexSnapshot, t: str, idf: np.ndarray) -> float:
+    tid = snap.term_ids.get(t)
+    return 0.0 if tid is None else float(idf[tid])
+
+def reference_bm25(snap: IndexSnapshot, q_terms: List[str], cand_ids: List[int], k1=1.5, b=0.75) -> Dict[int, float]:
+    q_unique = list(set(q_terms))
+    tf_maps = {t: _term_values(snap, t, snap.post_tf) for t in q_unique}
+    q_idf = {t: _term_idf(snap, t, snap.idf_bm25) for t in q_unique}
+    scores = {}
+    for did in cand_ids:
+        dl = int(snap.doc_len[did])
+        if dl == 0:
+            continue
+        s = 0.0
+        for t in q_unique:
+            f = tf_maps[t].get(did, 0)
+            if f <= 0:
+                continue
+            denom = f + k1 * (1.0 - b + b * dl / snap.avg_doc_len)
+            s += q_idf[t] * (f * (k1 + 1.0) / denom)
+        if s != 0:
+            scores[did] = s
+    return scores
+
+def reference_tfidf(snap: IndexSnapshot, q_terms: List[str], cand_ids: List[int]) -> Dict[int, float]:
+    q_w = {}
+    q_sq = 0.0
+    for t, f in Counter(q_terms).items():
+        w = (1.0 + math.log2(f)) * _term_idf(snap, t, snap.idf_tfidf)
+        if w != 0:
+            q_w[t] = w
+            q_sq += w * w
+    q_norm = math.sqrt(q_sq)
+    if q_norm == 0:
+        return {}
+    d_w = {t: _term_values(snap, t, snap.post_tfidf) for t in q_w}
+    scores = {}
+    for did in cand_ids:
+        d_norm = float(snap.doc_norms[did])
+        if d_norm == 0.0:
+            continue
+        dot = sum(q_w[t] * d_w[t].get(did, 0.0) for t in q_w)
+        if dot > 0:
+            scores[did] = dot / (q_norm * d_norm)
+    return scores
+
+
+def sample_queries(snap: IndexSnapshot, length: int, n: int, seed: int = 0) -> List[List[str]]:
+    rng = random.Random(seed + length)
+    terms = list(snap.term_ids)
+    df = np.diff(snap.term_ptr).astype(np.float64)
+    weights = (df / df.sum()).tolist()
+    return [rng.choices(terms, weights, k=length) for _ in range(n)]
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+def _same(ref: Dict[int, float], ids: np.ndarray, scores: np.ndarray, tol: float = 1e-5) -> bool:
+    if set(ref) != set(ids.tolist()):
+        return False
+    return all(abs(ref[d] - s) <= tol * max(1.0, abs(s)) for d, s in zip(ids.tolist(), scores.tolist()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1, 2, 3, 4, 6, 8])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    snap = load_or_build_snapshot(SNAPSHOT_PATH)
+    engine = ScoringEngine(snap)
+    print(f"{snap.n_docs} docs, {snap.n_terms} terms")
+    print(f"{'method':<7}{'len':>4}{'cands':>9}{'loop ms':>10}{'numpy ms':>10}{'speedup':>9}  equal")
+
+    for method in ["bm25", "tfidf"]:
+        ref_fn = reference_bm25 if method == "bm25" else reference_tfidf
+        vec_fn = engine.bm25 if method == "bm25" else engine.tfidf
+        for length in args.lengths:
+            t_ref, t_vec, n_cands, equal = [], [], [], True
+            for q in sample_queries(snap, length, args.queries):
+                cands = sorted(set().union(*(snap.postings(t).tolist() for t in q)))
+                ref, dt_ref = _timed(lambda: sorted(ref_fn(snap, q, cands).items(), key=lambda x: x[1], reverse=True)[:args.k])
+                (ids, scores), dt_vec = _timed(lambda: top_k(*vec_fn(q), args.k))
+                equal &= _same(dict(ref), ids, scores)
+                t_ref.append(dt_ref); t_vec.append(dt_vec); n_cands.append(len(cands))
+            m_ref, m_vec = statistics.median(t_ref) * 1e3, statistics.median(t_vec) * 1e3
+            print(f"{method:<7}{length:>4}{int(statistics.median(n_cands)):>9}"
+                  f"{m_ref:>10.2f}{m_vec:>10.2f}{m_ref / max(m_vec, 1e-9):>8.1f}x  {equal}")
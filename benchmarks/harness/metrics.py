@@ -0,0 +1,66 @@
+"""
+Relevance metrics of the Part 2 evaluation (same definitions as
+`part2_code.ipynb`): binary labels, unjudged docs count as not relevant,
+recall / AP are relative to the labelled relevant docs of the query.
+"""
+import math
+from typing import Dict, List
+
+RELEVANCE_METRICS = ["precision", "recall", "ap", "ndcg", "rr"]
+
+
+def precision_at_k(rel_ranked: List[int], k: int) -> float:
+    """P@K = (# relevant in top-K) / K."""
+    if k <= 0:
+        return 0.0
+    return sum(rel_ranked[:k]) / k
+
+def recall_at_k(rel_ranked: List[int], k: int, total_relevant: int) -> float:
+    """R@K = (# relevant in top-K) / (# relevant for this query)."""
+    if total_relevant <= 0:
+        return 0.0
+    return sum(rel_ranked[:k]) / total_relevant
+
+def average_precision_at_k(rel_ranked: List[int], k: int, total_relevant: int) -> float:
+    """AP@K = sum of P@i at the relevant ranks i <= K, over the total relevant."""
+    if total_relevant <= 0:
+        return 0.0
+    ap_sum = 0.0
+    for i in range(1, min(k, len(rel_ranked)) + 1):
+        if rel_ranked[i - 1] == 1:
+            ap_sum += precision_at_k(rel_ranked, i)
+    return ap_sum / total_relevant
+
+def dcg_at_k(rel_ranked: List[int], k: int) -> float:
+    """DCG@K with gains 2^rel - 1 and a log2(i + 1) discount (1-based ranks)."""
+    return sum((2 ** rel - 1) / math.log2(i + 1) for i, rel in enumerate(rel_ranked[:max(k, 0)], start=1))
+
+def ndcg_at_k(rel_ranked: List[int], k: int) -> float:
+    """NDCG@K = DCG@K / IDCG@K, where IDCG is DCG of rels sorted descending."""
+    idcg = dcg_at_k(sorted(rel_ranked, reverse=True), k)
+    return dcg_at_k(rel_ranked, k) / idcg if idcg else 0.0
+
+def reciprocal_rank(rel_ranked: List[int]) -> float:
+    for i, rel in enumerate(rel_ranked, start=1):
+        if rel == 1:
+            return 1.0 / i
+    return 0.0
+
+
+def evaluate_ranking(ranked_pids: List[str], labels: Dict[str, int], k: int) -> Dict[str, float]:
+    """All RELEVANCE_METRICS at cutoff k for one query."""
+    rel_ranked = [int(labels.get(pid, 0)) for pid in ranked_pids[:k]]
+    total_relevant = sum(1 for v in labels.values() if v == 1)
+    return {
+        "precision": precision_at_k(rel_ranked, k),
+        "recall": recall_at_k(rel_ranked, k, total_relevant),
+        "ap": average_precision_at_k(rel_ranked, k, total_relevant),
+        "ndcg": ndcg_at_k(rel_ranked, k),
+        "rr": reciprocal_rank(rel_ranked),
+    }
+
+def mean_metrics(per_query: List[Dict[str, float]]) -> Dict[str, float]:
+    """Means over queries (MAP = mean AP, MRR = mean RR)."""
+    if not per_query:
+        return {m: 0.0 for m in RELEVANCE_METRICS}
+    return {m: sum(q[m] for q in per_query) / len(per_query) for m in RELEVANCE_METRICS}
@@ -0,0 +1,65 @@
+"""
+Query sets of the benchmark: the labelled queries of
+`data/annotations/queries_label_template.csv` and a synthetic stream with
+Zipf-distributed query popularity over queries whose words are themselves
+drawn Zipf-distributed from the catalog's title vocabulary.
+"""
+import csv
+import json
+import random
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from myapp.search.index_snapshot import DATA_DIR, ENRICHED_PATH
+
+LABELS_PATH = DATA_DIR / "annotations" / "queries_label_template.csv"
+
+# words per synthetic query: 1..4 with these weights
+QUERY_LENGTHS = [1, 2, 3, 4]
+LENGTH_WEIGHTS = [0.3, 0.35, 0.2, 0.15]
+
+_WORD_RE = re.compile(r"[a-z]{2,}")
+
+
+def load_labelled(path: Path = LABELS_PATH) -> Tuple[Dict[str, str], Dict[str, Dict[str, int]]]:
+    """(query id -> text, query id -> {pid: 0/1}); rows without a 1 label count as 0."""
+    texts: Dict[str, str] = {}
+    labels: Dict[str, Dict[str, int]] = {}
+    if not path.exists():
+        return texts, labels
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            qid = str(row["query_id"]).strip()
+            texts[qid] = (row.get("query_text") or "").strip()
+            labels.setdefault(qid, {})[str(row["pid"]).strip()] = 1 if str(row.get("label") or "").strip() == "1" else 0
+    return texts, labels
+
+def _zipf_weights(n: int, s: float) -> List[float]:
+    return [1.0 / (r ** s) for r in range(1, n + 1)]
+
+def title_vocabulary(path: Path = ENRICHED_PATH) -> List[str]:
+    """Title words of the catalog, most frequent first."""
+    with open(path, "r", encoding="utf-8") as f:
+        docs = json.load(f)
+    counts = Counter(w for d in docs for w in _WORD_RE.findall(str(d.get("title") or "").lower()))
+    return [w for w, _ in counts.most_common()]
+
+def zipf_queries(vocab: List[str], n: int, s: float = 1.0, pool_size: int = 2000, seed: int = 0) -> List[str]:
+    """
+    `n` raw queries: a pool of `pool_size` distinct synthetic queries (words
+    Zipf(s) over `vocab` rank), replayed with Zipf(s) popularity over the pool.
+    """
+    rng = random.Random(seed)
+    word_w = _zipf_weights(len(vocab), s)
+    pool, seen = [], set()
+    for _ in range(pool_size * 10):
+        if len(pool) >= pool_size:
+            break
+        words = rng.choices(vocab, word_w, k=rng.choices(QUERY_LENGTHS, LENGTH_WEIGHTS)[0])
+        q = " ".join(dict.fromkeys(words))
+        if q not in seen:
+            seen.add(q)
+            pool.append(q)
+    return rng.choices(pool, _zipf_weights(len(pool), s), k=n)
@@ -0,0 +1,240 @@
+"""
+Retrieval benchmark: latency, throughput, memory and relevance of every
+ranker over a reproducible query set, written as JSON and compared against
+a stored baseline.
+
+The query stream is the labelled queries plus `--queries` synthetic
+Zipf-distributed ones (see queries.py), replayed through the serving
+pipeline (analyze_query -> rank_documents -> build_results) once per
+method. Relevance (P@K, R@K, MAP, nDCG@K, MRR) is computed on the
+labelled queries. Regressions against the baseline use a relative
+tolerance for latency / QPS / memory and an absolute one for relevance.
+
+Usage (from the repo root):
+    python -m benchmarks.harness.run --queries 5000
+    python -m benchmarks.harness.run --save-baseline          # store this run as the baseline
+    python -m benchmarks.harness.run --fail-on-regression     # exit 1 if anything regressed
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import psutil
+
+from benchmarks.harness.metrics import RELEVANCE_METRICS, evaluate_ranking, mean_metrics
+from benchmarks.harness.queries import load_labelled, title_vocabulary, zipf_queries
+
+HARNESS_DIR = Path(__file__).resolve().parent
+RESULTS_PATH = HARNESS_DIR / "results.json"
+BASELINE_PATH = HARNESS_DIR / "baseline.json"
+METHODS = ["bm25", "tfidf", "custom"]
+PERCENTILES = [50, 95, 99]
+
+
+def _rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 1e6
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak * 1024 / 1e6
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+# Runs
+def run_latency(algorithms, corpus, queries: List[str], method: str, k: int, use_and: bool) -> Dict[str, Any]:
+    """Per-query wall time of the serving pipeline (cold query-analysis memo at the start)."""
+    algorithms._analyzer.clear()
+    lat = np.empty(len(queries))
+    stages = np.zeros(3)
+    start = time.perf_counter()
+    for i, q in enumerate(queries):
+        t0 = time.perf_counter()
+        q_terms, neg_terms = algorithms.analyze_query(q)
+        t1 = time.perf_counter()
+        ids, scores = algorithms.rank_documents(q_terms, neg_terms, method=method, k=k, use_and=use_and)
+        t2 = time.perf_counter()
+        algorithms.build_results(ids, scores, corpus)
+        t3 = time.perf_counter()
+        lat[i] = t3 - t0
+        stages += (t1 - t0, t2 - t1, t3 - t2)
+    wall = time.perf_counter() - start
+    lat_ms = lat * 1e3
+    return {
+        "latency_ms": {**{f"p{p}": float(np.percentile(lat_ms, p)) for p in PERCENTILES},
+                       "mean": float(lat_ms.mean()), "max": float(lat_ms.max())},
+        "qps": len(queries) / wall if wall else 0.0,
+        "stage_mean_ms": dict(zip(["analyze", "rank", "build_results"], (stages / len(queries) * 1e3).tolist())),
+    }
+
+def run_relevance(algorithms, texts: Dict[str, str], labels: Dict[str, Dict[str, int]],
+                  method: str, k: int, use_and: bool) -> Dict[str, Any]:
+    per_query = {}
+    for qid, text in texts.items():
+        q_terms, neg_terms = algorithms.analyze_query(text)
+        ids, _ = algorithms.rank_documents(q_terms, neg_terms, method=method, k=k, use_and=use_and)
+        per_query[qid] = evaluate_ranking([algorithms.pid_of(d) for d in ids.tolist()], labels[qid], k)
+    return {"k": k, "queries": len(per_query), "mean": mean_metrics(list(per_query.values())), "per_query": per_query}
+
+
+# Baseline comparison
+def _checks(results: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """(metric path, better direction, tolerance kind) of every compared value."""
+    out = [("memory.peak_rss_mb", "lower", "relative")]
+    for method in results["methods"]:
+        base = f"methods.{method}"
+        out += [(f"{base}.latency_ms.p{p}", "lower", "relative") for p in PERCENTILES]
+        out.append((f"{base}.qps", "higher", "relative"))
+        out += [(f"{base}.relevance.mean.{m}", "higher", "absolute") for m in RELEVANCE_METRICS]
+    return out
+
+def _lookup(d: Dict[str, Any], path: str):
+    for part in path.split("."):
+        if not isinstance(d, dict) or part not in d:
+            return None
+        d = d[part]
+    return d
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], rel_tol: float, abs_tol: float) -> List[Dict[str, Any]]:
+    """One row per compared metric; `regression` is set when it got worse beyond the tolerance."""
+    rows = []
+    for path, better, kind in _checks(results):
+        cur, old = _lookup(results, path), _lookup(baseline, path)
+        if cur is None or old is None:
+            continue
+        delta = cur - old
+        worse = -delta if better == "higher" else delta
+        if kind == "relative":
+            change = delta / old if old else 0.0
+            regression = old > 0 and worse / old > rel_tol
+        else:
+            change = delta
+            regression = worse > abs_tol
+        rows.append({"metric": path, "baseline": old, "current": cur, "change": change,
+                     "kind": kind, "regression": bool(regression)})
+    return rows
+
+def _print_comparison(rows: List[Dict[str, Any]]):
+    print(f"\n{'metric':<44}{'baseline':>11}{'current':>11}{'change':>10}")
+    for r in rows:
+        change = f"{r['change'] * 100:+.1f}%" if r["kind"] == "relative" else f"{r['change']:+.3f}"
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['metric']:<44}{r['baseline']:>11.3f}{r['current']:>11.3f}{change:>10}{flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--methods", nargs="+", default=METHODS, choices=METHODS)
+    parser.add_argument("--queries", type=int, default=5000, help="synthetic queries in the stream")
+    parser.add_argument("--pool", type=int, default=2000, help="distinct synthetic queries")
+    parser.add_argument("--zipf-s", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--k", type=int, default=20, help="results per query (as served)")
+    parser.add_argument("--eval-k", type=int, default=10, help="cutoff of the relevance metrics")
+    parser.add_argument("--or", dest="use_and", action="store_false", help="OR semantics instead of AND")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--out", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative, latency / QPS / memory")
+    parser.add_argument("--relevance-tolerance", type=float, default=0.005, help="absolute, relevance metrics")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    rss_start = _rss_mb()
+    t0 = time.perf_counter()
+    from myapp.search import algorithms
+    from myapp.search.index_snapshot import ENRICHED_PATH, SNAPSHOT_PATH
+    from myapp.search.load_corpus import load_product_store
+    corpus = load_product_store(ENRICHED_PATH)
+    load_s = time.perf_counter() - t0
+    rss_loaded = _rss_mb()
+
+    texts, labels = load_labelled()
+    stream = list(texts.values()) + zipf_queries(title_vocabulary(), args.queries, args.zipf_s, args.pool, args.seed)
+    print(f"{algorithms.index_view().n_docs} docs loaded in {load_s:.2f}s | {len(stream)} queries "
+          f"({len(set(stream))} distinct, {len(texts)} labelled)")
+
+    for q in stream[:args.warmup]:
+        algorithms.rank_documents(*algorithms.analyze_query(q), k=args.k, use_and=args.use_and)
+
+    methods = {}
+    for method in args.methods:
+        methods[method] = run_latency(algorithms, corpus, stream, method, args.k, args.use_and)
+        methods[method]["relevance"] = run_relevance(algorithms, texts, labels, method, args.eval_k, args.use_and)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "n_docs": algorithms.index_view().n_docs,
+            "snapshot_checksum": algorithms.index_stats()["checksum"],
+            "candidate_backend": algorithms.CANDIDATE_BACKEND,
+        },
+        "config": {
+            "queries": args.queries, "pool": args.pool, "zipf_s": args.zipf_s, "seed": args.seed,
+            "k": args.k, "eval_k": args.eval_k, "use_and": args.use_and, "labelled": len(texts),
+        },
+        "load_s": load_s,
+        "memory": {
+            "rss_start_mb": rss_start,
+            "rss_loaded_mb": rss_loaded,
+            "rss_end_mb": _rss_mb(),
+            "peak_rss_mb": _peak_rss_mb(),
+            "snapshot_file_mb": SNAPSHOT_PATH.stat().st_size / 1e6,
+            "corpus_columns_mb": corpus.nbytes / 1e6,
+        },
+        "methods": methods,
+    }
+
+    print(f"\n{'method':<8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'QPS':>9}"
+          + "".join(f"{f'{m}@{args.eval_k}':>13}" for m in RELEVANCE_METRICS))
+    for method, r in methods.items():
+        lat, rel = r["latency_ms"], r["relevance"]["mean"]
+        print(f"{method:<8}{lat['p50']:>9.3f}{lat['p95']:>9.3f}{lat['p99']:>9.3f}{r['qps']:>9.0f}"
+              + "".join(f"{rel[m]:>13.3f}" for m in RELEVANCE_METRICS))
+    mem = results["memory"]
+    print(f"memory: {mem['rss_loaded_mb'] - mem['rss_start_mb']:.1f} MB RSS for index + corpus, "
+          f"peak RSS {mem['peak_rss_mb']:.1f} MB")
+
+    regressions = []
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        for key in ("snapshot_checksum", "n_docs"):
+            if baseline["meta"].get(key) != results["meta"][key]:
+                print(f"warning: baseline {key} differs ({baseline['meta'].get(key)} vs {results['meta'][key]})")
+        if baseline.get("config") != results["config"]:
+            print("warning: baseline was run with a different config:", baseline.get("config"))
+        rows = compare(results, baseline, args.tolerance, args.relevance_tolerance)
+        _print_comparison(rows)
+        regressions = [r for r in rows if r["regression"]]
+        results["comparison"] = {"baseline": str(args.baseline), "rows": rows, "regressions": len(regressions)}
+        print(f"{len(regressions)} regression(s) against {args.baseline}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"results written to {args.out}")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"baseline saved to {args.baseline}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
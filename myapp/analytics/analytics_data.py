@@ -1,33 +1,128 @@
 import json
 import random
+import threading
 import time
-from collections import Counter
-from typing import Dict, List, Any, Optional, Tuple
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Deque, Dict, List, Any, Optional, Tuple, Union
 
 import altair as alt
 import pandas as pd
 
+from myapp.analytics.event_store import SCHEMA, EventStore
+from myapp.analytics.sketches import HyperLogLog, SpaceSaving
+
+# Bounds of the dashboard aggregates (memory and per-render cost do not grow with traffic)
+TOP_CAPACITY = 1000        # queries / terms / intent clusters tracked by the top-k sketches
+PAIR_CAPACITY = 10000      # term pairs of the co-occurrence heatmap
+SESSION_CAPACITY = 100     # most recently active sessions kept for session_paths
+SESSION_PATH_LENGTH = 50   # last requests kept per session
+
 
 class AnalyticsData:
     """
-    In-memory analytics storage for Part 4.
-    Tables:
+    Analytics storage for Part 4.
+    Tables (persisted in an append-only SQLite event log, see EventStore):
       - requests
       - queries
       - clicks
       - dwell_times
       - fact_clicks (quick counter)
+
+    The table attributes only hold the last `hot_window` events of each
+    table. The dashboard aggregates over the full history are updated as
+    each event is registered (running totals, Space-Saving top-k sketches,
+    HyperLogLog distinct counts), so the dashboard helpers cost the same
+    whatever the history size; on start-up they are rebuilt by replaying
+    the log. With `db_path=None` the log is in memory and lost on exit.
     """
 
-    def __init__(self):
+    def __init__(self, db_path: Optional[Union[str, Path]] = None, hot_window: int = 10000,
+                 batch_size: int = 500, flush_interval: float = 1.0):
+        self.store = EventStore(db_path, batch_size=batch_size, flush_interval=flush_interval)
+
+        # guards the tables and aggregates (events may be applied from a background thread)
+        self._lock = threading.RLock()
+
         # quick stats counter (pid -> click count)
         self.fact_clicks: Dict[str, int] = {}
 
-        # "tables"
-        self.requests: List[Dict[str, Any]] = []
-        self.queries: List[Dict[str, Any]] = []
-        self.clicks: List[Dict[str, Any]] = []
-        self.dwell_times: List[Dict[str, Any]] = []
+        # "tables": recent events only
+        self.requests: Deque[Dict[str, Any]] = deque(maxlen=hot_window)
+        self.queries: Deque[Dict[str, Any]] = deque(maxlen=hot_window)
+        self.clicks: Deque[Dict[str, Any]] = deque(maxlen=hot_window)
+        self.dwell_times: Deque[Dict[str, Any]] = deque(maxlen=hot_window)
+
+        # incremental aggregates
+        self.totals = {"requests": 0, "queries": 0, "clicks": 0, "dwell_times": 0, "dwell_over_5s": 0}
+        self.dwell_sum = 0.0
+        self._query_counts = SpaceSaving(TOP_CAPACITY)
+        self._term_counts = SpaceSaving(TOP_CAPACITY)
+        self._intent_counts = SpaceSaving(TOP_CAPACITY)
+        self._term_pairs = SpaceSaving(PAIR_CAPACITY)
+        self._unique_queries = HyperLogLog()
+        self._unique_terms = HyperLogLog()
+        self._hourly = [0] * 24
+        self._paths: "OrderedDict[Optional[str], Deque[str]]" = OrderedDict()
+
+        self._count = {
+            "requests": self._count_request,
+            "queries": self._count_query,
+            "clicks": self._count_click,
+            "dwell_times": self._count_dwell,
+        }
+        self._replay()
+
+    def _append(self, table: str, row: Dict[str, Any]):
+        with self._lock:
+            getattr(self, table).append(row)
+            self._count[table](row)
+        self.store.append(table, row)
+
+    def _replay(self):
+        """Rebuild the aggregates from the events already in the log."""
+        for table in SCHEMA:
+            for row in self.store.iter_rows(table):
+                if table == "queries":
+                    row["terms"] = json.loads(row["terms"])
+                self._count[table](row)
+
+    # Aggregate updates: O(1) per event (O(terms^2) per query for the heatmap pairs)
+    def _count_request(self, row: Dict[str, Any]):
+        self.totals["requests"] += 1
+        sid = row["session_id"]
+        path = self._paths.get(sid)
+        if path is None:
+            path = self._paths[sid] = deque(maxlen=SESSION_PATH_LENGTH)
+            if len(self._paths) > SESSION_CAPACITY:
+                self._paths.popitem(last=False)
+        else:
+            self._paths.move_to_end(sid)
+        path.append(row["path"])
+
+    def _count_query(self, row: Dict[str, Any]):
+        self.totals["queries"] += 1
+        self._query_counts.add(row["query"])
+        self._unique_queries.add(row["query"])
+        for t in row["terms"]:
+            self._term_counts.add(t)
+            self._unique_terms.add(t)
+        unique = sorted(set(row["terms"]))
+        self._intent_counts.add(" ".join(unique))
+        for t1 in unique:
+            for t2 in unique:
+                self._term_pairs.add((t1, t2))
+        self._hourly[time.localtime(row["ts"]).tm_hour] += 1
+
+    def _count_click(self, row: Dict[str, Any]):
+        self.totals["clicks"] += 1
+        self.fact_clicks[row["pid"]] = self.fact_clicks.get(row["pid"], 0) + 1
+
+    def _count_dwell(self, row: Dict[str, Any]):
+        self.totals["dwell_times"] += 1
+        self.dwell_sum += row["dwell_seconds"]
+        if row["dwell_seconds"] >= 5:
+            self.totals["dwell_over_5s"] += 1
 
     # Requests
     def register_request(
@@ -39,7 +134,7 @@ class AnalyticsData:
         session_id: Optional[str] = None,
         ts: Optional[float] = None
     ):
-        self.requests.append({
+        self._append("requests", {
             "ts": ts or time.time(),
             "path": path,
             "method": method,
@@ -60,7 +155,7 @@ class AnalyticsData:
         ts: Optional[float] = None
     ):
         terms = query.split()
-        self.queries.append({
+        row = {
             "ts": ts or time.time(),
             "search_id": search_id,
             "query": query,
@@ -70,7 +165,16 @@ class AnalyticsData:
             "user_agent": user_agent,
             "browser": browser,
             "session_id": session_id
-        })
+        }
+        with self._lock:
+            self.queries.append(row)
+            self._count_query(row)
+        # terms are stored as a JSON array
+        self.store.append("queries", {**row, "terms": json.dumps(terms)})
+
+    @staticmethod
+    def new_search_id() -> int:
+        return random.randint(0, 100000)
 
     def save_query_terms(
         self,
@@ -80,7 +184,7 @@ class AnalyticsData:
         browser: Optional[str] = None,
         session_id: Optional[str] = None
     ) -> int:
-        search_id = random.randint(0, 100000)
+        search_id = self.new_search_id()
         self.register_query(
             query=terms,
             search_id=search_id,
@@ -103,7 +207,7 @@ class AnalyticsData:
         session_id: Optional[str] = None,
         ts: Optional[float] = None
     ):
-        self.clicks.append({
+        self._append("clicks", {
             "ts": ts or time.time(),
             "pid": pid,
             "search_id": search_id,
@@ -114,9 +218,6 @@ class AnalyticsData:
             "session_id": session_id
         })
 
-        # update quick stats counter
-        self.fact_clicks[pid] = self.fact_clicks.get(pid, 0) + 1
-
     # Dwell time
     def register_dwell(
         self,
@@ -125,55 +226,60 @@ class AnalyticsData:
         dwell_seconds: float,
         ts: Optional[float] = None
     ):
-        self.dwell_times.append({
+        self._append("dwell_times", {
             "ts": ts or time.time(),
             "pid": pid,
             "search_id": search_id,
             "dwell_seconds": dwell_seconds
         })
 
-    # Dashboard helpers
+    # Dashboard helpers (full history, from the incremental aggregates; ties in first-seen order)
     def top_queries(self, k: int = 10) -> List[Tuple[str, int]]:
-        counts = Counter([q["query"] for q in self.queries])
-        return counts.most_common(k)
+        with self._lock:
+            return self._query_counts.top(k)
 
     def top_terms(self, k: int = 15) -> List[Tuple[str, int]]:
-        all_terms = []
-        for q in self.queries:
-            all_terms.extend(q["terms"])
-        counts = Counter(all_terms)
-        return counts.most_common(k)
+        with self._lock:
+            return self._term_counts.top(k)
+
+    def click_counts(self) -> Dict[str, int]:
+        """Copy of fact_clicks, safe to iterate while events are being registered."""
+        with self._lock:
+            return dict(self.fact_clicks)
 
     def avg_dwell_time(self) -> float:
-        if not self.dwell_times:
-            return 0.0
-        return sum(d["dwell_seconds"] for d in self.dwell_times) / len(self.dwell_times)
+        with self._lock:
+            n = self.totals["dwell_times"]
+            return self.dwell_sum / n if n else 0.0
 
     def summary_stats(self) -> Dict[str, Any]:
-        total_searches = len(self.queries)
-        total_clicks = len(self.clicks)
-        ctr = round(total_clicks / total_searches, 3) if total_searches > 0 else 0
-
-        unique_queries = len(set(q["query"] for q in self.queries))
-        unique_terms = len(set(t for q in self.queries for t in q["terms"]))
-
-        return {
-            "total_searches": total_searches,
-            "total_clicks": total_clicks,
-            "ctr": ctr,
-            "unique_queries": unique_queries,
-            "unique_terms": unique_terms,
-            "avg_dwell": round(self.avg_dwell_time(), 2),
-            "top_queries": self.top_queries(10),
-            "top_terms": self.top_terms(15)
-        }
+        with self._lock:
+            total_searches = self.totals["queries"]
+            total_clicks = self.totals["clicks"]
+            ctr = round(total_clicks / total_searches, 3) if total_searches > 0 else 0
+
+            # HyperLogLog estimates (exact up to a few thousand)
+            unique_queries = self._unique_queries.count()
+            unique_terms = self._unique_terms.count()
+
+            return {
+                "total_searches": total_searches,
+                "total_clicks": total_clicks,
+                "ctr": ctr,
+                "unique_queries": unique_queries,
+                "unique_terms": unique_terms,
+                "avg_dwell": round(self.avg_dwell_time(), 2),
+                "top_queries": self.top_queries(10),
+                "top_terms": self.top_terms(15)
+            }
 
     # Plots for dashboard
     def plot_number_of_views(self):
-        data = [
-            {"Document ID": doc_id, "Number of Views": count}
-            for doc_id, count in self.fact_clicks.items()
-        ]
+        with self._lock:
+            data = [
+                {"Document ID": doc_id, "Number of Views": count}
+                for doc_id, count in self.fact_clicks.items()
+            ]
         df = pd.DataFrame(data)
         if df.empty:
             df = pd.DataFrame([{"Document ID": "none", "Number of Views": 0}])
@@ -213,9 +319,10 @@ class AnalyticsData:
     
     def funnel_metrics(self):
         """Compute search → click → dwell funnel."""
-        total_searches = len(self.queries)
-        total_clicks = len(self.clicks)
-        total_dwell = sum(1 for d in self.dwell_times if d["dwell_seconds"] >= 5)
+        with self._lock:
+            total_searches = self.totals["queries"]
+            total_clicks = self.totals["clicks"]
+            total_dwell = self.totals["dwell_over_5s"]
 
         return {
             "searches": total_searches,
@@ -227,32 +334,23 @@ class AnalyticsData:
 
 
     def session_paths(self):
-        """Return the sequence of actions for each session."""
-        paths = {}
-        for r in self.requests:
-            sid = r.get("session_id", "unknown")
-            paths.setdefault(sid, [])
-            paths[sid].append(r["path"])
-        return paths
+        """Return the sequence of actions of the most recently active sessions (their last requests)."""
+        with self._lock:
+            return {sid: list(path) for sid, path in self._paths.items()}
     
 
     def intent_clusters(self):
-        """Group queries by shared terms."""
-        cluster_map = {}
-        for q in self.queries:
-            key = " ".join(sorted(set(q["terms"])))  # normalize
-            cluster_map.setdefault(key, 0)
-            cluster_map[key] += 1
-        return sorted(cluster_map.items(), key=lambda x: -x[1])
+        """Group queries by shared terms (the TOP_CAPACITY most frequent clusters)."""
+        with self._lock:
+            return self._intent_counts.top()
     
 
     def plot_searches_per_hour(self):
-        df = pd.DataFrame(self.queries)
+        with self._lock:
+            rows = [(f"{h:02d}", n) for h, n in enumerate(self._hourly) if n]
+        df = pd.DataFrame(rows, columns=["hour", "count"])
         if df.empty:
             df = pd.DataFrame([{"hour": 0, "count": 0}])
-        else:
-            df["hour"] = df["ts"].apply(lambda t: time.strftime("%H", time.localtime(t)))
-            df = df.groupby("hour").size().reset_index(name="count")
 
         chart = alt.Chart(df).mark_line(point=True).encode(
             x="hour:N",
@@ -263,22 +361,13 @@ class AnalyticsData:
     
 
     def plot_term_heatmap(self, k=20):
-        from itertools import product
-
-        terms = [t for q in self.queries for t in q["terms"]]
-        top_terms = [t for t, _ in Counter(terms).most_common(k)]
-
-        # build co-occurrence matrix
-        pairs = Counter()
-        for q in self.queries:
-            unique = list(set(q["terms"]))
-            for t1, t2 in product(unique, unique):
-                pairs[(t1, t2)] += 1
-
+        # co-occurrence matrix (pairs counted as queries are registered)
         data = []
-        for t1 in top_terms:
-            for t2 in top_terms:
-                data.append({"t1": t1, "t2": t2, "count": pairs[(t1, t2)]})
+        with self._lock:
+            top_terms = [t for t, _ in self.top_terms(k)]
+            for t1 in top_terms:
+                for t2 in top_terms:
+                    data.append({"t1": t1, "t2": t2, "count": self._term_pairs[(t1, t2)]})
 
         df = pd.DataFrame(data)
 
@@ -0,0 +1,130 @@
+import atexit
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# table -> columns, in insertion order (every table also has SQLite's implicit rowid)
+SCHEMA: Dict[str, Tuple[str, ...]] = {
+    "requests": ("ts", "path", "method", "user_agent", "ip", "session_id"),
+    "queries": ("ts", "search_id", "query", "n_terms", "terms", "ip", "user_agent", "browser", "session_id"),
+    "clicks": ("ts", "pid", "search_id", "rank", "query", "ip", "user_agent", "session_id"),
+    "dwell_times": ("ts", "pid", "search_id", "dwell_seconds"),
+}
+
+
+class EventStore:
+    """
+    Append-only SQLite event log (WAL mode) with batched background writes.
+
+    `append()` only buffers the row; a writer thread inserts the buffer in
+    one transaction every `flush_interval` seconds, or as soon as
+    `batch_size` rows are waiting. `flush()` writes synchronously (readers
+    call it first to see their own writes). Reads use their own connection,
+    so with a file database they don't wait for the writer. `path=None`
+    keeps the log in an in-memory database (lost on exit).
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, batch_size: int = 500,
+                 flush_interval: float = 1.0):
+        self.path = Path(path) if path else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[Tuple[str, tuple]] = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.written = 0
+        self.batches = 0
+
+        if self.path is None:
+            # one in-memory database: reads and writes share the connection
+            self._writer = self._reader = sqlite3.connect(":memory:", check_same_thread=False)
+            self._read_lock = self._write_lock
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._writer.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: no fsync per commit, the database stays consistent on power loss
+            self._writer.execute("PRAGMA synchronous=NORMAL")
+        for table, columns in SCHEMA.items():
+            self._writer.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)})")
+        self._writer.commit()
+        if self.path is not None:
+            self._reader = sqlite3.connect(str(self.path), check_same_thread=False)
+
+        self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, table: str, row: Dict[str, Any]):
+        values = tuple(row.get(c) for c in SCHEMA[table])
+        with self._buffer_lock:
+            self._buffer.append((table, values))
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    @property
+    def pending(self) -> int:
+        with self._buffer_lock:
+            return len(self._buffer)
+
+    def flush(self):
+        # the write lock is taken first so concurrent flushes keep batches in append order
+        with self._write_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            by_table: Dict[str, List[tuple]] = {}
+            for table, values in batch:
+                by_table.setdefault(table, []).append(values)
+            with self._writer:   # one transaction per batch
+                for table, rows in by_table.items():
+                    cols = SCHEMA[table]
+                    self._writer.executemany(
+                        f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})", rows)
+            self.written += len(batch)
+            self.batches += 1
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        """Rows of a read-only query over everything appended so far."""
+        self.flush()
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def iter_rows(self, table: str, chunk: int = 10000) -> Iterator[Dict[str, Any]]:
+        """Every row of `table` as a dict, in append order (read in chunks)."""
+        self.flush()
+        cols = SCHEMA[table]
+        with self._read_lock:
+            cursor = self._reader.execute(f"SELECT {', '.join(cols)} FROM {table} ORDER BY rowid")
+            while True:
+                rows = cursor.fetchmany(chunk)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(zip(cols, row))
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Error writing analytics events: {e}")
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        if self._reader is not self._writer:
+            self._reader.close()
+        self._writer.close()
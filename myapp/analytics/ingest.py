@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from myapp.analytics.analytics_data import AnalyticsData
+
+DROP_NEWEST, DROP_OLDEST, BLOCK = "drop_newest", "drop_oldest", "block"
+POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+
+class AnalyticsIngestQueue:
+    """
+    Takes analytics writes off the request path.
+
+    Same `register_*` / `save_query_terms` calls as AnalyticsData, but each
+    one only timestamps the event and puts it on a bounded queue; a
+    background thread drains it in batches of up to `batch_size` into the
+    AnalyticsData. When the queue is full the `policy` decides:
+      - "drop_newest": the new event is dropped (the request never waits)
+      - "drop_oldest": the oldest queued event is dropped to make room
+      - "block": wait up to `block_timeout` seconds for room, then drop
+    Dropped events are counted in `stats()`. Reads still go to the
+    AnalyticsData, which lags the queue by at most one batch.
+    """
+
+    def __init__(self, analytics: AnalyticsData, maxsize: int = 10000, policy: str = DROP_NEWEST,
+                 batch_size: int = 256, block_timeout: float = 0.05):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown overflow policy {policy!r} (expected one of {', '.join(POLICIES)})")
+        self.analytics = analytics
+        self.policy = policy
+        self.batch_size = batch_size
+        self.block_timeout = block_timeout
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self.counts = {"enqueued": 0, "processed": 0, "dropped": 0, "errors": 0, "batches": 0}
+        self._thread = threading.Thread(target=self._run, name="analytics-ingest", daemon=True)
+        self._thread.start()
+
+    # Writes (same signatures as AnalyticsData)
+    def register_request(self, path: str, method: str, user_agent: str, ip: str,
+                         session_id: Optional[str] = None, ts: Optional[float] = None):
+        self._put("register_request", dict(path=path, method=method, user_agent=user_agent, ip=ip,
+                                           session_id=session_id, ts=ts or time.time()))
+
+    def register_query(self, query: str, search_id: int, ip: str, user_agent: str, browser: Optional[str] = None,
+                       session_id: Optional[str] = None, ts: Optional[float] = None):
+        self._put("register_query", dict(query=query, search_id=search_id, ip=ip, user_agent=user_agent,
+                                         browser=browser, session_id=session_id, ts=ts or time.time()))
+
+    def save_query_terms(self, terms: str, ip: str, user_agent: str, browser: Optional[str] = None,
+                         session_id: Optional[str] = None) -> int:
+        search_id = AnalyticsData.new_search_id()
+        self.register_query(query=terms, search_id=search_id, ip=ip, user_agent=user_agent,
+                            browser=browser, session_id=session_id)
+        return search_id
+
+    def register_click(self, pid: str, search_id: int, rank: Optional[float] = None, query: Optional[str] = None,
+                       ip: Optional[str] = None, user_agent: Optional[str] = None,
+                       session_id: Optional[str] = None, ts: Optional[float] = None):
+        self._put("register_click", dict(pid=pid, search_id=search_id, rank=rank, query=query, ip=ip,
+                                         user_agent=user_agent, session_id=session_id, ts=ts or time.time()))
+
+    def register_dwell(self, pid: str, search_id: int, dwell_seconds: float, ts: Optional[float] = None):
+        self._put("register_dwell", dict(pid=pid, search_id=search_id, dwell_seconds=dwell_seconds,
+                                         ts=ts or time.time()))
+
+    def _put(self, method: str, kwargs: Dict[str, Any]):
+        event = (method, kwargs)
+        try:
+            if self.policy == BLOCK:
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            if self.policy != DROP_OLDEST:
+                self._count("dropped")
+                return
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                pass
+            self._count("dropped")
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:   # refilled by other threads meanwhile
+                self._count("dropped")
+                return
+        self._count("enqueued")
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.counts[key] += n
+
+    # Drain
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            errors = 0
+            for method, kwargs in batch:
+                try:
+                    getattr(self.analytics, method)(**kwargs)
+                except Exception as e:
+                    errors += 1
+                    print(f"Error ingesting analytics event {method}: {e}")
+            with self._lock:
+                self.counts["processed"] += len(batch) - errors
+                self.counts["errors"] += errors
+                self.counts["batches"] += 1
+            for _ in batch:
+                self._queue.task_done()
+
+    def join(self):
+        """Wait until every queued event has been applied."""
+        self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"depth": self._queue.qsize(), "maxsize": self._queue.maxsize, "policy": self.policy, **self.counts}
@@ -0,0 +1,108 @@
+import hashlib
+import heapq
+import math
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-k sketch (Metwally et al.): at most `capacity` counters.
+
+    A new item replaces the least-counted one and inherits its count (kept
+    as the item's maximum overestimation in `errors`). Counts are exact as
+    long as fewer than `capacity` distinct items were seen, and any item
+    more frequent than total / capacity is always present. `add` is O(1)
+    for a tracked item and amortized O(log capacity) when it evicts.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self._first: Dict[Hashable, int] = {}
+        # one (count when pushed, first seen, item) entry per tracked item; counts may be stale
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._seq = 0
+
+    def add(self, item: Hashable, n: int = 1):
+        counts = self.counts
+        if item in counts:
+            counts[item] += n
+            return
+        error = 0
+        if len(counts) >= self.capacity:
+            heap = self._heap
+            while True:
+                count, seq, old = heap[0]
+                if counts[old] == count:
+                    break
+                heapq.heapreplace(heap, (counts[old], seq, old))
+            heapq.heappop(heap)
+            error = counts.pop(old)
+            del self.errors[old], self._first[old]
+        counts[item] = error + n
+        self.errors[item] = error
+        self._first[item] = self._seq
+        heapq.heappush(self._heap, (error + n, self._seq, item))
+        self._seq += 1
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """(item, count) by count, ties in first-seen order (like Counter.most_common)."""
+        order = lambda kv: (-kv[1], self._first[kv[0]])
+        if k is None:
+            return sorted(self.counts.items(), key=order)
+        return heapq.nsmallest(k, self.counts.items(), key=order)
+
+    def __getitem__(self, item: Hashable) -> int:
+        return self.counts.get(item, 0)
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter (Flajolet et al.) with 2**p one-byte
+    registers (16 KiB at p=14, ~0.8% standard error), using linear counting
+    for small cardinalities. Up to `exact_limit` distinct items are kept in
+    a set instead (exact counts, no hashing); past that they are hashed into
+    the registers and the set is dropped.
+    """
+
+    def __init__(self, p: int = 14, exact_limit: int = 4096):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self.exact_limit = exact_limit
+        self._exact: Optional[set] = set()
+        self._alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, item: str):
+        if self._exact is not None:
+            self._exact.add(item)
+            if len(self._exact) > self.exact_limit:
+                exact, self._exact = self._exact, None
+                for x in exact:
+                    self._add_hashed(x)
+            return
+        self._add_hashed(item)
+
+    def _add_hashed(self, item: str):
+        h = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def count(self) -> int:
+        if self._exact is not None:
+            return len(self._exact)
+        regs = np.frombuffer(self.registers, dtype=np.uint8)
+        estimate = self._alpha * self.m * self.m / float(np.ldexp(1.0, -regs.astype(np.int32)).sum())
+        zeros = int(np.count_nonzero(regs == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
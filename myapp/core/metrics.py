@@ -0,0 +1,134 @@
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest
+
+load_dotenv()  # METRICS_ENABLED may come from .env
+
+
+# Instrumentation switch (METRICS_ENABLED=0 turns every timer into a no-op)
+_enabled = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+
+# 50us .. 10s: query analysis sits at the bottom, the RAG call at the top
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+REGISTRY = CollectorRegistry()
+
+STAGE_SECONDS = Histogram(
+    "irwa_stage_seconds", "Latency of one stage of the search / RAG request path",
+    ["stage"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+REQUEST_SECONDS = Histogram(
+    "irwa_http_request_seconds", "Latency of Flask requests by route",
+    ["endpoint", "method", "status"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+
+# labelled children, resolved once per stage (labels() takes a lock and a dict lookup)
+_stages: Dict[str, object] = {}
+
+
+def enabled() -> bool:
+    return _enabled
+
+def set_enabled(on: bool):
+    global _enabled
+    _enabled = bool(on)
+
+def observe(stage: str, seconds: float):
+    if not _enabled:
+        return
+    child = _stages.get(stage)
+    if child is None:
+        child = _stages[stage] = STAGE_SECONDS.labels(stage)
+    child.observe(seconds)
+
+
+class _Timer:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.t0)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopTimer()
+
+
+def timed(stage: str):
+    """
+    Context manager recording the block's wall time in the `stage` histogram:
+
+        with timed("scoring"):
+            ...
+    """
+    return _Timer(stage) if _enabled else _NOOP
+
+
+# Flask integration
+def instrument_app(app):
+    """
+    Per-route request histograms, a "render" stage around every template and
+    the `/metrics` endpoint (Prometheus text format; 404 when disabled).
+    """
+    from flask import Response, g, request, template_rendered, before_render_template
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_t0 = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        t0 = g.pop("_metrics_t0", None)
+        if _enabled and t0 is not None:
+            # the route pattern, not the raw path, keeps the label set bounded
+            endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_SECONDS.labels(endpoint, request.method, str(response.status_code)).observe(
+                time.perf_counter() - t0)
+        return response
+
+    def _render_start(sender, template, context, **extra):
+        g._metrics_render_t0 = time.perf_counter()
+
+    def _render_done(sender, template, context, **extra):
+        t0 = g.pop("_metrics_render_t0", None)
+        if t0 is not None:
+            observe("render", time.perf_counter() - t0)
+
+    before_render_template.connect(_render_start, app, weak=False)
+    template_rendered.connect(_render_done, app, weak=False)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        body, content_type = metrics_payload()
+        if body is None:
+            return Response("metrics disabled\n", status=404, mimetype="text/plain")
+        return Response(body, content_type=content_type)
+
+    return app
+
+def metrics_payload() -> Tuple[Optional[bytes], str]:
+    if not _enabled:
+        return None, CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,52 @@
+import math
+import re
+from typing import FrozenSet, List, Sequence
+
+_WORD_RE = re.compile(r"\w+")
+
+# ~4 characters per token for English text with the Llama / GPT tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def title_words(title: str) -> FrozenSet[str]:
+    return frozenset(w.lower() for w in _WORD_RE.findall(title or ""))
+
+def is_near_duplicate(words: FrozenSet[str], kept: Sequence[FrozenSet[str]], threshold: float) -> bool:
+    """True if `words` has Jaccard similarity >= threshold with any of `kept`."""
+    for other in kept:
+        union = len(words | other)
+        if union and len(words & other) / union >= threshold:
+            return True
+    return False
+
+
+def truncate_words(text: str, max_chars: int) -> str:
+    """`text` cut at a word boundary to at most `max_chars` characters (ellipsis included)."""
+    text = " ".join((text or "").split())
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max(max_chars - 1, 0)]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip(" ,.;:-") + "…"
+
+
+def split_budget(budget: int, sizes: List[int], cap: int, floor: int) -> List[int]:
+    """
+    Token allowance per item, in order: each gets an equal share of what is
+    left (at most `cap`, at most its own size), so budget a short item does
+    not use flows to the next ones. Shares below `floor` become 0.
+    """
+    out = []
+    left = budget
+    for i, size in enumerate(sizes):
+        share = min(left // (len(sizes) - i), cap, size)
+        if share < floor:
+            share = 0
+        out.append(share)
+        left -= share
+    return out
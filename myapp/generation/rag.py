@@ -1,10 +1,19 @@
 # myapp/generation/rag.py
 import os
-from typing import List, Any, Optional
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from groq import Groq
 from dotenv import load_dotenv
 
+from myapp.core.metrics import timed
+from myapp.generation.context_packing import (
+    CHARS_PER_TOKEN, estimate_tokens, is_near_duplicate, split_budget, title_words, truncate_words,
+)
+from myapp.generation.rag_cache import DEFAULT_PRICES, RAGResponseCache
+from myapp.generation.stub_client import StubLLMClient
+
 load_dotenv()  # take environment variables from .env
 
 
@@ -16,6 +25,19 @@ class RAGGenerator:
       3) Enforce strict output + low temperature for stable, readable answers.
     """
 
+    DEFAULT_ANSWER = "RAG is not available. Check your credentials (.env file) or account limits."
+    NO_RESULTS_ANSWER = "There are no good products that fit the request based on the retrieved results."
+
+    # part of the response cache key: bump whenever the prompts or the product blocks change
+    PROMPT_VERSION = "2"
+
+    # Context packing (see _pack_results)
+    PACK_RETRIEVAL_WEIGHT = 0.7     # block priority = 0.7 * retrieval score / max + 0.3 * helper score
+    DEDUPE_JACCARD = 0.8            # title word-set similarity above which a product is a near-duplicate
+    DESCRIPTION_SHARE = 0.25        # of the budget held back from product blocks for descriptions
+    DESCRIPTION_MAX_TOKENS = 60
+    DESCRIPTION_MIN_TOKENS = 8
+
     SYSTEM_PROMPT = (
         "You are a careful, non-hallucinating product recommender. "
         "You must only use the provided retrieved products. "
@@ -49,6 +71,17 @@ You are an expert product advisor helping users choose the best option from retr
 - Alternative (optional): <PID> — <Title> (<1 sentence why it could work>)
 """
 
+    def __init__(self, client=None, cache: Optional[RAGResponseCache] = None, context_tokens: Optional[int] = None):
+        # any object with Groq's `chat.completions.create` (e.g. StubLLMClient in tests)
+        self.client = client
+        # token budget of the product blocks in the prompt; 0 = every top_N product, unpacked
+        self.context_tokens = (int(os.environ.get("RAG_CONTEXT_TOKENS", "800"))
+                               if context_tokens is None else context_tokens)
+        # answers keyed on (query, PIDs, model, prompt version); RAG_CACHE_SIZE=0 disables it
+        self.cache = cache if cache is not None else _cache_from_env()
+        self._default_client = None
+        self._client_lock = threading.Lock()
+
     def _helper_score(self, res: Any) -> float:
         """
         Simple deterministic value score to guide the LLM.
@@ -95,58 +128,237 @@ You are an expert product advisor helping users choose the best option from retr
             )
         return "\n".join(lines)
 
-    def generate_response(
-        self,
-        user_query: str,
-        retrieved_results: List[Any],
-        top_N: int = 20
-    ) -> str:
-        DEFAULT_ANSWER = (
-            "RAG is not available. Check your credentials (.env file) or account limits."
-        )
+    def _format_block(self, i: int, res: Any, helper: float, description: str = "") -> str:
+        """Like a `_format_results` entry, without fields the product does not have."""
+        brand = getattr(res, "brand", None)
+        category = getattr(res, "category", None)
+        subcat = getattr(res, "sub_category", None)
+        price_parts = [f"{label}{value}{unit}" for label, value, unit in (
+            ("Price: ", getattr(res, "selling_price", None), ""),
+            ("Actual: ", getattr(res, "actual_price", None), ""),
+            ("Discount: ", getattr(res, "discount", None), "%"),
+        ) if value is not None]
+        rating = getattr(res, "average_rating", None)
+        score = getattr(res, "ranking", None)
+
+        block = (f"{i}. PID: {getattr(res, 'pid', 'unknown')}\n"
+                 f"   Title: {getattr(res, 'title', 'unknown title')}\n")
+        if brand:
+            block += f"   Brand: {brand}\n"
+        if category or subcat:
+            block += f"   Category: {' / '.join(c for c in (category, subcat) if c)}\n"
+        if price_parts:
+            block += f"   {' | '.join(price_parts)}\n"
+        block += (f"   Rating: {f'{rating}/5' if rating is not None else 'n/a'}"
+                  f" | In stock: {not bool(getattr(res, 'out_of_stock', None))}\n"
+                  f"   retrieval_score: {round(score, 4) if score is not None else None} | helper_score: {helper}\n")
+        if description:
+            block += f"   Description: {description}\n"
+        return block
 
+    def _pack_results(self, retrieved_results: List[Any], top_N: int, budget: int) -> str:
+        """
+        Product blocks of the top_N results that fit `budget` (estimated) tokens.
+
+        Blocks are prioritised by retrieval score and helper score; a product
+        whose title is a near-duplicate of a higher-priority one is dropped.
+        Blocks are added by priority while they fit in the budget minus the
+        DESCRIPTION_SHARE (at least one always is), then the rest is shared
+        out, by priority, as truncated descriptions. The kept products are
+        listed in retrieval order.
+        """
+        results = list(retrieved_results[:top_N])
+        helpers = [self._helper_score(r) for r in results]
+        scores = [float(getattr(r, "ranking", 0) or 0) for r in results]
+        top = max(scores, default=0.0) or 1.0
+        w = self.PACK_RETRIEVAL_WEIGHT
+        priority = sorted(range(len(results)), key=lambda j: -(w * scores[j] / top + (1 - w) * helpers[j]))
+
+        block_budget = int(budget * (1 - self.DESCRIPTION_SHARE))
+        kept_titles, chosen, used = [], [], 0
+        for j in priority:
+            words = title_words(getattr(results[j], "title", ""))
+            if is_near_duplicate(words, kept_titles, self.DEDUPE_JACCARD):
+                continue
+            cost = estimate_tokens(self._format_block(len(chosen) + 1, results[j], helpers[j])) + 1
+            if chosen and used + cost > block_budget:
+                continue
+            kept_titles.append(words)
+            chosen.append(j)
+            used += cost
+
+        # descriptions: "   Description: " + text + newline
+        overhead = estimate_tokens("   Description: \n")
+        descriptions = [" ".join((getattr(results[j], "description", None) or "").split()) for j in chosen]
+        shares = split_budget(max(budget - used, 0),
+                              [estimate_tokens(d) + overhead if d else 0 for d in descriptions],
+                              self.DESCRIPTION_MAX_TOKENS + overhead, self.DESCRIPTION_MIN_TOKENS + overhead)
+        text_for = {j: truncate_words(d, (share - overhead) * CHARS_PER_TOKEN) if share else ""
+                    for j, d, share in zip(chosen, descriptions, shares)}
+
+        return "\n".join(self._format_block(i, results[j], helpers[j], text_for[j])
+                          for i, j in enumerate(sorted(chosen), start=1))
+
+    def _client(self):
+        """The injected client, else one shared stub (RAG_CLIENT=stub) or Groq client; None without credentials."""
+        if self.client is not None:
+            return self.client
+        with self._client_lock:
+            if self._default_client is None:
+                self._default_client = self._make_client()
+            return self._default_client
+
+    def _make_client(self):
+        if os.environ.get("RAG_CLIENT", "").lower() == "stub":
+            return StubLLMClient(delay=float(os.environ.get("RAG_STUB_DELAY", "0")))
+        api_key = os.environ.get("GROQ_API_KEY")
+        if not api_key:
+            return None
+        # one client (and its HTTP connection pool) for every call
+        return Groq(api_key=api_key, timeout=float(os.environ.get("RAG_TIMEOUT", "20")))
+
+    def _request(self, user_query: str, retrieved_results: List[Any],
+                 top_N: int) -> Tuple[Optional[str], Dict[str, Any], Optional[str]]:
+        """(final answer without calling the LLM, or None; chat-completion kwargs; cache key)."""
         # If nothing retrieved, skip LLM
         if not retrieved_results:
-            return "There are no good products that fit the request based on the retrieved results."
+            return self.NO_RESULTS_ANSWER, {}, None
 
         # Improvement #2: pre-filter out-of-stock items if we have enough left
         in_stock = [r for r in retrieved_results if not getattr(r, "out_of_stock", False)]
         if len(in_stock) >= 3:
             retrieved_results = in_stock
 
-        try:
-            api_key = os.environ.get("GROQ_API_KEY")
-            if not api_key:
-                return DEFAULT_ANSWER
-
-            client = Groq(api_key=api_key)
-            model_name = os.environ.get("GROQ_MODEL", "llama-3.1-8b-instant")
+        model = os.environ.get("GROQ_MODEL", "llama-3.1-8b-instant")
+        key = None
+        if self.cache is not None:
+            pids = [str(getattr(r, "pid", "unknown")) for r in retrieved_results[:top_N]]
+            key = self.cache.key(user_query, pids, model, f"{self.PROMPT_VERSION}/{self.context_tokens}")
+            with timed("rag_cache"):
+                cached = self.cache.get(key)
+            if cached is not None:
+                return cached, {}, None
 
-            formatted_results = self._format_results(retrieved_results, top_N)
+        with timed("rag_prompt"):
+            if self.context_tokens > 0:
+                formatted_results = self._pack_results(retrieved_results, top_N, self.context_tokens)
+            else:
+                formatted_results = self._format_results(retrieved_results, top_N)
 
             prompt = self.PROMPT_TEMPLATE.format(
                 retrieved_results=formatted_results,
                 user_query=user_query
             )
 
-            chat_completion = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": self.SYSTEM_PROMPT},
-                    {"role": "user", "content": prompt},
-                ],
-                model=model_name,
-                temperature=0.1,   # Improvement #3: stability
-                max_tokens=300
-            )
+        return None, dict(
+            messages=[
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            model=model,
+            temperature=0.1,   # Improvement #3: stability
+            max_tokens=300
+        ), key
+
+    def _remember(self, key: Optional[str], request: Dict[str, Any], answer: str, latency: float, usage: Any = None):
+        """Store an LLM answer with its latency and token usage (estimated at ~4 chars/token if not reported)."""
+        if key is None or self.cache is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if prompt_tokens is None:
+            prompt_tokens = sum(estimate_tokens(m["content"]) for m in request["messages"])
+        if completion_tokens is None:
+            completion_tokens = estimate_tokens(answer)
+        self.cache.put(key, answer, latency, int(prompt_tokens), int(completion_tokens))
+
+    def generate_response(
+        self,
+        user_query: str,
+        retrieved_results: List[Any],
+        top_N: int = 20
+    ) -> str:
+        with timed("rag"):
+            return self._generate_response(user_query, retrieved_results, top_N)
+
+    def _generate_response(self, user_query: str, retrieved_results: List[Any], top_N: int) -> str:
+        try:
+            answer, request, key = self._request(user_query, retrieved_results, top_N)
+            if answer is not None:
+                return answer
+            client = self._client()
+            if client is None:
+                return self.DEFAULT_ANSWER
+
+            t0 = time.perf_counter()
+            with timed("rag_llm"):
+                chat_completion = client.chat.completions.create(**request)
 
             generation = chat_completion.choices[0].message.content.strip()
 
             # if the model drifted, fallback cleanly
             if not generation:
-                return "There are no good products that fit the request based on the retrieved results."
+                return self.NO_RESULTS_ANSWER
 
+            self._remember(key, request, generation, time.perf_counter() - t0,
+                           getattr(chat_completion, "usage", None))
             return generation
 
         except Exception as e:
             print(f"Error during RAG generation: {e}")
-            return DEFAULT_ANSWER
+            return self.DEFAULT_ANSWER
+
+    def generate_stream(
+        self,
+        user_query: str,
+        retrieved_results: List[Any],
+        top_N: int = 20
+    ) -> Iterator[str]:
+        """
+        Same answer as `generate_response`, yielded in chunks as the LLM
+        streams its tokens (fallback and cached answers come as a single chunk).
+        """
+        try:
+            answer, request, key = self._request(user_query, retrieved_results, top_N)
+            if answer is not None:
+                yield answer
+                return
+            client = self._client()
+            if client is None:
+                yield self.DEFAULT_ANSWER
+                return
+
+            pieces, usage = [], None
+            t0 = time.perf_counter()
+            with timed("rag_llm"):
+                for chunk in client.chat.completions.create(stream=True, **request):
+                    # Groq reports token usage on the last chunk
+                    usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        # drop the leading whitespace generate_response strips
+                        if not pieces:
+                            delta = delta.lstrip()
+                            if not delta:
+                                continue
+                        pieces.append(delta)
+                        yield delta
+            if not pieces:
+                yield self.NO_RESULTS_ANSWER
+                return
+            # only reached when the stream was consumed to the end (not on timeouts)
+            self._remember(key, request, "".join(pieces).strip(), time.perf_counter() - t0, usage)
+
+        except Exception as e:
+            print(f"Error during RAG generation: {e}")
+            yield self.DEFAULT_ANSWER
+
+
+def _cache_from_env() -> Optional[RAGResponseCache]:
+    """RAG_CACHE_SIZE entries (default 512, 0 = off), persisted to RAG_CACHE_PATH if set."""
+    size = int(os.environ.get("RAG_CACHE_SIZE", "512"))
+    if size <= 0:
+        return None
+    prices = (float(os.environ.get("RAG_PRICE_INPUT", DEFAULT_PRICES[0])),
+              float(os.environ.get("RAG_PRICE_OUTPUT", DEFAULT_PRICES[1])))
+    return RAGResponseCache(size, os.environ.get("RAG_CACHE_PATH") or None, prices)
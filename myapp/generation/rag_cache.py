@@ -0,0 +1,159 @@
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Groq list prices for llama-3.1-8b-instant, USD per 1M tokens (input, output)
+DEFAULT_PRICES = (0.05, 0.08)
+
+
+class RAGResponseCache:
+    """
+    Bounded LRU cache of LLM answers, keyed on what determines the prompt:
+    the normalized query, the ordered PIDs sent to the LLM, the model name
+    and the prompt version (see `key`).
+
+    Each entry remembers how long the LLM took and how many tokens it used,
+    so hits add up the latency, tokens and cost they saved. With a `path`
+    the entries are written through to an SQLite file and reloaded (most
+    recently used first, up to `maxsize`) on start-up. Hits only touch the
+    LRU order in memory; their timestamps are written back in one batch on
+    the next `put`, `flush` or `close` (also run at exit), so reads never
+    wait on the disk.
+    """
+
+    def __init__(self, maxsize: int = 512, path: Optional[Union[str, Path]] = None,
+                 prices: Tuple[float, float] = DEFAULT_PRICES):
+        self.maxsize = maxsize
+        self.path = Path(path) if path else None
+        self.prices = prices
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        # key -> last hit time, not yet written to disk
+        self._touched: Dict[str, float] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self.saved_prompt_tokens = 0
+        self.saved_completion_tokens = 0
+
+        if self.path is not None:
+            self._open()
+
+    @staticmethod
+    def key(query: str, pids: List[str], model: str, prompt_version: str) -> str:
+        normalized = " ".join(query.lower().split())
+        raw = json.dumps([normalized, list(pids), model, prompt_version], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            answer, latency, prompt_tokens, completion_tokens = entry
+            self.hits += 1
+            self.saved_seconds += latency
+            self.saved_prompt_tokens += prompt_tokens
+            self.saved_completion_tokens += completion_tokens
+            if self._db is not None:
+                self._touched[key] = time.time()
+            return answer
+
+    def put(self, key: str, answer: str, latency: float, prompt_tokens: int = 0, completion_tokens: int = 0):
+        if self.maxsize <= 0:
+            return
+        entry = (answer, latency, prompt_tokens, completion_tokens)
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            evicted = []
+            while len(self._data) > self.maxsize:
+                evicted.append(self._data.popitem(last=False)[0])
+                self.evictions += 1
+            if self._db is not None:
+                self._write_touched()
+                self._db.execute("INSERT OR REPLACE INTO rag_cache VALUES (?, ?, ?, ?, ?, ?)",
+                                 (key, *entry, time.time()))
+                self._db.executemany("DELETE FROM rag_cache WHERE key = ?", [(k,) for k in evicted])
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM rag_cache")
+                self._db.commit()
+
+    def flush(self):
+        """Write the pending hit timestamps to disk."""
+        with self._lock:
+            if self._db is not None and self._touched:
+                self._write_touched()
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._write_touched()
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        price_in, price_out = self.prices
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "persistent": self.path is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "saved_seconds": round(self.saved_seconds, 2),
+            "saved_tokens": self.saved_prompt_tokens + self.saved_completion_tokens,
+            "saved_cost_usd": round((self.saved_prompt_tokens * price_in
+                                     + self.saved_completion_tokens * price_out) / 1e6, 6),
+        }
+
+    # Disk persistence
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # one connection shared by the web and RAG worker threads, serialized by self._lock
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rag_cache ("
+            "key TEXT PRIMARY KEY, answer TEXT NOT NULL, latency REAL NOT NULL, "
+            "prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        rows = self._db.execute(
+            "SELECT key, answer, latency, prompt_tokens, completion_tokens FROM rag_cache "
+            "ORDER BY last_used DESC LIMIT ?", (max(self.maxsize, 0),)
+        ).fetchall()
+        for key, *entry in reversed(rows):
+            self._data[key] = tuple(entry)
+        # drop whatever no longer fits (e.g. maxsize was lowered)
+        self._db.execute("DELETE FROM rag_cache WHERE key NOT IN "
+                         "(SELECT key FROM rag_cache ORDER BY last_used DESC LIMIT ?)", (max(self.maxsize, 0),))
+        self._db.commit()
+        atexit.register(self.close)
+
+    def _write_touched(self):
+        """Queue the hit timestamps in the current transaction (caller holds the lock and commits)."""
+        if self._touched:
+            self._db.executemany("UPDATE rag_cache SET last_used = ? WHERE key = ?",
+                                 [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from myapp.core.metrics import observe, timed
+from myapp.generation.rag import RAGGenerator
+
+PENDING, DONE, TIMEOUT, ERROR, BUSY = "pending", "done", "timeout", "error", "busy"
+
+TIMEOUT_ANSWER = "The AI summary took too long and was skipped."
+BUSY_ANSWER = "The AI summary is not available right now (too many requests)."
+
+
+class RAGJob:
+    __slots__ = ("id", "state", "chunks", "created", "deadline", "cond")
+
+    def __init__(self, job_id: str, timeout: float):
+        self.id = job_id
+        self.state = PENDING
+        self.chunks: List[str] = []
+        self.created = time.monotonic()
+        self.deadline = self.created + timeout
+        self.cond = threading.Condition()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+
+class RAGJobQueue:
+    """
+    Runs RAG generations off the request path.
+
+    `submit()` returns a job id at once; a bounded thread pool streams the
+    answer into the job (`RAGGenerator.generate_stream`), which the results
+    page polls (`get`) or reads as server-sent events (`events`). At most
+    `max_pending` jobs are queued or running (extra ones are answered "busy"
+    without calling the LLM), and a job still running past `timeout` seconds
+    is reported as timed out and its remaining output dropped. Finished jobs
+    are kept for the last `retention` submissions.
+    """
+
+    def __init__(self, generator: RAGGenerator, workers: int = 4, timeout: float = 20.0,
+                 max_pending: int = 32, retention: int = 1024):
+        self.generator = generator
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag")
+        self._jobs: "OrderedDict[str, RAGJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.counts = {DONE: 0, TIMEOUT: 0, ERROR: 0, BUSY: 0}
+
+    def submit(self, user_query: str, retrieved_results: List[Any]) -> str:
+        job = RAGJob(uuid.uuid4().hex, self.timeout)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.retention:
+                self._jobs.popitem(last=False)
+            busy = self._pending >= self.max_pending
+            if not busy:
+                self._pending += 1
+        if busy:
+            self._finish(job, BUSY, BUSY_ANSWER)
+        else:
+            self._pool.submit(self._run, job, user_query, list(retrieved_results))
+        return job.id
+
+    def _run(self, job: RAGJob, user_query: str, retrieved_results: List[Any]):
+        observe("rag_queue", time.monotonic() - job.created)
+        try:
+            with timed("rag"):
+                for chunk in self.generator.generate_stream(user_query, retrieved_results):
+                    with job.cond:
+                        if job.state != PENDING:
+                            return
+                        job.chunks.append(chunk)
+                        job.cond.notify_all()
+                    if time.monotonic() > job.deadline:
+                        self._finish(job, TIMEOUT, TIMEOUT_ANSWER)
+                        return
+            self._finish(job, DONE)
+        except Exception as e:
+            print(f"Error during RAG job {job.id}: {e}")
+            self._finish(job, ERROR, RAGGenerator.DEFAULT_ANSWER)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _finish(self, job: RAGJob, state: str, replacement: Optional[str] = None):
+        with job.cond:
+            if job.state != PENDING:
+                return
+            job.state = state
+            if replacement is not None:
+                job.chunks = [replacement]
+            job.cond.notify_all()
+        with self._lock:
+            self.counts[state] += 1
+
+    def _job(self, job_id: str) -> Optional[RAGJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and job.state == PENDING and time.monotonic() > job.deadline:
+            self._finish(job, TIMEOUT, TIMEOUT_ANSWER)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """{"state", "text"} of a job (text so far while pending); None if unknown."""
+        job = self._job(job_id)
+        if job is None:
+            return None
+        with job.cond:
+            return {"state": job.state, "text": job.text}
+
+    def events(self, job_id: str, heartbeat: float = 15.0) -> Iterator[str]:
+        """Server-sent events: "delta" events with new text, then one "done" event with the final state and text."""
+        sent = 0
+        while True:
+            job = self._job(job_id)
+            if job is None:
+                yield _sse("done", {"state": "unknown", "text": ""})
+                return
+            with job.cond:
+                if job.state == PENDING and len(job.chunks) == sent:
+                    job.cond.wait(min(heartbeat, max(job.deadline - time.monotonic(), 0.0) + 0.01))
+                state, chunks = job.state, list(job.chunks)
+            if state != PENDING:
+                yield _sse("done", {"state": state, "text": "".join(chunks)})
+                return
+            if len(chunks) > sent:
+                yield _sse("delta", {"text": "".join(chunks[sent:])})
+                sent = len(chunks)
+            else:
+                yield ": keep-alive\n\n"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pending": self._pending, "max_pending": self.max_pending, **self.counts}
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,66 @@
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List
+
+# "1. PID: <pid>\n   Title: <title>" blocks of RAGGenerator._format_results / _pack_results
+_FIRST_PRODUCT_RE = re.compile(r"^\s*1\. PID: (\S+)\n\s*Title: (.*)$", re.MULTILINE)
+_PRODUCT_RE = re.compile(r"^\s*\d+\. PID: (\S+)\n\s*Title: (.*)$", re.MULTILINE)
+_HELPER_RE = re.compile(r"helper_score: ([\d.]+)")
+
+
+class StubLLMClient:
+    """
+    Offline stand-in for the Groq client: same `chat.completions.create`
+    interface (plain and `stream=True`), no network. It recommends the first
+    retrieved product of the prompt (strategy "first") or the one with the
+    highest helper_score ("best_value"), after `delay` seconds plus
+    `token_delay` per (estimated) prompt token to mimic LLM latency. Used in
+    tests, benchmarks and with RAG_CLIENT=stub.
+    """
+
+    def __init__(self, delay: float = 0.0, chunk_size: int = 16, strategy: str = "first", token_delay: float = 0.0):
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.strategy = strategy
+        self.token_delay = token_delay
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _answer(self, messages: List[Dict[str, str]]) -> str:
+        prompt = messages[-1]["content"]
+        if self.strategy == "best_value":
+            blocks = list(_PRODUCT_RE.finditer(prompt))
+            ends = [b.start() for b in blocks[1:]] + [len(prompt)]
+            helpers = [_HELPER_RE.search(prompt, b.end(), end) for b, end in zip(blocks, ends)]
+            scored = [(float(h.group(1)) if h else 0.0, -i) for i, h in enumerate(helpers)]
+            m = blocks[-max(scored)[1]] if blocks else None
+        else:
+            m = _FIRST_PRODUCT_RE.search(prompt)
+        if not m:
+            return "There are no good products that fit the request based on the retrieved results."
+        pid, title = m.group(1), m.group(2).strip()
+        why = "the best-value" if self.strategy == "best_value" else "the top-ranked"
+        return (f"- Best Product: {pid} — {title}\n"
+                f"- Why: It is {why} retrieved product (stub response, no LLM was called).")
+
+    def _create(self, messages: List[Dict[str, str]], model: str = "", stream: bool = False, **kwargs: Any):
+        with self._calls_lock:
+            self.calls += 1
+        answer = self._answer(messages)
+        delay = self.delay + self.token_delay * sum(len(m["content"]) for m in messages) / 4
+        if stream:
+            return self._stream(answer, delay)
+        time.sleep(delay)
+        usage = SimpleNamespace(prompt_tokens=sum(len(m["content"]) for m in messages) // 4,
+                                completion_tokens=len(answer) // 4)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))],
+                               model=model, usage=usage)
+
+    def _stream(self, answer: str, delay: float) -> Iterator[Any]:
+        pieces = [answer[i:i + self.chunk_size] for i in range(0, len(answer), self.chunk_size)]
+        for piece in pieces:
+            time.sleep(delay / max(len(pieces), 1))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
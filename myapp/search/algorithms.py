@@ -1,237 +1,298 @@
-import json
-import math
-from pathlib import Path
-from collections import Counter
-from typing import Dict, List, Any, Iterable, Optional
-
-# For repo imports
-import sys
-REPO_ROOT = Path(__file__).resolve().parents[2]
-sys.path.append(str(REPO_ROOT / "project_progress"))
-from utils.preprocessing import preprocess_text_field
-
-from myapp.search.objects import Document, ResultItem
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Union
 
+import numpy as np
 
-# Load enriched corpus + boolean index
-DATA_DIR = REPO_ROOT / "data"
-INDEX_DIR = DATA_DIR / "index"
+from myapp.core.metrics import timed
+from myapp.search.objects import Document, ResultItem
+from myapp.search.index_snapshot import (
+    DATA_DIR, INDEX_DIR, ENRICHED_PATH, INVERTED_PATH, DOCMAP_PATH, SNAPSHOT_PATH,
+    INDEXED_TEXT_FIELDS, IndexSnapshot, load_or_build_snapshot, load_snapshot, read_header
+)
+from myapp.search.batch import BatchRanker
+from myapp.search.facets import FacetFilters, count_facets, filter_mask, merge_counts
+from myapp.search.boost import NumericBoost, parse_boost_weights
+from myapp.search.live_index import IndexView, LiveIndex
+from myapp.search.postings import CANDIDATE_BACKENDS
+from myapp.search.product_store import ProductStore
+from myapp.search.query_analysis import QueryAnalyzer
+from myapp.search.scoring import ScoringEngine, top_k
 
-ENRICHED_PATH = DATA_DIR / "fashion_products_dataset_enriched.json"
-INVERTED_PATH = INDEX_DIR / "boolean_inverted_index.json"
-DOCMAP_PATH = INDEX_DIR / "docid_pid_map.json"
 
-docs_raw: List[Dict[str, Any]] = json.loads(ENRICHED_PATH.read_text(encoding="utf-8"))
-inverted_index: Dict[str, List[int]] = json.loads(INVERTED_PATH.read_text(encoding="utf-8"))
-docid_to_pid: Dict[str, str] = json.loads(DOCMAP_PATH.read_text(encoding="utf-8"))["docid_to_pid"]
+# Candidate generation backend: "lists" (sorted postings merge) or "bitmap"
+CANDIDATE_BACKEND = os.getenv("CANDIDATE_BACKEND", "lists")
 
-N_DOCS = len(docs_raw)
 
-INDEXED_TEXT_FIELDS = ["title_clean", "description_clean", "metadata_clean"]
+# Query analysis (same tokens as preprocess_text_field, memoized)
+_analyzer = QueryAnalyzer()
 
 # Helpers
-def _doc_tokens(record: Dict[str, Any], fields: Iterable[str]) -> List[str]:
-    toks: List[str] = []
-    for f in fields:
-        val = record.get(f)
-        if val:
-            toks.extend(str(val).split())
-    return toks
-
 def _query_tokens(q: str) -> List[str]:
-    return preprocess_text_field(q or "")["tokens"]
-
-def _intersect_sorted(a: List[int], b: List[int]) -> List[int]:
-    i = j = 0
-    out = []
-    while i < len(a) and j < len(b):
-        if a[i] == b[j]:
-            out.append(a[i]); i += 1; j += 1
-        elif a[i] < b[j]:
-            i += 1
-        else:
-            j += 1
-    return out
-
-def _candidate_docs_and(q_terms: List[str]) -> List[int]:
-    """AND semantics via boolean index."""
-    if not q_terms:
-        return []
-    postings = []
-    for t in set(q_terms):
-        pl = inverted_index.get(t)
-        if not pl:
-            return []
-        postings.append(pl)
-    postings.sort(key=len)
-    res = postings[0]
-    for pl in postings[1:]:
-        res = _intersect_sorted(res, pl)
-        if not res:
-            break
-    return res
-
-def _candidate_docs_or(q_terms: List[str]) -> List[int]:
-    """Union fallback."""
-    cands = set()
-    for t in set(q_terms):
-        cands.update(inverted_index.get(t, []))
-    return sorted(list(cands))
-
-
-# Precompute TF, DF, norms
-term_df: Dict[str, int] = {t: len(pl) for t, pl in inverted_index.items()}
-
-doc_tf: Dict[int, Dict[str, int]] = {}
-doc_len: Dict[int, int] = {}
-
-for did, rec in enumerate(docs_raw):
-    toks = _doc_tokens(rec, INDEXED_TEXT_FIELDS)
-    tf = Counter(toks)
-    doc_tf[did] = dict(tf)
-    doc_len[did] = sum(tf.values())
-
-avg_doc_len = sum(doc_len.values()) / max(N_DOCS, 1)
-
-
-# TF-IDF (log2, no smoothing) 
-idf_tfidf: Dict[str, float] = {}
-for t, df in term_df.items():
-    idf_tfidf[t] = math.log2(N_DOCS / df) if df > 0 else 0.0
-
-tfidf_weights: Dict[int, Dict[str, float]] = {}
-doc_norms: Dict[int, float] = {}
-
-for did, tf_map in doc_tf.items():
-    w_map = {}
-    sq = 0.0
-    for t, f in tf_map.items():
-        if f <= 0:
-            continue
-        w = (1.0 + math.log2(f)) * idf_tfidf.get(t, 0.0)
-        if w != 0:
-            w_map[t] = w
-            sq += w * w
-    tfidf_weights[did] = w_map
-    doc_norms[did] = math.sqrt(sq) if sq > 0 else 0.0
+    return _analyzer.tokens(q or "")
 
+def analyze_query(q: str) -> Tuple[List[str], List[str]]:
+    """
+    Split a raw query into (terms, excluded terms).
+    Words prefixed with "-" (e.g. `jeans -blue`) are exclusions.
+    """
+    with timed("analyze"):
+        words = (q or "").split()
+        neg = [w[1:] for w in words if w.startswith("-") and len(w) > 1]
+        pos = [w for w in words if not (w.startswith("-") and len(w) > 1)]
+        return _query_tokens(" ".join(pos)), _query_tokens(" ".join(neg))
 
-# BM25
-idf_bm25: Dict[str, float] = {}
-for t, df in term_df.items():
-    idf_bm25[t] = math.log((N_DOCS - df + 0.5) / (df + 0.5) + 1.0)
 
+# BM25
 k1 = 1.5
 b = 0.75
 
 
-# Core scoring functions
-def _tfidf_cosine_scores(q_terms: List[str], cand_ids: List[int]) -> Dict[int, float]:
-    if not cand_ids:
-        return {}
-    q_tf = Counter(q_terms)
-    q_w = {}
-    q_sq = 0.0
-    for t, f in q_tf.items():
-        w = (1.0 + math.log2(f)) * idf_tfidf.get(t, 0.0)
-        if w != 0:
-            q_w[t] = w
-            q_sq += w * w
-    q_norm = math.sqrt(q_sq)
-    if q_norm == 0:
-        return {}
-
-    scores = {}
-    for did in cand_ids:
-        d_w = tfidf_weights.get(did, {})
-        d_norm = doc_norms.get(did, 0.0)
-        if d_norm == 0.0:
-            continue
-        dot = sum(q_w[t] * d_w.get(t, 0.0) for t in q_w)
-        if dot > 0:
-            scores[did] = dot / (q_norm * d_norm)
-    return scores
-
-def _bm25_scores(q_terms: List[str], cand_ids: List[int]) -> Dict[int, float]:
-    if not cand_ids:
-        return {}
-    q_unique = list(set(q_terms))
-    scores = {}
-    for did in cand_ids:
-        tf_map = doc_tf.get(did, {})
-        dl = doc_len.get(did, 0)
-        if dl == 0:
-            continue
-        s = 0.0
-        for t in q_unique:
-            f = tf_map.get(t, 0)
-            if f <= 0:
-                continue
-            idf = idf_bm25.get(t, 0.0)
-            denom = f + k1 * (1.0 - b + b * dl / avg_doc_len)
-            s += idf * (f * (k1 + 1.0) / denom)
-        if s != 0:
-            scores[did] = s
-    return scores
-
-def _numeric_boost(rec: Dict[str, Any]) -> float:
-    rating = rec.get("average_rating_num") or 0.0
-    discount = rec.get("discount_pct") or 0
-    price = rec.get("selling_price_num") or rec.get("actual_price_num") or 0.0
-    out_of_stock = rec.get("out_of_stock_bool")
-
-    rating_norm = max(0.0, min(rating / 5.0, 1.0))
-    discount_norm = max(0.0, min(discount / 80.0, 1.0))
-
-    price_cap = 4000.0
-    price_norm = 0.5 if price <= 0 else 1.0 - min(price, price_cap) / price_cap
-
-    stock_factor = 1.0 if not out_of_stock else 0.2
-    boost = 1.0 + 0.5 * rating_norm + 0.4 * discount_norm + 0.3 * price_norm
-    return boost * stock_factor
-
-
-# Public function used by SearchEngine
-def search_in_corpus(
-    query: str,
-    search_id: int,
-    corpus: Dict[str, Document],
+# Updatable index over the precomputed snapshot (rebuilt from the JSON sources if
+# stale; a rebuild leaves the parsed corpus for the web app's load_corpus to reuse).
+# The snapshot is its main segment; products added / changed / deleted at runtime
+# go to an in-memory delta, merged in the background (LSM), and reload_index()
+# swaps in a new snapshot file. Queries only reach the index through an IndexView.
+# The "custom" ranker's static per-product boost is precomputed per segment; its
+# weights come from CUSTOM_BOOST_WEIGHTS (e.g. "rating=0.6,price=0.2") and can be
+# changed at runtime with set_boost_weights() without reloading the index.
+_live = LiveIndex(load_or_build_snapshot(SNAPSHOT_PATH, share_records=True),
+                  CANDIDATE_BACKENDS[CANDIDATE_BACKEND], k1=k1, b=b,
+                  boost_weights=parse_boost_weights(os.getenv("CUSTOM_BOOST_WEIGHTS", "")))
+
+def set_boost_weights(**weights: float):
+    _live.set_boost_weights(**weights)
+
+def boost_weights() -> Dict[str, float]:
+    return _live.boost_weights
+
+def upsert_documents(records: Iterable[Dict[str, Any]]) -> int:
+    """Add or replace products (enriched or raw catalog records) without rebuilding the index."""
+    return _live.upsert(records)
+
+def delete_documents(pids: Iterable[str]) -> int:
+    return _live.delete(pids)
+
+def merge_index() -> bool:
+    """Merge pending updates into the main segment now (normally done in the background)."""
+    return _live.merge()
+
+def reload_index(path=SNAPSHOT_PATH) -> str:
+    """
+    Swap in the snapshot at `path` (no restart). Queries already running finish
+    on the old one, whose memory map is released when the last of them ends.
+    Returns the new snapshot's checksum.
+    """
+    return swap_index(load_snapshot(path))
+
+def swap_index(snapshot: IndexSnapshot) -> str:
+    """`reload_index` for a snapshot already loaded. Returns its checksum."""
+    _live.load(snapshot)
+    return snapshot.checksum
+
+def index_stats() -> Dict[str, Any]:
+    return _live.stats()
+
+def index_view() -> IndexView:
+    """The current state of the index; pass it to rank_documents / build_results to use the same one."""
+    return _live.view()
+
+
+# Batch ranking (offline evaluation / query replay), over a view without pending updates
+def _batch_ranker(view: IndexView) -> Optional[BatchRanker]:
+    if len(view.segments) > 1 or view.segments[0].dead is not None:
+        return None
+    seg = view.segments[0]
+    return BatchRanker(seg.snapshot, seg.scorer, seg.candidates, seg.boost)
+
+
+def index_version(view: Optional[IndexView] = None) -> int:
+    """
+    Identifies the loaded index and ranking setup. Grows (never goes back)
+    whenever a different snapshot is loaded, the index is updated or merged,
+    or the boost weights change, so a higher version is always newer.
+    """
+    return (view or _live.view()).version
+
+def pid_of(did: int, view: Optional[IndexView] = None) -> str:
+    return (view or _live.view()).pid(did)
+
+def details_url(pid: str, search_id: int) -> str:
+    return f"/doc_details?pid={pid}&search_id={search_id}"
+
+
+# Public functions used by SearchEngine
+def rank_documents(
+    q_terms: List[str],
+    neg_terms: List[str],
     method: str = "bm25",
     k: int = 20,
-    use_and: bool = True
-) -> List[ResultItem]:
+    use_and: bool = True,
+    view: Optional[IndexView] = None,
+    filters: Optional[FacetFilters] = None
+) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Returns top-k ResultItem objects (safe for UI rendering).
-    Each item includes ranking + product fields + internal + source URLs.
+    Top-k (doc_ids, scores) for analyzed query terms, over `view` (default:
+    the current index). use_and=True scores the AND intersection (OR
+    fallback if empty); use_and=False scores the OR union, with MaxScore
+    pruning for bm25 on large collections. Docs containing any of `neg_terms` are excluded, and
+    `filters` (brand, category, price, rating, stock) drop candidates before
+    they are scored.
     """
-    q_terms = _query_tokens(query)
-
-    # candidate selection
-    if use_and:
-        cand_ids = _candidate_docs_and(q_terms)
-        if not cand_ids:
-            cand_ids = _candidate_docs_or(q_terms)
-    else:
-        cand_ids = _candidate_docs_or(q_terms)
+    ids, scores, _ = _rank(q_terms, neg_terms, method, k, use_and, view or _live.view(), filters, False)
+    return ids, scores
 
-    if not cand_ids:
-        return []
+def rank_with_facets(
+    q_terms: List[str],
+    neg_terms: List[str],
+    method: str = "bm25",
+    k: int = 20,
+    use_and: bool = True,
+    view: Optional[IndexView] = None,
+    filters: Optional[FacetFilters] = None
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """
+    `rank_documents` plus the facet counts (see facets.merge_counts) of every
+    doc matching the query and filters, not just of the top k.
+    """
+    return _rank(q_terms, neg_terms, method, k, use_and, view or _live.view(), filters, True)
+
+def _rank(q_terms, neg_terms, method, k, use_and, view, filters, facets):
+    # candidate selection per segment (None = every doc matching any query term)
+    with timed("candidates"):
+        cands = view.select_candidates(q_terms, neg_terms, use_and)
+        if filters or facets:
+            # filters and counts need the candidates spelled out
+            cands = [_explicit(seg, q_terms, ids) for seg, ids in zip(view.segments, cands)]
+        if filters:
+            cands = [ids[filter_mask(seg.snapshot, ids, filters)] for seg, ids in zip(view.segments, cands)]
+
+    # facet counts: one vectorized pass over each segment's candidates
+    counts = None
+    if facets:
+        with timed("facets"):
+            counts = merge_counts([(seg.snapshot, count_facets(seg.snapshot, ids))
+                                   for seg, ids in zip(view.segments, cands)], sum(len(ids) for ids in cands))
 
     # scoring
-    if method == "tfidf":
-        scores = _tfidf_cosine_scores(q_terms, cand_ids)
+    with timed("scoring"):
+        ranked = [_rank_segment(seg, q_terms, cand_ids, method, k) for seg, cand_ids in zip(view.segments, cands)]
+        if len(ranked) == 1:
+            return ranked[0] + (counts,)
+        ids = np.concatenate([ids + seg.base for seg, (ids, _) in zip(view.segments, ranked)])
+        return top_k(ids, np.concatenate([scores for _, scores in ranked]), k) + (counts,)
+
+def _explicit(seg, q_terms: List[str], cand_ids: Optional[np.ndarray]) -> np.ndarray:
+    if cand_ids is not None:
+        return cand_ids
+    ids = seg.candidates.or_(q_terms)
+    return ids[seg.alive(ids)]
+
+def _rank_segment(seg, q_terms: List[str], cand_ids: Optional[np.ndarray], method: str, k: int):
+    if cand_ids is not None and not len(cand_ids):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    scorer = seg.scorer
+    if method == "bm25" and cand_ids is None:
+        # OR semantics: top-k, MaxScore-pruned on large indexes (skips docs that cannot make the top k)
+        # (deleted docs can take up to n_dead of the slots)
+        ids, scores = scorer.bm25_top_k(q_terms, k + seg.n_dead)
+    elif method == "tfidf":
+        ids, scores = scorer.tfidf(q_terms, cand_ids)
     elif method == "custom":
-        base = _tfidf_cosine_scores(q_terms, cand_ids)
-        scores = {did: sc * _numeric_boost(docs_raw[did]) for did, sc in base.items()}
+        ids, scores = scorer.tfidf(q_terms, cand_ids)
+        scores = seg.boost.apply(ids, scores)
     else:
-        scores = _bm25_scores(q_terms, cand_ids)
+        ids, scores = scorer.bm25(q_terms, cand_ids)
+    if cand_ids is None and seg.n_dead:
+        alive = seg.alive(ids)
+        ids, scores = ids[alive], scores[alive]
+    return top_k(ids, scores, k)
+
+# Worker processes rank on their own map of the parent's snapshot file, with the
+# parent's boost weights; the ranker is kept for the next chunk of the same file.
+_worker_ranker: Optional[Tuple[tuple, BatchRanker]] = None
+
+def _on_disk(view: IndexView) -> bool:
+    """Whether the view is one clean segment still matching its snapshot file."""
+    seg = view.segments[0]
+    if len(view.segments) > 1 or seg.dead is not None or seg.snapshot.path is None:
+        return False
+    try:
+        return read_header(seg.snapshot.path).get("checksum") == seg.snapshot.checksum
+    except (OSError, ValueError):
+        return False
+
+def _rank_batch_chunk(args) -> Optional[List[Tuple[np.ndarray, np.ndarray]]]:
+    """Rank one chunk in a worker. None if the snapshot file changed since the parent checked it."""
+    global _worker_ranker
+    path, checksum, weights, queries, method, k, use_and = args
+    key = (str(path), checksum, tuple(sorted(weights.items())))
+    if _worker_ranker is None or _worker_ranker[0] != key:
+        snapshot = load_snapshot(path)
+        if snapshot.checksum != checksum:
+            return None
+        _worker_ranker = key, BatchRanker(snapshot, ScoringEngine(snapshot, k1, b),
+                                          CANDIDATE_BACKENDS[CANDIDATE_BACKEND](snapshot),
+                                          NumericBoost.from_snapshot(snapshot, weights))
+    return _worker_ranker[1].rank(queries, method=method, k=k, use_and=use_and)
+
+def rank_documents_batch(
+    queries: List[Tuple[List[str], List[str]]],
+    method: str = "bm25",
+    k: int = 20,
+    use_and: bool = True,
+    workers: int = 1,
+    view: Optional[IndexView] = None
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    `rank_documents` for many analyzed (terms, excluded terms) queries at once,
+    sharing the work of common terms (see BatchRanker). With workers > 1 the
+    batch is split across a process pool; each worker maps the view's
+    snapshot file and ranks with the view's boost weights. While index
+    updates are pending (not merged yet) the queries are ranked one by one
+    instead, and a view whose main segment is not on disk (merged in memory,
+    or its file since replaced) is ranked in this process.
+    """
+    view = view or _live.view()
+    batch = _batch_ranker(view)
+    if batch is None:
+        return [rank_documents(terms, neg, method=method, k=k, use_and=use_and, view=view) for terms, neg in queries]
+    if workers <= 1 or len(queries) < 2 * workers or not _on_disk(view):
+        return batch.rank(queries, method=method, k=k, use_and=use_and)
+    snap = view.segments[0].snapshot
+    weights = view.segments[0].boost.weights
+    step = -(-len(queries) // workers)
+    parts = [queries[i:i + step] for i in range(0, len(queries), step)]
+    chunks = [(snap.path, snap.checksum, weights, part, method, k, use_and) for part in parts]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        ranked = list(pool.map(_rank_batch_chunk, chunks))
+    return [r for part, done in zip(parts, ranked)
+            for r in (done if done is not None else batch.rank(part, method=method, k=k, use_and=use_and))]
+
+def build_results(
+    ids: np.ndarray,
+    scores: np.ndarray,
+    corpus: Union[Dict[str, Document], ProductStore],
+    search_id: Optional[int] = None,
+    view: Optional[IndexView] = None
+) -> List[ResultItem]:
+    """
+    ResultItem objects for ranked doc ids (safe for UI rendering).
+    With search_id=None the internal `url` is left empty, to be stamped later.
+    `view` must be the one the ids were ranked on (default: the current index).
+    """
+    with timed("build_results"):
+        return _build_results(ids, scores, corpus, search_id, view or _live.view())
 
-    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+def _build_results(ids, scores, corpus, search_id, view) -> List[ResultItem]:
+    pids = [view.pid(did) for did in ids.tolist()]
+    if isinstance(corpus, ProductStore):
+        docs = corpus.records(pids)
+    else:
+        docs = [corpus.get(pid) for pid in pids]
 
     results: List[ResultItem] = []
-    for did, score in ranked:
-        pid = docs_raw[did].get("pid") or docid_to_pid.get(str(did))
-        doc_obj = corpus.get(pid)
+    for pid, doc_obj, score in zip(pids, docs, scores.tolist()):
         if not doc_obj:
             continue
         results.append(
@@ -247,11 +308,33 @@ def search_in_corpus(
                 ranking=float(score),
 
                 # internal link to your details page
-                url=f"/doc_details?pid={pid}&search_id={search_id}",
+                url=details_url(pid, search_id) if search_id is not None else None,
 
                 # original Flipkart link
                 source_url=doc_obj.url
             )
         )
 
-    return results
\ No newline at end of file
+    return results
+
+def search_in_corpus(
+    query: str,
+    search_id: int,
+    corpus: Union[Dict[str, Document], ProductStore],
+    method: str = "bm25",
+    k: int = 20,
+    use_and: bool = True,
+    filters: Optional[FacetFilters] = None
+) -> List[ResultItem]:
+    """
+    Returns top-k ResultItem objects (safe for UI rendering).
+    Each item includes ranking + product fields + internal + source URLs.
+    Query words prefixed with "-" exclude every doc containing them;
+    `filters` restrict the results by brand, category, price, rating or stock.
+    """
+    with timed("search"):
+        q_terms, neg_terms = analyze_query(query)
+        view = _live.view()
+        ids, scores = rank_documents(q_terms, neg_terms, method=method, k=k, use_and=use_and, view=view,
+                                     filters=filters)
+        return build_results(ids, scores, corpus, search_id, view)
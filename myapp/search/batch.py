@@ -0,0 +1,138 @@
+import math
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from myapp.search.boost import NumericBoost
+from myapp.search.index_snapshot import IndexSnapshot
+from myapp.search.postings import select_candidates
+from myapp.search.scoring import ScoringEngine, top_k
+
+# Max postings held in W at once (16 bytes each); larger batches are ranked in parts
+BATCH_POSTINGS = int(os.getenv("BATCH_POSTINGS", "8000000"))
+
+Query = Tuple[List[str], List[str]]   # (analyzed terms, excluded terms)
+Ranked = Tuple[np.ndarray, np.ndarray]
+
+
+class BatchRanker:
+    """
+    Ranks many analyzed queries at once, sharing the per-term work.
+
+    The per-posting BM25 contributions or TF-IDF weights of each distinct
+    term of the batch are gathered once (W, one row per term), so a term
+    shared by many queries is read and scored once. Each distinct query is
+    then still ranked on its own: its terms' rows, times its term weights
+    (1 for BM25, the log-tf idf weight for TF-IDF), are scatter-added into
+    a dense per-doc accumulator, in the same term order as `ScoringEngine`,
+    so scores are identical to the single-query path. Repeated queries are
+    ranked once.
+
+    Candidate rules are `select_candidates`, as in `algorithms.rank_documents`;
+    BM25 OR queries are scored exhaustively instead of MaxScore-pruned, which
+    gives the same top k.
+    """
+
+    def __init__(self, snapshot: IndexSnapshot, scorer: ScoringEngine, candidates,
+                 boost: Optional[NumericBoost] = None):
+        self.snapshot = snapshot
+        self.scorer = scorer
+        self.candidates = candidates
+        self.boost = boost
+
+    def rank(self, queries: Sequence[Query], method: str = "bm25", k: int = 20, use_and: bool = True) -> List[Ranked]:
+        distinct: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], int] = {}
+        slots = [distinct.setdefault((tuple(terms), tuple(neg)), len(distinct)) for terms, neg in queries]
+        rows = [self._query_row(list(terms), method) for terms, _ in distinct]
+
+        df = np.diff(self.snapshot.term_ptr)
+        ranked: List[Ranked] = []
+        part, part_tids, size = [], set(), 0
+        for query, row in zip(distinct, rows):
+            new = set(row[0]) - part_tids
+            if part and size + int(df[list(new)].sum()) > BATCH_POSTINGS:
+                ranked.extend(self._rank_part(part, part_tids, method, k, use_and))
+                part, part_tids, size = [], set(), 0
+                new = set(row[0])
+            part.append((query, row))
+            part_tids |= new
+            size += int(df[list(new)].sum())
+        if part:
+            ranked.extend(self._rank_part(part, part_tids, method, k, use_and))
+        return [ranked[i] for i in slots]
+
+    def _rank_part(self, part, tids, method: str, k: int, use_and: bool) -> List[Ranked]:
+        w = self._term_rows(tids, method)
+        return [self._rank_one(list(terms), list(neg), row, w, method, k, use_and) for (terms, neg), row in part]
+
+    # Q: a query's distinct terms in the engine's summation order, with weights
+    def _query_row(self, terms: List[str], method: str) -> Tuple[List[int], List[float], float]:
+        """(term ids, weights, query norm)."""
+        snap = self.snapshot
+        tids, weights = [], []
+        if method == "bm25":
+            for t in set(terms):
+                tid = snap.term_ids.get(t)
+                if tid is not None:
+                    tids.append(tid)
+                    weights.append(1.0)
+            return tids, weights, 1.0
+        q_sq = 0.0
+        for t, f in Counter(terms).items():
+            tid = snap.term_ids.get(t)
+            w = (1.0 + math.log2(f)) * (float(snap.idf_tfidf[tid]) if tid is not None else 0.0)
+            if w != 0:
+                tids.append(tid)
+                weights.append(w)
+                q_sq += w * w
+        return tids, weights, math.sqrt(q_sq)
+
+    # W: (doc ids, values) of every term in the batch
+    def _term_rows(self, tids, method: str) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        snap = self.snapshot
+        rows = {}
+        for tid in tids:
+            s, e = int(snap.term_ptr[tid]), int(snap.term_ptr[tid + 1])
+            docs = snap.term_docs(tid)
+            if method == "bm25":
+                vals = self.scorer._bm25_postings(slice(s, e), docs, float(snap.idf_bm25[tid]))
+            else:
+                vals = snap.post_tfidf[s:e].astype(np.float64)
+            rows[tid] = (docs, vals)
+        return rows
+
+    def _rank_one(self, terms: List[str], neg: List[str], row, w, method: str, k: int, use_and: bool) -> Ranked:
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        tids, weights, q_norm = row
+        cand_ids = select_candidates(self.candidates, terms, neg, use_and)
+        if (cand_ids is not None and not len(cand_ids)) or not tids or q_norm == 0:
+            return empty
+
+        n_docs = self.snapshot.n_docs
+        acc = np.zeros(n_docs, dtype=np.float64)
+        for tid, wt in zip(tids, weights):
+            docs, vals = w[tid]
+            acc[docs] += vals if method == "bm25" else wt * vals
+        if cand_ids is None:
+            # union of the query terms' postings, in doc id order
+            seen = np.zeros(n_docs, dtype=bool)
+            for tid in tids:
+                seen[w[tid][0]] = True
+            ids = np.flatnonzero(seen)
+        else:
+            ids = np.asarray(cand_ids, dtype=np.int64)
+        sums = acc[ids]
+
+        if method == "bm25":
+            keep = sums != 0
+            ids, scores = ids[keep], sums[keep]
+        else:
+            doc_norms = self.scorer._doc_norms[ids]
+            keep = (sums > 0) & (doc_norms > 0)
+            ids = ids[keep]
+            scores = sums[keep] / (q_norm * doc_norms[keep])
+            if method == "custom" and self.boost is not None:
+                scores = self.boost.apply(ids, scores)
+        return top_k(ids, scores, k)
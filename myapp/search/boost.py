@@ -0,0 +1,131 @@
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+
+# Weights of the "custom" ranker's static per-product boost:
+#   boost = (1 + rating * rating_norm + discount * discount_norm + price * price_norm)
+#           * (out_of_stock if the product is out of stock else 1)
+DEFAULT_BOOST_WEIGHTS: Dict[str, float] = {
+    "rating": 0.5,
+    "discount": 0.4,
+    "price": 0.3,
+    "out_of_stock": 0.2,
+    "rating_max": 5.0,       # rating_norm = clip(rating / rating_max, 0, 1)
+    "discount_max": 80.0,    # discount_norm = clip(discount / discount_max, 0, 1)
+    "price_cap": 4000.0,     # price_norm = 1 - min(price, price_cap) / price_cap
+    "price_missing": 0.5,    # price_norm when the price is unknown (<= 0)
+}
+
+# which normalized component each weight feeds (None: only the final combine)
+_COMPONENT_OF = {
+    "rating_max": "rating", "discount_max": "discount", "price_cap": "price",
+    "price_missing": "price", "out_of_stock": "stock",
+}
+
+
+def parse_boost_weights(spec: str) -> Dict[str, float]:
+    """Parse "rating=0.6,price=0.2" (e.g. from CUSTOM_BOOST_WEIGHTS) into a weights dict."""
+    weights = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        weights[name.strip()] = float(value)
+    return weights
+
+def _check(weights: Dict[str, float]):
+    unknown = set(weights) - set(DEFAULT_BOOST_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown boost weight(s): {', '.join(sorted(unknown))}")
+
+
+class NumericBoost:
+    """
+    Per-document boost factor of the "custom" ranker as one float64 array.
+
+    The normalized rating / discount / price / stock components are cached,
+    so changing a weight only re-combines them (and re-normalizes just the
+    component whose scale changed) instead of reloading the index.
+    `values` is replaced atomically, so concurrent readers see either the
+    old or the new array.
+    """
+
+    def __init__(self, rating: np.ndarray, discount: np.ndarray, price: np.ndarray, out_of_stock: np.ndarray,
+                 weights: Optional[Dict[str, float]] = None, values: Optional[np.ndarray] = None):
+        weights = weights or {}
+        _check(weights)
+        self._columns = {"rating": rating, "discount": discount, "price": price, "stock": out_of_stock}
+        self._weights = dict(DEFAULT_BOOST_WEIGHTS, **weights)
+        self._components: Dict[str, np.ndarray] = {}
+        self.version = 0
+        self._lock = threading.Lock()
+        self.values = values if values is not None else self._combine()
+
+    @classmethod
+    def from_snapshot(cls, snapshot, weights: Optional[Dict[str, float]] = None) -> "NumericBoost":
+        """Use the boost array stored at index-build time when it was built with the same weights."""
+        merged = dict(DEFAULT_BOOST_WEIGHTS, **(weights or {}))
+        stored = snapshot.boost if snapshot.boost_weights == merged else None
+        return cls(snapshot.rating, snapshot.discount, snapshot.price, snapshot.out_of_stock, weights, stored)
+
+    @property
+    def weights(self) -> Dict[str, float]:
+        return dict(self._weights)
+
+    def _component(self, name: str) -> np.ndarray:
+        comp = self._components.get(name)
+        if comp is None:
+            w = self._weights
+            col = self._columns[name]
+            if name == "rating":
+                comp = np.clip(col.astype(np.float64) / w["rating_max"], 0.0, 1.0)
+            elif name == "discount":
+                comp = np.clip(col.astype(np.float64) / w["discount_max"], 0.0, 1.0)
+            elif name == "price":
+                p = col.astype(np.float64)
+                comp = np.where(p <= 0, w["price_missing"], 1.0 - np.minimum(p, w["price_cap"]) / w["price_cap"])
+            else:
+                comp = np.where(col, w["out_of_stock"], 1.0)
+            self._components[name] = comp
+        return comp
+
+    def _combine(self) -> np.ndarray:
+        w = self._weights
+        boost = 1.0 + w["rating"] * self._component("rating") + w["discount"] * self._component("discount") \
+            + w["price"] * self._component("price")
+        return boost * self._component("stock")
+
+    def set_weights(self, **weights: float) -> np.ndarray:
+        """Update some weights and recompute the boost array (vectorized, no index reload)."""
+        _check(weights)
+        with self._lock:
+            changed = {k for k, v in weights.items() if self._weights[k] != v}
+            if not changed:
+                return self.values
+            self._weights.update(weights)
+            for k in changed:
+                self._components.pop(_COMPONENT_OF.get(k), None)
+            self.values = self._combine()
+            self.version += 1
+            return self.values
+
+    def with_weights(self, **weights: float) -> "NumericBoost":
+        """A new boost with some weights changed; this one is left as is (cached components are shared)."""
+        _check(weights)
+        with self._lock:
+            boost = NumericBoost(self._columns["rating"], self._columns["discount"], self._columns["price"],
+                                 self._columns["stock"], self._weights, self.values)
+            boost._components = dict(self._components)
+        boost.set_weights(**weights)
+        return boost
+
+    def apply(self, ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """Boosted scores for docs `ids` (one gather + multiply)."""
+        return scores * self.values[ids]
+
+
+def compute_boost(rating: np.ndarray, discount: np.ndarray, price: np.ndarray, out_of_stock: np.ndarray,
+                  weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    return NumericBoost(rating, discount, price, out_of_stock, weights).values
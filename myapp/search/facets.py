@@ -0,0 +1,132 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from myapp.search.index_snapshot import FACET_FIELDS, IndexSnapshot
+
+# Price facet buckets (selling price, INR): (label, min inclusive, max exclusive); unpriced products are in none
+PRICE_BUCKETS: List[Tuple[str, float, Optional[float]]] = [
+    ("Under 500", 0.0, 500.0),
+    ("500 - 1000", 500.0, 1000.0),
+    ("1000 - 2000", 1000.0, 2000.0),
+    ("2000 - 5000", 2000.0, 5000.0),
+    ("5000 and above", 5000.0, None),
+]
+_PRICE_EDGES = np.array([lo for _, lo, _ in PRICE_BUCKETS[1:]], dtype=np.float32)
+
+# Rating facet: "<n> stars & up"
+RATING_LEVELS = [4, 3, 2, 1]
+
+
+class FacetFilters:
+    """
+    Structured filters of a search. Values of one facet field are OR-ed,
+    the fields and the numeric ranges are AND-ed. Unrated products fail a
+    `min_rating` filter and unpriced ones (stored as price 0) a price range.
+    """
+
+    def __init__(self, brand: Iterable[str] = (), category: Iterable[str] = (), sub_category: Iterable[str] = (),
+                 price_min: Optional[float] = None, price_max: Optional[float] = None,
+                 min_rating: Optional[float] = None, in_stock: bool = False):
+        self.values: Dict[str, frozenset] = {
+            "brand": frozenset(v for v in brand if v),
+            "category": frozenset(v for v in category if v),
+            "sub_category": frozenset(v for v in sub_category if v),
+        }
+        self.price_min = price_min
+        self.price_max = price_max
+        self.min_rating = min_rating
+        self.in_stock = in_stock
+
+    @classmethod
+    def from_args(cls, args: Mapping) -> "FacetFilters":
+        """From request form / query args (multi-valued for the facet fields; bad numbers are ignored)."""
+        def number(name: str) -> Optional[float]:
+            try:
+                return float(args.get(name)) if args.get(name) not in (None, "") else None
+            except (TypeError, ValueError):
+                return None
+
+        getlist = getattr(args, "getlist", lambda name: args.get(name) or [])
+        return cls(
+            **{f: getlist(f) for f in FACET_FIELDS},
+            price_min=number("price_min"),
+            price_max=number("price_max"),
+            min_rating=number("min_rating"),
+            in_stock=str(args.get("in_stock", "")).lower() in ("1", "true", "on", "yes"),
+        )
+
+    def key(self) -> tuple:
+        """Hashable form, for cache keys."""
+        return (tuple(tuple(sorted(self.values[f])) for f in FACET_FIELDS),
+                self.price_min, self.price_max, self.min_rating, self.in_stock)
+
+    def __bool__(self) -> bool:
+        return any(self.values.values()) or self.in_stock or any(
+            v is not None for v in (self.price_min, self.price_max, self.min_rating))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**{f: sorted(self.values[f]) for f in FACET_FIELDS}, "price_min": self.price_min,
+                "price_max": self.price_max, "min_rating": self.min_rating, "in_stock": self.in_stock}
+
+
+# Filtering (doc ids of one segment)
+def filter_mask(snapshot: IndexSnapshot, ids: np.ndarray, filters: FacetFilters) -> np.ndarray:
+    """Mask of the docs among `ids` that pass `filters`."""
+    mask = np.ones(len(ids), dtype=bool)
+    for f in FACET_FIELDS:
+        wanted = filters.values[f]
+        if wanted:
+            # lookup table by value code; the extra last slot answers code -1 (missing)
+            table = np.zeros(len(snapshot.facet_values[f]) + 1, dtype=bool)
+            table[:-1] = [v in wanted for v in snapshot.facet_values[f]]
+            mask &= table[snapshot.facet_codes[f][ids]]
+    if filters.price_min is not None or filters.price_max is not None:
+        price = snapshot.price[ids]
+        mask &= price > 0
+        if filters.price_min is not None:
+            mask &= price >= filters.price_min
+        if filters.price_max is not None:
+            mask &= price <= filters.price_max
+    if filters.min_rating is not None:
+        mask &= snapshot.rating[ids] >= filters.min_rating
+    if filters.in_stock:
+        mask &= ~snapshot.out_of_stock[ids]
+    return mask
+
+
+# Counts
+def count_facets(snapshot: IndexSnapshot, ids: np.ndarray) -> Dict[str, np.ndarray]:
+    """Raw per-facet counts over the docs `ids` of one segment (bincounts, merged by `merge_counts`)."""
+    counts = {f: np.bincount(snapshot.facet_codes[f][ids] + 1, minlength=len(snapshot.facet_values[f]) + 1)[1:]
+              for f in FACET_FIELDS}
+    price = snapshot.price[ids]
+    counts["price"] = np.bincount(np.searchsorted(_PRICE_EDGES, price[price > 0], side="right"),
+                                  minlength=len(PRICE_BUCKETS))
+    stars = np.clip(np.floor(snapshot.rating[ids]).astype(np.int64), 0, 5)
+    counts["rating"] = np.bincount(stars, minlength=6)
+    counts["in_stock"] = np.array([len(ids) - int(snapshot.out_of_stock[ids].sum())])
+    return counts
+
+def merge_counts(parts: List[Tuple[IndexSnapshot, Dict[str, np.ndarray]]], total: int) -> Dict[str, Any]:
+    """
+    Facet counts of a result set from its per-segment `count_facets`:
+    value -> count per facet field (most frequent first), price bucket label ->
+    count, "<n> stars & up" -> count, in-stock count and the `total`.
+    """
+    out: Dict[str, Any] = {}
+    for f in FACET_FIELDS:
+        merged: Dict[str, int] = {}
+        for snapshot, counts in parts:
+            for value, n in zip(snapshot.facet_values[f], counts[f].tolist()):
+                if n:
+                    merged[value] = merged.get(value, 0) + n
+        out[f] = dict(sorted(merged.items(), key=lambda kv: (-kv[1], kv[0])))
+    price = sum((counts["price"] for _, counts in parts), np.zeros(len(PRICE_BUCKETS), dtype=np.int64))
+    out["price"] = {label: int(n) for (label, _, _), n in zip(PRICE_BUCKETS, price)}
+    stars = sum((counts["rating"] for _, counts in parts), np.zeros(6, dtype=np.int64))
+    at_least = np.cumsum(stars[::-1])[::-1]
+    out["rating"] = {f"{level} stars & up": int(at_least[level]) for level in RATING_LEVELS}
+    out["in_stock"] = sum(int(counts["in_stock"][0]) for _, counts in parts)
+    out["total"] = total
+    return out
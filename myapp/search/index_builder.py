@@ -0,0 +1,250 @@
+"""
+Parallel corpus preprocessing + boolean inverted index build (Part 1/2 pipeline).
+
+Reads the raw product catalog and writes the artifacts the web app loads:
+
+    data/fashion_products_dataset_enriched.json   (process_record + enrich_record)
+    data/index/boolean_inverted_index.json
+    data/index/docid_pid_map.json
+    data/index/indexed_fields.json
+    data/index/index_snapshot.bin                  (unless --no-snapshot)
+
+Map-reduce over a process pool: the catalog is cut into contiguous shards,
+each worker cleans / tokenizes / stems / enriches its shard and returns the
+enriched records plus a partial inverted index keyed by global doc id. Shards
+come back in order, so the reduce step only concatenates per-term postings
+lists, which are already sorted.
+
+Usage (from the repo root):
+    python -m myapp.search.index_builder [--workers N] [--input path] [--out-dir dir]
+"""
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from unidecode import unidecode
+
+from myapp.search.index_snapshot import (
+    DATA_DIR, ENRICHED_PATH, INVERTED_PATH, DOCMAP_PATH, SNAPSHOT_PATH,
+    INDEXED_TEXT_FIELDS, _doc_tokens, build_snapshot
+)
+from myapp.search.query_analysis import QueryAnalyzer
+
+RAW_PATH = DATA_DIR / "fashion_products_dataset.json"
+FIELDS_PATH = INVERTED_PATH.with_name("indexed_fields.json")
+
+SHARD_SIZE = int(os.getenv("INDEX_BUILD_SHARD_SIZE", "500"))
+
+# one analyzer per worker process; no whole-text memo (fields rarely repeat)
+_analyzer = QueryAnalyzer(query_cache_size=0)
+
+
+# Field parsing (same rules as the Part 1 enrichment notebook)
+def _to_bool(val: Any) -> Optional[bool]:
+    if isinstance(val, bool):
+        return val
+    if val is None:
+        return None
+    s = str(val).strip().lower()
+    if s in {"true", "yes", "1"}:
+        return True
+    if s in {"false", "no", "0"}:
+        return False
+    return None
+
+def _to_float_price(val: Any) -> Optional[float]:
+    if val is None:
+        return None
+    m = re.search(r"(\d+(\.\d+)?)", str(val).replace(",", ""))
+    return float(m.group(1)) if m else None
+
+def _to_int_discount_percent(val: Any) -> Optional[int]:
+    if val is None:
+        return None
+    m = re.search(r"(\d+)\s*%?", str(val))
+    return int(m.group(1)) if m else None
+
+def _to_float_rating(val: Any) -> Optional[float]:
+    if val is None:
+        return None
+    try:
+        return float(str(val).strip())
+    except ValueError:
+        return None
+
+def _norm_str(val: Any) -> Optional[str]:
+    if val is None:
+        return None
+    s = unidecode(str(val)).strip().lower()
+    return s if s else None
+
+def _flatten_product_details(pd: Any) -> Tuple[Dict[str, str], str]:
+    items = []
+    if isinstance(pd, list):
+        items = [kv for item in pd if isinstance(item, dict) for kv in item.items()]
+    elif isinstance(pd, dict):
+        items = list(pd.items())
+    out: Dict[str, str] = {}
+    for k, v in items:
+        k_norm = _norm_str(k) or ""
+        if k_norm:
+            out[k_norm] = _norm_str(v) or ""
+    pd_text = "; ".join([f"{k}: {v}" if v else f"{k}" for k, v in out.items()]).strip()
+    return out, pd_text
+
+def _bucket_price(x: Optional[float]) -> Optional[str]:
+    if x is None:
+        return None
+    return "low" if x < 1000 else "mid" if x < 3000 else "high"
+
+def _bucket_discount(p: Optional[int]) -> Optional[str]:
+    if p is None:
+        return None
+    return "0" if p == 0 else "1-20" if p <= 20 else "21-40" if p <= 40 else "41+"
+
+def _bucket_rating(r: Optional[float]) -> Optional[str]:
+    if r is None:
+        return None
+    return "0-2" if r < 2 else "2-3.5" if r < 3.5 else "3.5-4.5" if r < 4.5 else "4.5-5"
+
+
+# Map: one shard -> (enriched records, partial inverted index)
+def _text_field(text: Any) -> Tuple[List[str], str]:
+    toks = _analyzer.tokens(text or "")
+    return toks, " ".join(toks)
+
+def _derived_fields(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields added by Part 1 `process_record` + `enrich_record`, in their order."""
+    out: Dict[str, Any] = {}
+    out["title_tokens"], out["title_clean"] = _text_field(rec.get("title", ""))
+    out["description_tokens"], out["description_clean"] = _text_field(rec.get("description", ""))
+
+    brand = _norm_str(rec.get("brand"))
+    category = _norm_str(rec.get("category"))
+    sub_category = _norm_str(rec.get("sub_category"))
+    seller = _norm_str(rec.get("seller"))
+    out["brand_norm"] = brand
+    out["category_norm"] = category
+    out["sub_category_norm"] = sub_category
+    out["seller_norm"] = seller
+
+    pd_map, pd_text = _flatten_product_details(rec.get("product_details"))
+    out["product_details_map"] = pd_map
+    out["product_details_text"] = pd_text
+
+    parts = [brand or "", category or "", sub_category or "", seller or "", pd_text or ""]
+    out["metadata_tokens"], out["metadata_clean"] = _text_field(" | ".join([p for p in parts if p]))
+
+    actual_price_num = _to_float_price(rec.get("actual_price"))
+    selling_price_num = _to_float_price(rec.get("selling_price"))
+    discount_pct = _to_int_discount_percent(rec.get("discount"))
+    average_rating_num = _to_float_rating(rec.get("average_rating"))
+    out["out_of_stock_bool"] = _to_bool(rec.get("out_of_stock"))
+    out["actual_price_num"] = actual_price_num
+    out["selling_price_num"] = selling_price_num
+    out["discount_pct"] = discount_pct
+    out["average_rating_num"] = average_rating_num
+
+    out["price_bucket"] = _bucket_price(selling_price_num or actual_price_num)
+    out["discount_bucket"] = _bucket_discount(discount_pct)
+    out["rating_bucket"] = _bucket_rating(average_rating_num)
+    return out
+
+def enrich_record(rec: Dict[str, Any]) -> Dict[str, Any]:
+    return {**rec, **_derived_fields(rec)}
+
+def _map_shard(args: Tuple[int, List[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], Dict[str, List[int]]]:
+    # only the derived fields travel back to the parent, which already has the raw records
+    start, records = args
+    derived = [_derived_fields(rec) for rec in records]
+    partial: Dict[str, List[int]] = {}
+    for did, fields in enumerate(derived, start):
+        # dict.fromkeys: unique terms in first-seen order (deterministic, unlike set)
+        for term in dict.fromkeys(_doc_tokens(fields, INDEXED_TEXT_FIELDS)):
+            partial.setdefault(term, []).append(did)
+    return derived, partial
+
+
+# Reduce
+def build_index(records: List[Dict[str, Any]], workers: int = 1, shard_size: int = SHARD_SIZE):
+    """
+    Returns (enriched records, inverted index, docid -> pid). `workers <= 1`
+    runs the map step in-process.
+    """
+    shards = [(i, records[i:i + shard_size]) for i in range(0, len(records), shard_size)]
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_map_shard, shards))
+    else:
+        results = [_map_shard(s) for s in shards]
+
+    enriched: List[Dict[str, Any]] = []
+    inverted_index: Dict[str, List[int]] = {}
+    for (start, records_in), (derived, partial) in zip(shards, results):
+        enriched.extend({**rec, **fields} for rec, fields in zip(records_in, derived))
+        for term, docs in partial.items():
+            postings = inverted_index.get(term)
+            if postings is None:
+                inverted_index[term] = docs
+            else:
+                postings.extend(docs)
+
+    docid_to_pid = {i: rec.get("pid") or rec.get("_id", f"missing_pid_{i}") for i, rec in enumerate(enriched)}
+    return enriched, inverted_index, docid_to_pid
+
+def write_artifacts(enriched, inverted_index, docid_to_pid, out_dir: Optional[Path] = None) -> Dict[str, Path]:
+    """Write the JSON artifacts (same layout as the notebooks) under `out_dir` (default: data/)."""
+    data_dir = Path(out_dir) if out_dir else DATA_DIR
+    paths = {
+        "enriched": data_dir / ENRICHED_PATH.relative_to(DATA_DIR),
+        "inverted": data_dir / INVERTED_PATH.relative_to(DATA_DIR),
+        "docmap": data_dir / DOCMAP_PATH.relative_to(DATA_DIR),
+        "fields": data_dir / FIELDS_PATH.relative_to(DATA_DIR),
+    }
+    paths["inverted"].parent.mkdir(parents=True, exist_ok=True)
+    with paths["enriched"].open("w", encoding="utf-8") as f:
+        json.dump(enriched, f, ensure_ascii=False, indent=2)
+    paths["inverted"].write_text(json.dumps(inverted_index), encoding="utf-8")
+    paths["docmap"].write_text(json.dumps({"docid_to_pid": docid_to_pid}, ensure_ascii=False), encoding="utf-8")
+    paths["fields"].write_text(json.dumps({"indexed_fields": INDEXED_TEXT_FIELDS}, ensure_ascii=False, indent=2), encoding="utf-8")
+    return paths
+
+def read_catalog(path: Path = RAW_PATH) -> List[Dict[str, Any]]:
+    with Path(path).open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array.")
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the enriched corpus and inverted index in parallel.")
+    parser.add_argument("--input", type=Path, default=RAW_PATH)
+    parser.add_argument("--out-dir", type=Path, default=None, help="defaults to data/")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--no-snapshot", action="store_true", help="skip the binary snapshot build")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    records = read_catalog(args.input)
+    t_read = time.perf_counter()
+    enriched, inverted_index, docid_to_pid = build_index(records, args.workers, args.shard_size)
+    t_build = time.perf_counter()
+    paths = write_artifacts(enriched, inverted_index, docid_to_pid, args.out_dir)
+    t_write = time.perf_counter()
+    print(f"{len(enriched)} docs, {len(inverted_index)} terms, {args.workers} workers: "
+          f"read {t_read - t0:.1f}s, build {t_build - t_read:.1f}s, write {t_write - t_build:.1f}s")
+    for p in paths.values():
+        print(f"  wrote {p}")
+
+    if not args.no_snapshot:
+        out = build_snapshot(
+            paths["inverted"].parent / SNAPSHOT_PATH.name, paths["enriched"], paths["inverted"], paths["docmap"]
+        )
+        print(f"  wrote {out} ({time.perf_counter() - t_write:.1f}s)")
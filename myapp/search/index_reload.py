@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from myapp.search.algorithms import swap_index
+from myapp.search.index_snapshot import SNAPSHOT_PATH, load_snapshot
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class IndexReloader:
+    """
+    Hot reload of the index snapshot, without a restart.
+
+    A background thread loads the snapshot file and swaps it in
+    (`algorithms.swap_index`) when `trigger()` is called (admin endpoint)
+    or, with `interval` > 0, when the file changes (polled every `interval`
+    seconds; snapshots are written to a temp file and renamed, so a partial
+    file is never seen). Queries already running finish on the old snapshot.
+    `on_load()` runs once the new snapshot has loaded, to prepare what goes
+    with it (e.g. reload the product store); it may return a callable that
+    swaps that in, run right after the index swap. If the snapshot or
+    `on_load()` fails, neither is swapped: the error is reported in
+    `stats()` and the current snapshot stays in place.
+    """
+
+    def __init__(self, path: Path = SNAPSHOT_PATH, interval: float = 0.0,
+                 on_load: Optional[Callable[[], Optional[Callable[[], None]]]] = None):
+        self.path = Path(path)
+        self.interval = interval
+        self.on_load = on_load
+        self._seen = _signature(self.path)
+        self._wake = threading.Event()
+        self._stop = False
+        self._requested = False
+        self._lock = threading.Lock()
+        self.counts = {"reloads": 0, "errors": 0}
+        self.last_error: Optional[str] = None
+        self.last_reload_seconds = 0.0
+        self.last_reload_at: Optional[float] = None
+        self._thread = threading.Thread(target=self._run, name="index-reload", daemon=True)
+        self._thread.start()
+
+    def trigger(self) -> bool:
+        """Reload in the background. False if a reload is already queued."""
+        with self._lock:
+            if self._requested:
+                return False
+            self._requested = True
+        self._wake.set()
+        return True
+
+    def reload(self) -> str:
+        """Load the snapshot file and swap it in now. Returns its checksum."""
+        t0 = time.perf_counter()
+        signature = _signature(self.path)
+        snapshot = load_snapshot(self.path)
+        swap = self.on_load() if self.on_load is not None else None
+        checksum = swap_index(snapshot)
+        if swap is not None:
+            swap()
+        with self._lock:
+            self._seen = signature
+            self.counts["reloads"] += 1
+            self.last_error = None
+            self.last_reload_seconds = time.perf_counter() - t0
+            self.last_reload_at = time.time()
+        return checksum
+
+    def close(self):
+        self._stop = True
+        self._wake.set()
+        self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "watch_interval": self.interval,
+                **self.counts,
+                "pending": self._requested,
+                "last_reload_ms": round(self.last_reload_seconds * 1e3, 1),
+                "last_reload_at": self.last_reload_at,
+                "last_error": self.last_error,
+            }
+
+    # Helpers
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval or None)
+            self._wake.clear()
+            if self._stop:
+                return
+            with self._lock:
+                requested, self._requested = self._requested, False
+            changed = self.interval and _signature(self.path) not in (self._seen, None)
+            if not (requested or changed):
+                continue
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Error reloading index snapshot {self.path}: {e}")
+                with self._lock:
+                    # do not retry a broken file until it changes again
+                    self._seen = _signature(self.path)
+                    self.counts["errors"] += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
@@ -0,0 +1,542 @@
+"""
+Offline index build + binary snapshot for myapp.search.algorithms.
+
+The build step parses the enriched corpus, the boolean inverted index and the
+docid -> pid map once, precomputes every table the rankers need and writes
+them into a single binary file:
+
+    [magic 8B][header length 8B][JSON header][array 0][array 1]...
+
+The JSON header carries the format version, a checksum of the source JSON
+files and the dtype / shape / offset of every array (offsets are 64-byte
+aligned). Postings are CSR-style: postings `term_ptr[t]:term_ptr[t + 1]`
+belong to term id `t`, with the raw term frequencies and TF-IDF weights in the
+parallel `post_tf` / `post_tfidf` arrays (`post_tf` uses the narrowest
+unsigned dtype that fits, usually uint8). Their doc ids are compressed: each
+term's sorted ids are delta-encoded and the gaps packed at one width per term
+(`post_width`: 1, 2 or 4 bytes, the narrowest that fits its largest gap,
+little-endian) from byte `post_offset[t]` of `post_bytes`, so a term decodes
+as a zero-copy view plus a running sum. Each term's postings are split into
+blocks of BLOCK_SIZE; the skip table holds every block's first doc id
+(`block_first`; term `t` owns blocks `block_ptr[t]:block_ptr[t + 1]`, and a
+block's bytes start at a fixed stride from the term's offset), so a lookup
+decodes only the blocks that can hold the doc ids it probes. Terms with
+df > N / 32 additionally get a packed bitmap row (`bitmaps`, little bit order)
+for word-parallel AND / OR / NOT candidate generation. Each facet field
+(brand, category, sub_category) is stored as a per-doc code column
+(`<field>_codes`, -1 = missing) over its sorted distinct values (`<field>_values`).
+
+Snapshots are memory-mapped read-only by default, so every web worker on the
+host serves the arrays from the same page-cache copy of the file.
+
+Usage (from the repo root):
+    python -m myapp.search.index_snapshot [--force]
+"""
+import argparse
+import copy
+import hashlib
+import json
+import math
+import os
+import struct
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Optional, Sequence
+
+import numpy as np
+
+from myapp.search.boost import DEFAULT_BOOST_WEIGHTS, compute_boost
+from myapp.search.load_corpus import load_records
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DATA_DIR = REPO_ROOT / "data"
+INDEX_DIR = DATA_DIR / "index"
+
+ENRICHED_PATH = DATA_DIR / "fashion_products_dataset_enriched.json"
+INVERTED_PATH = INDEX_DIR / "boolean_inverted_index.json"
+DOCMAP_PATH = INDEX_DIR / "docid_pid_map.json"
+SNAPSHOT_PATH = INDEX_DIR / "index_snapshot.bin"
+
+SOURCE_PATHS = (ENRICHED_PATH, INVERTED_PATH, DOCMAP_PATH)
+
+INDEXED_TEXT_FIELDS = ["title_clean", "description_clean", "metadata_clean"]
+FACET_FIELDS = ["brand", "category", "sub_category"]
+
+MAGIC = b"IRWAIDX\0"
+FORMAT_VERSION = 7
+_ALIGN = 64
+# Postings per compressed doc id block (one skip table entry each)
+BLOCK_SIZE = 128
+
+
+class SnapshotFormatError(ValueError):
+    """The file is not a snapshot, or was written by another format version."""
+
+
+def facet_arrays(values: Dict[str, List[Optional[str]]]) -> Dict[str, np.ndarray]:
+    """Code column + value blob of each facet field, from its per-doc values (None = missing)."""
+    arrays = {}
+    for name, column in values.items():
+        distinct = sorted({v for v in column if v})
+        code_of = {v: i for i, v in enumerate(distinct)}
+        arrays[f"{name}_codes"] = np.array([code_of[v] if v else -1 for v in column], dtype=np.int32)
+        arrays[f"{name}_values"] = np.frombuffer("\n".join(distinct).encode("utf-8"), dtype=np.uint8)
+    return arrays
+
+# Doc id compression
+# gap widths in bytes and the dtypes that read them back as a zero-copy view
+_GAP_DTYPES = {1: np.dtype("<u1"), 2: np.dtype("<u2"), 4: np.dtype("<u4")}
+
+def _unpack_gaps(buf: np.ndarray, width: np.ndarray, byte_pos: np.ndarray) -> np.ndarray:
+    """Gaps stored at `byte_pos` with per-gap `width` (bytes, little-endian), as int64."""
+    gaps = buf[byte_pos].astype(np.int64)
+    for i in (1, 2, 3):
+        wide = np.flatnonzero(width > i)
+        if not len(wide):
+            break
+        gaps[wide] |= buf[byte_pos[wide] + i].astype(np.int64) << (8 * i)
+    return gaps
+
+def encode_postings(term_ptr: np.ndarray, post_docs: np.ndarray) -> Dict[str, np.ndarray]:
+    """Compressed doc id arrays (packed gaps + skip table) of CSR postings with sorted doc ids per term."""
+    d = post_docs.astype(np.int64)
+    df = np.diff(term_ptr)
+    n_terms, nnz = len(df), len(d)
+    heads = term_ptr[:-1][df > 0]
+    gaps = np.diff(d, prepend=0)
+    gaps[heads] = 0   # a term's first doc id is its first block's entry in the skip table
+    if (gaps < 0).any():
+        raise ValueError("Postings doc ids must be sorted within each term")
+
+    max_gap = np.zeros(n_terms, dtype=np.int64)
+    if nnz:
+        max_gap[df > 0] = np.maximum.reduceat(gaps, heads)
+    width = np.where(max_gap < 1 << 8, 1, np.where(max_gap < 1 << 16, 2, 4)).astype(np.uint8)
+    post_offset = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum(-(-(width * df) // 4) * 4, out=post_offset[1:])   # terms start 4-byte aligned
+    term_of = np.repeat(np.arange(n_terms), df)
+    post_width = width[term_of]
+    byte_pos = post_offset[term_of] + post_width * (np.arange(nnz) - term_ptr[term_of])
+    post_bytes = np.zeros(int(post_offset[-1]), dtype=np.uint8)
+    for i in range(4):
+        wide = post_width > i
+        post_bytes[byte_pos[wide] + i] = (gaps[wide] >> (8 * i)) & 0xFF
+
+    n_blocks = -(-df // BLOCK_SIZE)
+    block_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum(n_blocks, out=block_ptr[1:])
+    # posting index of every block's first posting
+    first = np.repeat(term_ptr[:-1], n_blocks) \
+        + BLOCK_SIZE * (np.arange(int(block_ptr[-1])) - np.repeat(block_ptr[:-1], n_blocks))
+    return {
+        "post_bytes": post_bytes,
+        "post_offset": post_offset,
+        "post_width": width,
+        "block_ptr": block_ptr,
+        "block_first": d[first].astype(np.int32),
+    }
+
+def _decode_lines(blob: np.ndarray) -> List[str]:
+    text = blob.tobytes().decode("utf-8")
+    return text.split("\n") if text else []
+
+def _doc_tokens(record: Dict[str, Any], fields: Iterable[str]) -> List[str]:
+    toks: List[str] = []
+    for f in fields:
+        val = record.get(f)
+        if val:
+            toks.extend(str(val).split())
+    return toks
+
+
+# Source checks
+def source_checksum(paths: Sequence[Path] = SOURCE_PATHS) -> str:
+    """sha256 over the raw bytes of every source file, in order."""
+    h = hashlib.sha256()
+    for p in paths:
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+def _source_signature(paths: Sequence[Path]) -> List[List[Any]]:
+    sig = []
+    for p in paths:
+        st = os.stat(p)
+        sig.append([Path(p).name, st.st_size, st.st_mtime_ns])
+    return sig
+
+
+# Snapshot object
+class IndexSnapshot:
+    """
+    Read-only view over a snapshot file.
+    Arrays are NumPy views over the (memory-mapped) file; only the vocab is
+    decoded into a per-process dict (`term_ids`, term -> id). Pids stay in the
+    mapped blob and are decoded on demand by `pid()`.
+    """
+
+    def __init__(self, meta: Dict[str, Any], arrays: Dict[str, np.ndarray], path: Optional[Path] = None):
+        self.meta = meta
+        self.path = path
+        self.version: int = meta["version"]
+        self.checksum: str = meta["checksum"]
+        self.n_docs: int = meta["n_docs"]
+        self.n_terms: int = meta["n_terms"]
+        self.avg_doc_len: float = meta["avg_doc_len"]
+
+        self.term_ptr: np.ndarray = arrays["term_ptr"]
+        # compressed doc ids (see the module docstring); decode with term_docs / block_docs
+        self.post_bytes: np.ndarray = arrays["post_bytes"]
+        self.post_offset: np.ndarray = arrays["post_offset"]
+        self.post_width: np.ndarray = arrays["post_width"]
+        self.block_ptr: np.ndarray = arrays["block_ptr"]
+        self.block_first: np.ndarray = arrays["block_first"]
+        self.post_tf: np.ndarray = arrays["post_tf"]
+        self.post_tfidf: np.ndarray = arrays["post_tfidf"]
+        self.idf_tfidf: np.ndarray = arrays["idf_tfidf"]
+        self.idf_bm25: np.ndarray = arrays["idf_bm25"]
+        self.doc_len: np.ndarray = arrays["doc_len"]
+        self.doc_norms: np.ndarray = arrays["doc_norms"]
+
+        # raw numeric fields used by the "custom" ranker
+        self.rating: np.ndarray = arrays["rating"]
+        self.discount: np.ndarray = arrays["discount"]
+        self.price: np.ndarray = arrays["price"]
+        self.out_of_stock: np.ndarray = arrays["out_of_stock"]
+        # their combined boost factor, precomputed with `boost_weights`
+        self.boost: np.ndarray = arrays["boost"]
+        self.boost_weights: Dict[str, float] = meta["boost_weights"]
+
+        self.term_ids: Dict[str, int] = {t: i for i, t in enumerate(_decode_lines(arrays["vocab"]))}
+        self._pid_blob: np.ndarray = arrays["pids"]
+        self._pid_ptr: np.ndarray = arrays["pid_ptr"]
+
+        # packed doc bitmaps of the frequent terms (row i belongs to term bitmap_terms[i])
+        self.bitmap_terms: np.ndarray = arrays["bitmap_terms"]
+        self.bitmaps: np.ndarray = arrays["bitmaps"]
+
+        # facet fields: per-doc value codes (-1 = missing) and the decoded values
+        self.facet_codes: Dict[str, np.ndarray] = {f: arrays[f"{f}_codes"] for f in FACET_FIELDS}
+        self.facet_values: Dict[str, List[str]] = {f: _decode_lines(arrays[f"{f}_values"]) for f in FACET_FIELDS}
+
+    def with_stats(self, avg_doc_len: float, idf_bm25: np.ndarray) -> "IndexSnapshot":
+        """Same postings and doc arrays with other BM25 collection statistics (live view of an updated index)."""
+        view = copy.copy(self)
+        view.avg_doc_len = avg_doc_len
+        view.idf_bm25 = idf_bm25
+        return view
+
+    def pid(self, did: int) -> str:
+        s, e = self._pid_ptr[did], self._pid_ptr[did + 1]
+        return self._pid_blob[s:e].tobytes().decode("utf-8")
+
+    def term_range(self, term: str) -> Optional[tuple]:
+        """(start, end) of the term's postings in the CSR arrays, or None if unknown."""
+        tid = self.term_ids.get(term)
+        if tid is None:
+            return None
+        return int(self.term_ptr[tid]), int(self.term_ptr[tid + 1])
+
+    def postings(self, term: str) -> np.ndarray:
+        """Sorted doc ids containing `term` (empty array if unknown)."""
+        tid = self.term_ids.get(term)
+        if tid is None:
+            return np.empty(0, dtype=np.int32)
+        return self.term_docs(tid)
+
+    def term_docs(self, tid: int, end: Optional[int] = None) -> np.ndarray:
+        """
+        Decoded doc ids of the postings of term `tid` (of terms `tid`..`end` - 1
+        with `end`), aligned with postings `term_ptr[tid]:term_ptr[end]`.
+        """
+        if end is None or end == tid + 1:
+            n = int(self.term_ptr[tid + 1] - self.term_ptr[tid])
+            if not n:
+                return np.empty(0, dtype=np.int32)
+            width, lo = int(self.post_width[tid]), int(self.post_offset[tid])
+            docs = self.post_bytes[lo:lo + width * n].view(_GAP_DTYPES[width]).cumsum(dtype=np.int32)
+            docs += self.block_first[self.block_ptr[tid]]
+            return docs
+        lengths = np.diff(self.term_ptr[tid:end + 1])
+        terms = np.repeat(np.arange(tid, end), lengths)
+        width = self.post_width[terms].astype(np.int64)
+        nth = np.arange(len(terms)) - (self.term_ptr[terms] - self.term_ptr[tid])
+        gaps = _unpack_gaps(self.post_bytes, width, self.post_offset[terms] + width * nth)
+        # running sum restarted at every term's first posting, from its first doc id
+        docs = np.cumsum(gaps)
+        heads = np.flatnonzero(nth == 0)
+        docs += np.repeat(self.block_first[self.block_ptr[terms[heads]]] - docs[heads], lengths[lengths > 0])
+        return docs.astype(np.int32)
+
+    def block_docs(self, tid: int, blocks: np.ndarray) -> np.ndarray:
+        """Decoded doc ids of the (ascending) skip table blocks `blocks` of term `tid` (0 = its first), concatenated."""
+        n = int(self.term_ptr[tid + 1] - self.term_ptr[tid])
+        width, lo = int(self.post_width[tid]), int(self.post_offset[tid])
+        gaps = self.post_bytes[lo:lo + width * n].view(_GAP_DTYPES[width])
+        sizes = np.minimum(BLOCK_SIZE, n - BLOCK_SIZE * blocks)
+        heads = np.cumsum(sizes) - sizes
+        docs = gaps[np.arange(int(sizes.sum())) + np.repeat(BLOCK_SIZE * blocks - heads, sizes)].cumsum(dtype=np.int64)
+        docs += np.repeat(self.block_first[self.block_ptr[tid] + blocks] - docs[heads], sizes)
+        return docs.astype(np.int32)
+
+
+# Build
+def _compute_arrays(
+    docs_raw: List[Dict[str, Any]],
+    inverted_index: Dict[str, List[int]],
+    docid_to_pid: Dict[str, str]
+) -> Dict[str, Any]:
+    n_docs = len(docs_raw)
+    terms = sorted(inverted_index)
+    term_to_id = {t: i for i, t in enumerate(terms)}
+
+    doc_tf: List[Dict[str, int]] = []
+    doc_len = np.zeros(n_docs, dtype=np.int32)
+    for did, rec in enumerate(docs_raw):
+        tf = Counter(_doc_tokens(rec, INDEXED_TEXT_FIELDS))
+        doc_tf.append(tf)
+        doc_len[did] = sum(tf.values())
+    avg_doc_len = float(doc_len.sum()) / max(n_docs, 1)
+
+    # TF-IDF (log2, no smoothing) and BM25 idf, same formulas as algorithms.py
+    idf_tfidf = np.zeros(len(terms), dtype=np.float64)
+    idf_bm25 = np.zeros(len(terms), dtype=np.float64)
+    for tid, t in enumerate(terms):
+        df = len(inverted_index[t])
+        idf_tfidf[tid] = math.log2(n_docs / df) if df > 0 else 0.0
+        idf_bm25[tid] = math.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+
+    # CSR postings
+    term_ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    for tid, t in enumerate(terms):
+        term_ptr[tid + 1] = term_ptr[tid] + len(inverted_index[t])
+    nnz = int(term_ptr[-1])
+    post_docs = np.empty(nnz, dtype=np.int32)
+    post_tf = np.empty(nnz, dtype=np.int32)
+    post_tfidf = np.empty(nnz, dtype=np.float32)
+    for tid, t in enumerate(terms):
+        start = term_ptr[tid]
+        idf = idf_tfidf[tid]
+        for j, did in enumerate(inverted_index[t]):
+            f = doc_tf[did].get(t, 0)
+            post_docs[start + j] = did
+            post_tf[start + j] = f
+            post_tfidf[start + j] = (1.0 + math.log2(f)) * idf if f > 0 else 0.0
+
+    # term frequencies are small: store them in the narrowest unsigned type that fits
+    post_tf = post_tf.astype(np.min_scalar_type(int(post_tf.max()) if nnz else 0))
+
+    doc_norms = np.zeros(n_docs, dtype=np.float64)
+    for did, tf_map in enumerate(doc_tf):
+        sq = 0.0
+        for t, f in tf_map.items():
+            tid = term_to_id.get(t)
+            if f <= 0 or tid is None:
+                continue
+            w = (1.0 + math.log2(f)) * idf_tfidf[tid]
+            sq += w * w
+        doc_norms[did] = math.sqrt(sq) if sq > 0 else 0.0
+
+    # dense bitmaps for the frequent terms (df > N / 32), smaller than their 4-byte doc ids
+    lengths = np.diff(term_ptr)
+    bitmap_terms = np.flatnonzero(lengths * 32 > n_docs).astype(np.int32)
+    bitmaps = np.zeros((len(bitmap_terms), -(-n_docs // 8)), dtype=np.uint8)
+    for row, tid in enumerate(bitmap_terms):
+        mask = np.zeros(n_docs, dtype=bool)
+        mask[post_docs[term_ptr[tid]:term_ptr[tid + 1]]] = True
+        bitmaps[row] = np.packbits(mask, bitorder="little")
+
+    rating = np.zeros(n_docs, dtype=np.float32)
+    discount = np.zeros(n_docs, dtype=np.float32)
+    price = np.zeros(n_docs, dtype=np.float32)
+    out_of_stock = np.zeros(n_docs, dtype=np.bool_)
+    pids = []
+    pid_ptr = np.zeros(n_docs + 1, dtype=np.int64)
+    for did, rec in enumerate(docs_raw):
+        rating[did] = rec.get("average_rating_num") or 0.0
+        discount[did] = rec.get("discount_pct") or 0
+        price[did] = rec.get("selling_price_num") or rec.get("actual_price_num") or 0.0
+        out_of_stock[did] = bool(rec.get("out_of_stock_bool"))
+        pid = (rec.get("pid") or docid_to_pid.get(str(did)) or "").encode("utf-8")
+        pids.append(pid)
+        pid_ptr[did + 1] = pid_ptr[did] + len(pid)
+
+    return {
+        "n_docs": n_docs,
+        "avg_doc_len": avg_doc_len,
+        "arrays": {
+            "vocab": np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+            "pids": np.frombuffer(b"".join(pids), dtype=np.uint8),
+            "pid_ptr": pid_ptr,
+            "term_ptr": term_ptr,
+            **encode_postings(term_ptr, post_docs),
+            "post_tf": post_tf,
+            "post_tfidf": post_tfidf,
+            "idf_tfidf": idf_tfidf.astype(np.float32),
+            "idf_bm25": idf_bm25.astype(np.float32),
+            "doc_len": doc_len,
+            "doc_norms": doc_norms.astype(np.float32),
+            "rating": rating,
+            "discount": discount,
+            "price": price,
+            "out_of_stock": out_of_stock,
+            "boost": compute_boost(rating, discount, price, out_of_stock, DEFAULT_BOOST_WEIGHTS),
+            "bitmap_terms": bitmap_terms,
+            "bitmaps": bitmaps,
+            **facet_arrays({f: [rec.get(f) for rec in docs_raw] for f in FACET_FIELDS}),
+        },
+        "n_terms": len(terms),
+    }
+
+def _write_snapshot(path: Path, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    table = {}
+    offset = 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        arrays[name] = arr
+        table[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+
+    header = json.dumps(dict(meta, arrays=table)).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+    header += b" " * (data_start - len(MAGIC) - 8 - len(header))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(data_start + table[name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    # atomic swap so concurrent workers never read a half-written file
+    os.replace(tmp, path)
+
+def build_snapshot(
+    out_path: Path = SNAPSHOT_PATH,
+    enriched_path: Path = ENRICHED_PATH,
+    inverted_path: Path = INVERTED_PATH,
+    docmap_path: Path = DOCMAP_PATH,
+    share_records: bool = False
+) -> Path:
+    """
+    Parse the source JSON files and write a fresh snapshot to `out_path`.
+    With `share_records` the parsed enriched corpus is kept for the next
+    `load_corpus` of the same file (see `load_records`).
+    """
+    sources = (Path(enriched_path), Path(inverted_path), Path(docmap_path))
+    checksum = source_checksum(sources)
+    signature = _source_signature(sources)
+
+    docs_raw = load_records(sources[0], share=share_records)
+    inverted_index = json.loads(sources[1].read_text(encoding="utf-8"))
+    docid_to_pid = json.loads(sources[2].read_text(encoding="utf-8"))["docid_to_pid"]
+
+    built = _compute_arrays(docs_raw, inverted_index, docid_to_pid)
+    meta = {
+        "version": FORMAT_VERSION,
+        "checksum": checksum,
+        "sources": signature,
+        "n_docs": built["n_docs"],
+        "n_terms": built["n_terms"],
+        "avg_doc_len": built["avg_doc_len"],
+        "fields": INDEXED_TEXT_FIELDS,
+        "boost_weights": DEFAULT_BOOST_WEIGHTS,
+        "created_at": time.time(),
+    }
+    _write_snapshot(Path(out_path), meta, built["arrays"])
+    return Path(out_path)
+
+
+# Load
+def read_header(path: Path) -> Dict[str, Any]:
+    """Read and validate only the JSON header of a snapshot."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise SnapshotFormatError(f"Not an index snapshot: {path}")
+        (hlen,) = struct.unpack("<Q", f.read(8))
+        meta = json.loads(f.read(hlen).decode("utf-8"))
+    if meta.get("version") != FORMAT_VERSION:
+        raise SnapshotFormatError(
+            f"Snapshot format v{meta.get('version')} != v{FORMAT_VERSION}: {path}"
+        )
+    meta["data_start"] = len(MAGIC) + 8 + hlen
+    return meta
+
+def load_snapshot(path: Path = SNAPSHOT_PATH, mmap: bool = True) -> IndexSnapshot:
+    """
+    Open a snapshot. With `mmap=True` (default) the arrays are read-only views
+    over a shared memory map of the file; with `mmap=False` the file is read
+    into private memory.
+    """
+    path = Path(path)
+    meta = read_header(path)
+    if mmap:
+        # plain ndarray views over the map: slicing a np.memmap subclass costs more than small decodes
+        buf = np.asarray(np.memmap(path, dtype=np.uint8, mode="r"))
+    else:
+        buf = np.frombuffer(path.read_bytes(), dtype=np.uint8)
+    arrays = {}
+    for name, spec in meta["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        start = meta["data_start"] + spec["offset"]
+        nbytes = int(np.prod(spec["shape"])) * dtype.itemsize
+        arrays[name] = buf[start:start + nbytes].view(dtype).reshape(spec["shape"])
+    return IndexSnapshot(meta, arrays, path)
+
+def is_current(meta: Dict[str, Any], sources: Sequence[Path] = SOURCE_PATHS) -> bool:
+    """
+    True if the snapshot was built from the current source files.
+    Unchanged size/mtime is trusted; otherwise the checksum decides.
+    """
+    try:
+        if meta.get("sources") == _source_signature(sources):
+            return True
+        return meta.get("checksum") == source_checksum(sources)
+    except FileNotFoundError:
+        # sources gone (e.g. deployed with the snapshot only): trust the snapshot
+        return True
+
+def load_or_build_snapshot(
+    path: Path = SNAPSHOT_PATH,
+    sources: Sequence[Path] = SOURCE_PATHS,
+    share_records: bool = False
+) -> IndexSnapshot:
+    """Load the snapshot, rebuilding it first if it is missing, outdated or stale."""
+    path = Path(path)
+    try:
+        fresh = is_current(read_header(path), sources)
+    except (FileNotFoundError, SnapshotFormatError):
+        fresh = False
+
+    if not fresh:
+        print(f"Building index snapshot: {path}")
+        build_snapshot(path, *sources, share_records=share_records)
+    return load_snapshot(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the binary search index snapshot.")
+    parser.add_argument("--out", type=Path, default=SNAPSHOT_PATH)
+    parser.add_argument("--force", action="store_true", help="rebuild even if the snapshot is current")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if not args.force and args.out.exists():
+        try:
+            if is_current(read_header(args.out)):
+                print(f"Snapshot is up to date: {args.out}")
+                raise SystemExit(0)
+        except SnapshotFormatError:
+            pass
+    build_snapshot(args.out)
+    snap = load_snapshot(args.out)
+    print(
+        f"Wrote {args.out} ({snap.n_docs} docs, {snap.n_terms} terms, "
+        f"{args.out.stat().st_size / 1e6:.1f} MB) in {time.perf_counter() - t0:.2f}s"
+    )
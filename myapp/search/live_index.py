@@ -0,0 +1,578 @@
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from myapp.search.boost import DEFAULT_BOOST_WEIGHTS, NumericBoost, compute_boost
+from myapp.search.index_builder import enrich_record
+from myapp.search.index_snapshot import (
+    FACET_FIELDS, FORMAT_VERSION, INDEXED_TEXT_FIELDS, IndexSnapshot, _doc_tokens, encode_postings, facet_arrays
+)
+from myapp.search.postings import select_candidates
+from myapp.search.scoring import ScoringEngine
+
+# Pending changes (delta products + deleted main products) that start a background merge
+MERGE_THRESHOLD = int(os.getenv("INDEX_MERGE_THRESHOLD", "1000"))
+
+
+class Product:
+    """An added / updated product of the delta segment: its indexed terms and ranking fields."""
+    __slots__ = ("pid", "terms", "freqs", "tids", "length", "rating", "discount", "price", "out_of_stock", "facets")
+
+    def __init__(self, record: Dict[str, Any]):
+        if not record.get("pid"):
+            raise ValueError("Product record without a pid")
+        if not all(f in record for f in INDEXED_TEXT_FIELDS):
+            # a raw catalog record: clean / tokenize it like the index build
+            record = enrich_record(record)
+        self.pid: str = record["pid"]
+        tf = Counter(_doc_tokens(record, INDEXED_TEXT_FIELDS))
+        self.terms = list(tf)
+        self.freqs = np.fromiter(tf.values(), dtype=np.int64, count=len(tf))
+        # term ids in the LiveIndex vocabulary, set when the product enters the delta
+        self.tids: Optional[np.ndarray] = None
+        self.length = int(self.freqs.sum())
+        self.rating = record.get("average_rating_num") or 0.0
+        self.discount = record.get("discount_pct") or 0
+        self.price = record.get("selling_price_num") or record.get("actual_price_num") or 0.0
+        self.out_of_stock = bool(record.get("out_of_stock_bool"))
+        self.facets = {f: record.get(f) for f in FACET_FIELDS}
+
+
+# Segment build (same formulas as index_snapshot._compute_arrays, vectorized over postings)
+def _idf(df: np.ndarray, n_docs: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(TF-IDF idf, BM25 idf) in float64."""
+    df = df.astype(np.float64)
+    with np.errstate(divide="ignore"):
+        idf_tfidf = np.where(df > 0, np.log2(n_docs / np.maximum(df, 1.0)), 0.0)
+    idf_bm25 = np.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+    return idf_tfidf, idf_bm25
+
+def _build_segment(
+    meta: Dict[str, Any],
+    terms: List[str],
+    post: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    doc_len: np.ndarray,
+    numeric: Dict[str, np.ndarray],
+    pids: Tuple[np.ndarray, np.ndarray],
+    facets: Dict[str, np.ndarray],
+    df: Optional[np.ndarray] = None,
+    n_stats: Optional[int] = None,
+    avg_doc_len: Optional[float] = None
+) -> IndexSnapshot:
+    """
+    IndexSnapshot over (term id, doc id, tf) postings. The idf / TF-IDF
+    weights come from the segment's own df and size unless collection-wide
+    `df` (per term), `n_stats` and `avg_doc_len` are given.
+    """
+    t, d, f = post
+    order = np.lexsort((d, t))
+    t, d, f = t[order], d[order], f[order]
+    n_docs, n_terms = len(doc_len), len(terms)
+
+    counts = np.bincount(t, minlength=n_terms)
+    term_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum(counts, out=term_ptr[1:])
+    idf_tfidf, idf_bm25 = _idf(counts if df is None else df, n_docs if n_stats is None else n_stats)
+    if avg_doc_len is None:
+        avg_doc_len = float(doc_len.sum()) / max(n_docs, 1)
+
+    w = (1.0 + np.log2(f.astype(np.float64))) * idf_tfidf[t]
+    doc_norms = np.sqrt(np.bincount(d, weights=w * w, minlength=n_docs))
+
+    bitmap_terms = np.flatnonzero(counts * 32 > n_docs).astype(np.int32)
+    bitmaps = np.zeros((len(bitmap_terms), -(-n_docs // 8)), dtype=np.uint8)
+    for row, tid in enumerate(bitmap_terms):
+        mask = np.zeros(n_docs, dtype=bool)
+        mask[d[term_ptr[tid]:term_ptr[tid + 1]]] = True
+        bitmaps[row] = np.packbits(mask, bitorder="little")
+
+    arrays = {
+        "vocab": np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+        "pids": pids[0],
+        "pid_ptr": pids[1],
+        "term_ptr": term_ptr,
+        **encode_postings(term_ptr, d),
+        "post_tf": f.astype(np.min_scalar_type(int(f.max()) if len(f) else 0)),
+        "post_tfidf": w.astype(np.float32),
+        "idf_tfidf": idf_tfidf.astype(np.float32),
+        "idf_bm25": idf_bm25.astype(np.float32),
+        "doc_len": doc_len.astype(np.int32),
+        "doc_norms": doc_norms.astype(np.float32),
+        **numeric,
+        "boost": compute_boost(numeric["rating"], numeric["discount"], numeric["price"],
+                               numeric["out_of_stock"], DEFAULT_BOOST_WEIGHTS),
+        "bitmap_terms": bitmap_terms,
+        "bitmaps": bitmaps,
+        **facets,
+    }
+    meta = dict(meta, version=FORMAT_VERSION, n_docs=n_docs, n_terms=n_terms, avg_doc_len=avg_doc_len,
+                boost_weights=DEFAULT_BOOST_WEIGHTS, created_at=time.time())
+    return IndexSnapshot(meta, arrays)
+
+def _product_columns(products: List[Product]) -> Dict[str, np.ndarray]:
+    return {
+        "rating": np.array([p.rating for p in products], dtype=np.float32),
+        "discount": np.array([p.discount for p in products], dtype=np.float32),
+        "price": np.array([p.price for p in products], dtype=np.float32),
+        "out_of_stock": np.array([p.out_of_stock for p in products], dtype=np.bool_),
+    }
+
+def _product_facets(products: List[Product]) -> Dict[str, np.ndarray]:
+    return facet_arrays({f: [p.facets[f] for p in products] for f in FACET_FIELDS})
+
+def _merge_facets(main: IndexSnapshot, live: np.ndarray, products: List[Product]) -> Dict[str, np.ndarray]:
+    """Facet columns of the live main docs followed by `products`, over the union of their values."""
+    arrays = {}
+    for f in FACET_FIELDS:
+        old = main.facet_values[f]
+        new = [p.facets[f] for p in products]
+        values = sorted(set(old).union(v for v in new if v))
+        code_of = {v: i for i, v in enumerate(values)}
+        # the trailing -1 keeps missing values (code -1) missing
+        remap = np.array([code_of[v] for v in old] + [-1], dtype=np.int32)
+        codes = np.concatenate([remap[main.facet_codes[f][live]],
+                                np.array([code_of[v] if v else -1 for v in new], dtype=np.int32)])
+        arrays[f"{f}_codes"] = codes
+        arrays[f"{f}_values"] = np.frombuffer("\n".join(values).encode("utf-8"), dtype=np.uint8)
+    return arrays
+
+def _product_postings(products: List[Product], base: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(term id, doc id, tf) of every product posting, doc ids from `base` in product order."""
+    if not products:
+        return (np.empty(0, dtype=np.int64),) * 3
+    d = np.repeat(np.arange(base, base + len(products), dtype=np.int64), [len(p.terms) for p in products])
+    return np.concatenate([p.tids for p in products]), d, np.concatenate([p.freqs for p in products])
+
+def _pid_blob(pids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    raw = [p.encode("utf-8") for p in pids]
+    ptr = np.zeros(len(raw) + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in raw], out=ptr[1:])
+    return np.frombuffer(b"".join(raw), dtype=np.uint8), ptr
+
+def merge_snapshot(main: IndexSnapshot, dead: np.ndarray, products: List[Product],
+                   new_terms: List[str]) -> IndexSnapshot:
+    """
+    New main segment: `main` without the `dead` docs, followed by `products`
+    (their term ids index main's vocabulary followed by `new_terms`).
+    Doc ids are renumbered densely (main order kept), the vocabulary drops
+    terms left without postings and is re-sorted, and every statistic is
+    recomputed, so the result equals a full rebuild of the same catalog.
+    """
+    live = ~dead
+    new_id = np.cumsum(live) - 1
+    n_live = int(live.sum())
+
+    # main postings of the live docs, then the products'
+    terms = list(main.term_ids) + new_terms
+    lengths = np.diff(main.term_ptr)
+    docs = main.term_docs(0, main.n_terms)
+    keep = live[docs]
+    t = np.repeat(np.arange(main.n_terms, dtype=np.int64), lengths)[keep]
+    d = new_id[docs[keep]].astype(np.int64)
+    f = main.post_tf[keep].astype(np.int64)
+    pt, pd, pf = _product_postings(products, base=n_live)
+    t, d, f = np.concatenate([t, pt]), np.concatenate([d, pd]), np.concatenate([f, pf])
+
+    # vocabulary: terms that still have postings, sorted like the build
+    counts = np.bincount(t, minlength=len(terms))
+    kept = sorted(np.flatnonzero(counts).tolist(), key=terms.__getitem__)
+    remap = np.full(len(terms), -1, dtype=np.int64)
+    remap[kept] = np.arange(len(kept))
+    terms = [terms[i] for i in kept]
+    t = remap[t]
+
+    doc_len = np.concatenate([main.doc_len[live], np.array([p.length for p in products], dtype=np.int32)])
+    cols = _product_columns(products)
+    numeric = {name: np.concatenate([getattr(main, name)[live], cols[name]]) for name in cols}
+    pid_len = np.diff(main._pid_ptr)
+    blob, ptr = _pid_blob([p.pid for p in products])
+    pid_ptr = np.zeros(n_live + len(products) + 1, dtype=np.int64)
+    np.cumsum(np.concatenate([pid_len[live], np.diff(ptr)]), out=pid_ptr[1:])
+    pids = np.concatenate([np.asarray(main._pid_blob)[np.repeat(live, pid_len)], blob]), pid_ptr
+
+    meta = {k: v for k, v in main.meta.items() if k not in ("arrays", "data_start")}
+    meta["generation"] = meta.get("generation", 0) + 1
+    return _build_segment(meta, terms, (t, d, f), doc_len, numeric, pids, _merge_facets(main, live, products))
+
+
+# Live index
+class Segment:
+    """
+    One searchable part of an IndexView: a snapshot with its scorer, candidate
+    backend and boost. Its doc ids start at `base` in the view; `dead` flags
+    deleted docs (None: no deletions).
+    """
+
+    def __init__(self, snapshot: IndexSnapshot, scorer: ScoringEngine, candidates, boost: NumericBoost,
+                 base: int = 0, dead: Optional[np.ndarray] = None):
+        self.snapshot = snapshot
+        self.scorer = scorer
+        self.candidates = candidates
+        self.boost = boost
+        self.base = base
+        self.dead = dead
+        self.n_dead = int(dead.sum()) if dead is not None else 0
+
+    def alive(self, ids: np.ndarray) -> np.ndarray:
+        """Mask of the non-deleted docs among `ids`."""
+        if self.dead is None:
+            return np.ones(len(ids), dtype=bool)
+        return ~self.dead[ids]
+
+
+class IndexView:
+    """
+    Immutable state of a LiveIndex: its segments and collection statistics.
+    A query ranks and resolves pids on one view from start to end, so a
+    concurrent update or merge never shows it half applied.
+    """
+
+    def __init__(self, segments: List[Segment], version: int, n_docs: int, avg_doc_len: float):
+        self.segments = segments
+        self.version = version
+        self.n_docs = n_docs
+        self.avg_doc_len = avg_doc_len
+
+    def pid(self, did: int) -> str:
+        for seg in reversed(self.segments):
+            if did >= seg.base:
+                return seg.snapshot.pid(did - seg.base)
+        raise IndexError(did)
+
+    def select_candidates(self, q_terms: List[str], neg_terms: List[str],
+                          use_and: bool = True) -> List[Optional[np.ndarray]]:
+        """
+        `select_candidates` over every segment (per segment doc ids, None = every
+        doc matching any query term). The OR fallback only applies when the AND
+        intersection is empty in all segments; deleted docs are dropped.
+        """
+        segments = self.segments
+        if len(segments) == 1 and segments[0].dead is None:
+            return [select_candidates(segments[0].candidates, q_terms, neg_terms, use_and)]
+        cands = None
+        if use_and:
+            cands = []
+            for seg in segments:
+                ids = seg.candidates.and_(q_terms)
+                if neg_terms:
+                    ids = seg.candidates.exclude(ids, neg_terms)
+                cands.append(ids[seg.alive(ids)])
+            if not any(len(c) for c in cands):
+                cands = None
+        if cands is None and neg_terms:
+            cands = []
+            for seg in segments:
+                ids = seg.candidates.exclude(seg.candidates.or_(q_terms), neg_terms)
+                cands.append(ids[seg.alive(ids)])
+        return cands if cands is not None else [None] * len(segments)
+
+
+class LiveIndex:
+    """
+    Updatable search index, LSM style.
+
+    The main segment is an immutable IndexSnapshot. `upsert()` puts added or
+    changed products into an in-memory delta segment and `delete()` (or an
+    update of a main product) sets a tombstone over the main copy. Term df,
+    the live doc count and the total doc length are adjusted per change, so
+    BM25 idf and length normalisation always reflect the live catalog
+    (TF-IDF / custom keep the main segment's weights until the next merge).
+
+    Once `merge_threshold` changes are pending, a background thread folds
+    delta and tombstones into a new main segment (`merge_snapshot`). Changes
+    made meanwhile are applied to the live state as usual and replayed onto
+    the new segment before it is swapped in. Readers take `view()`, an
+    immutable IndexView that is rebuilt lazily after each change. `load()`
+    replaces the main segment with a new snapshot without a restart.
+    """
+
+    def __init__(self, snapshot: IndexSnapshot, candidates_cls, k1: float = 1.5, b: float = 0.75,
+                 boost_weights: Optional[Dict[str, float]] = None, merge_threshold: int = MERGE_THRESHOLD):
+        self.candidates_cls = candidates_cls
+        self.k1 = k1
+        self.b = b
+        self.merge_threshold = merge_threshold
+        self._boost_weights = dict(boost_weights or {})
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._merging = False
+        self._log: Optional[List[Tuple[str, Any]]] = None
+        self.version = 0
+        self.merges = 0
+        self.last_merge_seconds = 0.0
+        self.reloads = 0
+        self._reset(self._segment(snapshot, NumericBoost.from_snapshot(snapshot, self._boost_weights)))
+
+    def _segment(self, snapshot: IndexSnapshot, boost: NumericBoost) -> Segment:
+        return Segment(snapshot, ScoringEngine(snapshot, self.k1, self.b), self.candidates_cls(snapshot), boost)
+
+    def _reset(self, main: Segment):
+        """Start over from a new main segment (no delta, no tombstones)."""
+        snap = main.snapshot
+        self._main = main
+        self._rows: Optional[Dict[str, int]] = None
+        self._dead = np.zeros(snap.n_docs, dtype=bool)
+        self._n_dead = 0
+        self._delta: Dict[str, Product] = {}
+        self._df = np.diff(snap.term_ptr).astype(np.int64)
+        # terms not in the main vocabulary get ids from main's n_terms up
+        self._main_terms: Optional[List[str]] = None
+        self._new_terms: Dict[str, int] = {}
+        self._new_names: List[str] = []
+        self._new_df: Dict[int, int] = {}
+        self._n_docs = snap.n_docs
+        self._total_len = int(snap.doc_len.sum())
+        self._view: Optional[IndexView] = None
+
+    @property
+    def main(self) -> IndexSnapshot:
+        return self._main.snapshot
+
+    @property
+    def pending(self) -> int:
+        """Delta products + deleted main products not merged yet."""
+        return len(self._delta) + self._n_dead
+
+    @property
+    def boost_weights(self) -> Dict[str, float]:
+        return self._main.boost.weights
+
+    # Writes
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Add or replace products (enriched or raw catalog records). Returns how many."""
+        products = [Product(r) for r in records]
+        with self._lock:
+            self._kill([did for p in products for did in self._apply(p.pid, p)[1]])
+            self._changed()
+        return len(products)
+
+    def delete(self, pids: Iterable[str]) -> int:
+        """Remove products by pid. Returns how many were in the index."""
+        with self._lock:
+            kill, n = [], 0
+            for pid in pids:
+                found, dids = self._apply(pid, None)
+                kill.extend(dids)
+                n += found
+            self._kill(kill)
+            if n:
+                self._changed()
+        return n
+
+    def _apply(self, pid: str, product: Optional[Product]) -> Tuple[bool, List[int]]:
+        """
+        Replace (`product`) or remove (None) `pid`. Returns whether it was in the
+        index and the main doc ids to tombstone (left for `_kill`).
+        """
+        if self._log is not None:
+            self._log.append((pid, product))
+        kill = []
+        old = self._delta.pop(pid, None)
+        if old is not None:
+            self._count(old, -1)
+        else:
+            did = self._main_rows().get(pid)
+            if did is not None and not self._dead[did]:
+                self._dead[did] = True
+                kill.append(did)
+        if product is not None:
+            product.tids = self._term_ids(product.terms)
+            self._delta[pid] = product
+            self._count(product, 1)
+        return old is not None or bool(kill), kill
+
+    def _main_rows(self) -> Dict[str, int]:
+        if self._rows is None:
+            snap = self._main.snapshot
+            self._rows = {snap.pid(did): did for did in range(snap.n_docs)}
+        return self._rows
+
+    def _term_ids(self, terms: List[str]) -> np.ndarray:
+        main_ids, n_main = self._main.snapshot.term_ids, self._main.snapshot.n_terms
+        tids = np.empty(len(terms), dtype=np.int64)
+        for i, t in enumerate(terms):
+            tid = main_ids.get(t)
+            if tid is None:
+                tid = self._new_terms.get(t)
+                if tid is None:
+                    tid = self._new_terms[t] = n_main + len(self._new_names)
+                    self._new_names.append(t)
+            tids[i] = tid
+        return tids
+
+    def _count(self, p: Product, sign: int):
+        n_main = len(self._df)
+        in_main = p.tids < n_main
+        self._df[p.tids[in_main]] += sign   # a product's term ids are distinct
+        for tid in p.tids[~in_main].tolist():
+            n = self._new_df.get(tid, 0) + sign
+            if n:
+                self._new_df[tid] = n
+            else:
+                del self._new_df[tid]
+        self._n_docs += sign
+        self._total_len += sign * p.length
+
+    def _kill(self, dids: List[int]):
+        """Account for newly tombstoned main docs (one pass over the decoded postings)."""
+        if not dids:
+            return
+        snap = self._main.snapshot
+        dids = np.asarray(dids, dtype=np.int64)
+        pos = np.flatnonzero(np.isin(snap.term_docs(0, snap.n_terms), dids))
+        np.subtract.at(self._df, np.searchsorted(snap.term_ptr, pos, side="right") - 1, 1)
+        self._n_dead += len(dids)
+        self._n_docs -= len(dids)
+        self._total_len -= int(snap.doc_len[dids].sum())
+
+    def _changed(self):
+        self.version += 1
+        self._view = None
+        if self.pending >= self.merge_threshold and not self._merging:
+            self._merging = True
+            threading.Thread(target=self._background_merge, name="index-merge", daemon=True).start()
+
+    def set_boost_weights(self, **weights: float):
+        """
+        Change "custom" boost weights. The main segment's boost is rebuilt
+        outside the lock and swapped in with a new segment, as `load()` does,
+        so views taken earlier keep ranking with the old weights.
+        """
+        while True:
+            main = self._main
+            boost = main.boost.with_weights(**weights)
+            with self._lock:
+                if self._main is not main:
+                    continue   # merged or reloaded meanwhile: rebuild on the new main segment
+                self._main = Segment(main.snapshot, main.scorer, main.candidates, boost, main.base, main.dead)
+                self._boost_weights.update(weights)
+                self.version += 1
+                self._view = None
+                return
+
+    # Merge
+    def merge(self) -> bool:
+        """Fold the delta and tombstones into a new main segment. False if nothing was pending."""
+        with self._merge_lock:
+            with self._lock:
+                if not self.pending:
+                    return False
+                main, dead, products = self._main.snapshot, self._dead.copy(), list(self._delta.values())
+                new_terms = list(self._new_names)
+                self._log = []
+            t0 = time.perf_counter()
+            try:
+                merged = merge_snapshot(main, dead, products, new_terms)
+                scorer = ScoringEngine(merged, self.k1, self.b)
+                scorer.term_upper_bounds()   # built here rather than by the first query
+                candidates = self.candidates_cls(merged)
+            except BaseException:
+                with self._lock:
+                    self._log = None
+                raise
+            with self._lock:
+                log, self._log = self._log, None
+                boost = NumericBoost.from_snapshot(merged, self._boost_weights)
+                self._reset(Segment(merged, scorer, candidates, boost))
+                self._kill([did for pid, product in log for did in self._apply(pid, product)[1]])
+                self.version += 1
+                self.merges += 1
+                self.last_merge_seconds = time.perf_counter() - t0
+            return True
+
+    def _background_merge(self):
+        try:
+            self.merge()
+        except Exception as e:
+            print(f"Error merging index segments: {e}")
+        finally:
+            with self._lock:
+                self._merging = False
+                if self.pending >= self.merge_threshold:
+                    self._changed()
+
+    # Reload
+    def load(self, snapshot: IndexSnapshot):
+        """
+        Swap in a new main snapshot (e.g. rebuilt on disk). Its scorer, term
+        bounds and candidate backend are built before the swap, so no query
+        waits on them; views taken earlier keep the old snapshot alive until
+        their queries finish. Pending changes are dropped: the new snapshot is
+        the whole catalog.
+        """
+        weights = dict(self._boost_weights)
+        main = self._segment(snapshot, NumericBoost.from_snapshot(snapshot, weights))
+        main.scorer.term_upper_bounds()
+        with self._merge_lock, self._lock:
+            if self._boost_weights != weights:
+                main.boost.set_weights(**self._boost_weights)
+            self._reset(main)
+            self.version += 1
+            self.reloads += 1
+
+    # Reads
+    def view(self) -> IndexView:
+        view = self._view
+        if view is None:
+            with self._lock:
+                if self._view is None:
+                    self._view = self._build_view()
+                view = self._view
+        return view
+
+    def _build_view(self) -> IndexView:
+        main = self._main
+        snap = main.snapshot
+        n, avg = self._n_docs, self._total_len / max(self._n_docs, 1)
+        if not self.pending:
+            return IndexView([main], self.version, n, avg)
+
+        # main segment with live BM25 statistics; pruning bounds scaled from the merged ones
+        idf_bm25 = _idf(self._df, n)[1].astype(np.float32)
+        ub = main.scorer.term_upper_bounds() * (idf_bm25.astype(np.float64) / snap.idf_bm25) \
+            * max(1.0, avg / snap.avg_doc_len) * (1.0 + 1e-6)
+        live_snap = snap.with_stats(avg, idf_bm25)
+        segments = [Segment(live_snap, ScoringEngine(live_snap, self.k1, self.b, upper_bounds=ub),
+                            main.candidates, main.boost, 0, self._dead.copy() if self._n_dead else None)]
+
+        if self._delta:
+            products = list(self._delta.values())
+            t, d, f = _product_postings(products)
+            # the delta's own vocabulary: the distinct term ids of its products
+            tids, local = np.unique(t, return_inverse=True)
+            if self._main_terms is None:
+                self._main_terms = list(snap.term_ids)
+            names, n_main = self._main_terms, snap.n_terms
+            terms = [names[i] if i < n_main else self._new_names[i - n_main] for i in tids.tolist()]
+            in_main = tids < n_main
+            df = np.empty(len(tids), dtype=np.int64)
+            df[in_main] = self._df[tids[in_main]]
+            df[~in_main] = [self._new_df[i] for i in tids[~in_main].tolist()]
+            delta = _build_segment({"checksum": f"{snap.checksum}+delta"}, terms, (local.ravel(), d, f),
+                                   np.array([p.length for p in products], dtype=np.int32),
+                                   _product_columns(products), _pid_blob([p.pid for p in products]),
+                                   _product_facets(products), df=df, n_stats=n, avg_doc_len=avg)
+            segments.append(Segment(delta, ScoringEngine(delta, self.k1, self.b), self.candidates_cls(delta),
+                                    NumericBoost.from_snapshot(delta, self._boost_weights), base=snap.n_docs))
+        return IndexView(segments, self.version, n, avg)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "docs": self._n_docs,
+                "main_docs": self._main.snapshot.n_docs,
+                "delta_docs": len(self._delta),
+                "deleted": self._n_dead,
+                "pending": self.pending,
+                "merge_threshold": self.merge_threshold,
+                "merging": self._merging,
+                "merges": self.merges,
+                "last_merge_ms": round(self.last_merge_seconds * 1e3, 1),
+                "reloads": self.reloads,
+                "checksum": self._main.snapshot.checksum,
+                "version": self.version,
+            }
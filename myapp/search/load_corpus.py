@@ -1,29 +1,115 @@
-import pandas as pd
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List
+
+from pydantic import TypeAdapter
 
 from myapp.search.objects import Document
-from typing import List, Dict
+from myapp.search.product_store import ProductStore
+
+_CHUNK_CHARS = 1 << 20
+_BATCH_SIZE = 1000
+_DELIMITERS = frozenset(" \t\r\n,]")
+_documents = TypeAdapter(List[Document])
+
+# Last catalog parsed with share=True, handed to the next reader of the same file
+_shared: Dict[tuple, List[Dict[str, Any]]] = {}
+
 
+def iter_records(path, chunk_chars: int = _CHUNK_CHARS) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the elements of a top-level JSON array, reading the file in chunks.
+    Only the current chunk plus the records already yielded are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        while not buf:
+            more = f.read(chunk_chars)
+            buf = more.lstrip()
+            if not more or (buf and buf[0] != "["):
+                raise ValueError("Expected a JSON array.")
+        eof = False
+        pos = 1
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ","):
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                if pos >= len(buf):
+                    raise json.JSONDecodeError("need more data", buf, pos)
+                value, end = decoder.raw_decode(buf, pos)
+                # a value cut by the chunk edge can still parse (e.g. "25" of "2500.0"),
+                # so only accept it when a delimiter follows
+                if end == len(buf) or buf[end] not in _DELIMITERS:
+                    if eof and end < len(buf):
+                        raise ValueError(f"Expecting ',' delimiter at char {end}")
+                    if not eof:
+                        raise json.JSONDecodeError("need more data", buf, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(chunk_chars)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield value
+            pos = end
 
-def load_corpus(path) -> List[Document]:
+def _file_key(path) -> tuple:
+    st = os.stat(path)
+    return os.path.realpath(path), st.st_size, st.st_mtime_ns
+
+def load_records(path, share: bool = False) -> List[Dict[str, Any]]:
+    """
+    Parse a JSON array file into a list of dicts. With `share=True` the list is
+    kept for the next `load_records` / `load_corpus` call on the same,
+    unchanged file, which takes it instead of parsing again.
+    """
+    key = _file_key(path)
+    records = _shared.pop(key, None)
+    if records is None:
+        records = list(iter_records(path))
+    if share:
+        _shared.clear()
+        _shared[key] = records
+    return records
+
+
+def _take_records(path) -> Iterable[Dict[str, Any]]:
+    """The shared parse of `path` if there is one, else a streaming reader."""
+    records = _shared.pop(_file_key(path), None)
+    _shared.clear()
+    return records if records is not None else iter_records(path)
+
+def load_corpus(path) -> Dict[str, Document]:
     """
     Load file and transform to dictionary with each document as an object for easier treatment when needed for displaying
      in results, stats, etc.
     :param path:
     :return:
     """
-    df = pd.read_json(path)
-    corpus = _build_corpus(df)
-    return corpus
+    return _build_corpus(_take_records(path))
+
+def load_product_store(path) -> ProductStore:
+    """Load the catalog into a columnar ProductStore (same pid -> Document interface, far less memory)."""
+    return ProductStore(_take_records(path))
 
-def _build_corpus(df: pd.DataFrame) -> Dict[str, Document]:
+def _build_corpus(records) -> Dict[str, Document]:
     """
-    Build corpus from dataframe
-    :param df:
+    Build corpus from an iterable of raw records, validating them in batches
+    :param records:
     :return:
     """
     corpus = {}
-    for _, row in df.iterrows():
-        doc = Document(**row.to_dict())
-        corpus[doc.pid] = doc
+    batch = []
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= _BATCH_SIZE:
+            corpus.update((doc.pid, doc) for doc in _documents.validate_python(batch))
+            batch = []
+    if batch:
+        corpus.update((doc.pid, doc) for doc in _documents.validate_python(batch))
     return corpus
-
@@ -122,3 +122,14 @@ class ResultItem(BaseModel):
 
     def to_json(self):
         return self.model_dump_json()
+
+
+class SearchResults(list):
+    """
+    The ResultItems of a search, plus the facet counts of all its matches
+    (`facets`, None unless requested).
+    """
+
+    def __init__(self, items=(), facets: Optional[Dict[str, Any]] = None):
+        super().__init__(items)
+        self.facets = facets
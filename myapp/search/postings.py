@@ -0,0 +1,259 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from myapp.search.index_snapshot import BLOCK_SIZE, IndexSnapshot
+
+
+# Below this length ratio a linear merge beats looking the short list up in the long one
+BINARY_SEARCH_RATIO = 8
+# Lookups go through the skip table only when the blocks they can touch (one per
+# probed doc at most) are under 1 / SKIP_FRACTION of the list; otherwise decoding
+# the whole list in one pass is cheaper
+SKIP_FRACTION = 4
+
+
+def _gallop_blocks(first: List[int], docs: List[int]) -> List[int]:
+    """
+    Blocks that may hold any of the sorted `docs`, given the blocks' sorted
+    first doc ids. Each doc is located by exponential search (steps 1, 2,
+    4, ... then a binary search) from the block of the previous one, and
+    the docs falling in a found block are skipped at once, so the cost grows
+    with the log of the distance between touched blocks, not the list length.
+    """
+    blocks: List[int] = []
+    n, m = len(first), len(docs)
+    j, i = 0, bisect_left(docs, first[0]) if n else m
+    while i < m:
+        x, step = docs[i], 1
+        while j + step < n and first[j + step] <= x:
+            j += step
+            step *= 2
+        j = bisect_right(first, x, j, min(j + step, n)) - 1
+        blocks.append(j)
+        i = bisect_left(docs, first[j + 1], i) if j + 1 < n else m
+    return blocks
+
+
+class PostingList:
+    """
+    One term's postings in a snapshot, decoded on demand: all of them
+    (`docs()`), or only the compressed blocks that can hold given doc ids
+    (`find()`, located through the skip table by exponential search).
+    """
+
+    def __init__(self, snapshot: IndexSnapshot, tid: int):
+        self.snapshot = snapshot
+        self.tid = tid
+        self.start = int(snapshot.term_ptr[tid])
+        self.blocks = int(snapshot.block_ptr[tid]), int(snapshot.block_ptr[tid + 1])
+        self._len = int(snapshot.term_ptr[tid + 1]) - self.start
+
+    def __len__(self) -> int:
+        return self._len
+
+    def docs(self) -> np.ndarray:
+        return self.snapshot.term_docs(self.tid)
+
+    def find(self, docs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Which of the sorted `docs` are in the list (mask), and the posting positions of those."""
+        if not len(docs) or not self._len:
+            return np.zeros(len(docs), dtype=bool), np.empty(0, dtype=np.int64)
+        if len(docs) * BLOCK_SIZE * SKIP_FRACTION <= self._len:
+            b0, b1 = self.blocks
+            touched = np.asarray(_gallop_blocks(self.snapshot.block_first[b0:b1].tolist(), docs.tolist()),
+                                 dtype=np.int64)
+            found = self.snapshot.block_docs(self.tid, touched)
+            if not len(found):
+                return np.zeros(len(docs), dtype=bool), np.empty(0, dtype=np.int64)
+            sizes = np.minimum(BLOCK_SIZE, self._len - BLOCK_SIZE * touched)
+            offsets = np.arange(len(found)) + np.repeat(BLOCK_SIZE * touched - (np.cumsum(sizes) - sizes), sizes)
+        else:
+            found = self.docs()
+            offsets = None
+        ix = np.minimum(np.searchsorted(found, docs), len(found) - 1)
+        hit = found[ix] == docs
+        return hit, self.start + (ix[hit] if offsets is None else offsets[ix[hit]])
+
+    def contains(self, docs: np.ndarray) -> np.ndarray:
+        return self.find(docs)[0]
+
+
+def posting_list(snapshot: IndexSnapshot, term: str) -> Optional[PostingList]:
+    tid = snapshot.term_ids.get(term)
+    return None if tid is None else PostingList(snapshot, tid)
+
+def intersect_sorted(a: np.ndarray, b: Union[np.ndarray, PostingList]) -> np.ndarray:
+    """
+    Intersection of two sorted, duplicate-free doc id lists.
+
+    When `b` is a compressed PostingList at least BINARY_SEARCH_RATIO times
+    longer than `a`, the docs of `a` are located in its skip table by
+    exponential search and only the blocks they fall in are decoded.
+    Otherwise both lists are decoded; the longer one is trimmed to the
+    [min, max] range of the shorter one (two binary searches), lopsided pairs
+    are intersected by one vectorized binary search of the short list in the
+    long one (O(m log n) instead of a linear O(m + n) merge), and other pairs
+    with a sorted merge.
+    """
+    if isinstance(b, PostingList):
+        if len(a) and len(b) >= BINARY_SEARCH_RATIO * len(a):
+            return a[b.contains(a)]
+        b = b.docs()
+    if len(a) > len(b):
+        a, b = b, a
+    if not len(a):
+        return a
+    lo = np.searchsorted(b, a[0], side="left")
+    hi = np.searchsorted(b, a[-1], side="right")
+    b = b[lo:hi]
+    if not len(b):
+        return b
+    if len(b) >= BINARY_SEARCH_RATIO * len(a):
+        pos = np.searchsorted(b, a)
+        pos[pos == len(b)] = len(b) - 1
+        return a[b[pos] == a]
+    return np.intersect1d(a, b, assume_unique=True)
+
+
+class ListCandidates:
+    """Candidate generation by merging the sorted CSR postings."""
+
+    name = "lists"
+
+    def __init__(self, snapshot: IndexSnapshot):
+        self.snapshot = snapshot
+
+    def and_(self, terms: Iterable[str]) -> np.ndarray:
+        """Docs containing every term (shortest postings first; longer ones decoded only where needed)."""
+        postings = []
+        for t in set(terms):
+            pl = posting_list(self.snapshot, t)
+            if pl is None or not len(pl):
+                return np.empty(0, dtype=np.int32)
+            postings.append(pl)
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+        postings.sort(key=len)
+        res = postings[0].docs()
+        for pl in postings[1:]:
+            res = intersect_sorted(res, pl)
+            if not len(res):
+                break
+        return res
+
+    def or_(self, terms: Iterable[str]) -> np.ndarray:
+        """Docs containing any term."""
+        postings = [self.snapshot.postings(t) for t in set(terms)]
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(postings))
+
+    def exclude(self, cand_ids: np.ndarray, terms: Iterable[str]) -> np.ndarray:
+        """`cand_ids` without the docs containing any of `terms`."""
+        cand_ids = np.asarray(cand_ids)
+        for t in set(terms):
+            pl = posting_list(self.snapshot, t)
+            if pl is None or not len(pl) or not len(cand_ids):
+                continue
+            cand_ids = cand_ids[~pl.contains(cand_ids)]
+        return cand_ids
+
+
+class BitmapCandidates:
+    """
+    Candidate generation over packed doc bitmaps.
+    Frequent terms use the snapshot's precomputed bitmap rows, so AND / OR /
+    NOT between them are word-parallel bitwise ops; rare terms stay sorted
+    arrays and are checked against bitmaps with direct bit lookups.
+    """
+
+    name = "bitmap"
+
+    def __init__(self, snapshot: IndexSnapshot):
+        self.snapshot = snapshot
+        self.n_bytes = -(-snapshot.n_docs // 8)
+        self._rows: Dict[int, int] = {int(tid): row for row, tid in enumerate(snapshot.bitmap_terms)}
+
+    def _split(self, terms: Iterable[str]) -> Tuple[List[np.ndarray], List[PostingList], bool]:
+        """(dense bitmap rows, sparse postings, any_unknown) for the terms."""
+        dense, sparse, unknown = [], [], False
+        for t in set(terms):
+            tid = self.snapshot.term_ids.get(t)
+            if tid is None:
+                unknown = True
+            elif tid in self._rows:
+                dense.append(self.snapshot.bitmaps[self._rows[tid]])
+            else:
+                sparse.append(PostingList(self.snapshot, tid))
+        return dense, sparse, unknown
+
+    def _to_ids(self, bits: np.ndarray) -> np.ndarray:
+        mask = np.unpackbits(bits, bitorder="little", count=self.snapshot.n_docs)
+        return np.flatnonzero(mask).astype(np.int32)
+
+    @staticmethod
+    def _test(bits: np.ndarray, docs: np.ndarray) -> np.ndarray:
+        return ((bits[docs >> 3] >> (docs & 7).astype(np.uint8)) & 1).astype(bool)
+
+    def and_(self, terms: Iterable[str]) -> np.ndarray:
+        dense, sparse, unknown = self._split(terms)
+        if unknown or not (dense or sparse):
+            return np.empty(0, dtype=np.int32)
+        bits = np.bitwise_and.reduce(dense) if dense else None
+        if not sparse:
+            return self._to_ids(bits)
+        sparse.sort(key=len)
+        res = sparse[0].docs()
+        for pl in sparse[1:]:
+            res = intersect_sorted(res, pl)
+        if bits is not None and len(res):
+            res = res[self._test(bits, res)]
+        return res
+
+    def or_(self, terms: Iterable[str]) -> np.ndarray:
+        dense, sparse, _ = self._split(terms)
+        if not dense:
+            return np.unique(np.concatenate([pl.docs() for pl in sparse])) if sparse else np.empty(0, dtype=np.int32)
+        bits = np.bitwise_or.reduce(dense) if len(dense) > 1 else dense[0].copy()
+        if sparse:
+            docs = np.concatenate([pl.docs() for pl in sparse])
+            np.bitwise_or.at(bits, docs >> 3, (1 << (docs & 7)).astype(np.uint8))
+        return self._to_ids(bits)
+
+    def exclude(self, cand_ids: np.ndarray, terms: Iterable[str]) -> np.ndarray:
+        cand_ids = np.asarray(cand_ids)
+        dense, sparse, _ = self._split(terms)
+        if dense and len(cand_ids):
+            bits = np.bitwise_or.reduce(dense) if len(dense) > 1 else dense[0]
+            cand_ids = cand_ids[~self._test(bits, cand_ids)]
+        for pl in sparse:
+            if not len(cand_ids):
+                break
+            cand_ids = cand_ids[~pl.contains(cand_ids)]
+        return cand_ids
+
+
+def select_candidates(backend, q_terms: List[str], neg_terms: List[str], use_and: bool = True) -> Optional[np.ndarray]:
+    """
+    Candidate doc ids of a query: the AND intersection when use_and (OR
+    fallback if it is empty), minus docs containing `neg_terms`.
+    None means every doc matching any query term (no exclusions to apply).
+    """
+    cand_ids = None
+    if use_and:
+        cand_ids = backend.and_(q_terms)
+        if neg_terms:
+            cand_ids = backend.exclude(cand_ids, neg_terms)
+        if not len(cand_ids):
+            cand_ids = None
+    if cand_ids is None and neg_terms:
+        cand_ids = backend.exclude(backend.or_(q_terms), neg_terms)
+    return cand_ids
+
+
+CANDIDATE_BACKENDS = {
+    ListCandidates.name: ListCandidates,
+    BitmapCandidates.name: BitmapCandidates,
+}
@@ -0,0 +1,265 @@
+import json
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from pydantic import TypeAdapter
+
+from myapp.search.objects import Document
+
+_BATCH_SIZE = 1000
+_documents = TypeAdapter(List[Document])
+
+NUMERIC_FIELDS = ["selling_price", "discount", "actual_price", "average_rating", "ranking"]
+TEXT_FIELDS = ["title", "description", "url"]
+CATEGORICAL_FIELDS = ["brand", "category", "sub_category", "seller"]
+JSON_FIELDS = ["product_details", "images"]
+
+
+class StringColumn:
+    """UTF-8 strings in one blob, addressed by an offsets array (None kept apart from "")."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._lengths = array("q")
+        self._null = array("b")
+        self.blob = b""
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.null = np.zeros(0, dtype=np.bool_)
+
+    def append(self, value: Optional[str]):
+        data = value.encode("utf-8") if value is not None else b""
+        self._buf += data
+        self._lengths.append(len(data))
+        self._null.append(value is None)
+
+    def freeze(self):
+        self.blob = bytes(self._buf)
+        self.offsets = np.zeros(len(self._lengths) + 1, dtype=np.int64)
+        np.cumsum(np.frombuffer(self._lengths, dtype=np.int64), out=self.offsets[1:])
+        self.null = np.frombuffer(self._null, dtype=np.int8).astype(np.bool_)
+        self._buf, self._lengths, self._null = bytearray(), array("q"), array("b")
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        if self.null[row]:
+            return None
+        return self.blob[self.offsets[row]:self.offsets[row + 1]].decode("utf-8")
+
+    def take(self, rows: np.ndarray) -> List[Optional[str]]:
+        """Bulk `__getitem__` (one numpy gather instead of per-row scalar lookups)."""
+        blob = self.blob
+        return [
+            None if null else blob[s:e].decode("utf-8")
+            for s, e, null in zip(self.offsets[rows].tolist(), self.offsets[rows + 1].tolist(), self.null[rows].tolist())
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.blob) + self.offsets.nbytes + self.null.nbytes
+
+
+class CategoryColumn:
+    """Low-cardinality strings interned as int32 codes (-1 = None)."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes_of: Dict[str, int] = {}
+        self._codes = array("i")
+        self.codes = np.zeros(0, dtype=np.int32)
+
+    def append(self, value: Optional[str]):
+        if value is None:
+            self._codes.append(-1)
+            return
+        code = self._codes_of.get(value)
+        if code is None:
+            code = self._codes_of[value] = len(self.values)
+            self.values.append(value)
+        self._codes.append(code)
+
+    def freeze(self):
+        self.codes = np.frombuffer(self._codes, dtype=np.int32).copy()
+        self._codes = array("i")
+
+    def code(self, value: str) -> int:
+        return self._codes_of.get(value, -2)
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        code = self.codes[row]
+        return None if code < 0 else self.values[code]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + sum(len(v) for v in self.values)
+
+
+class ProductRecord:
+    """The product fields the result list needs (what `ResultItem` is built from)."""
+    __slots__ = ("pid", "title", "description", "selling_price", "discount", "actual_price",
+                 "average_rating", "out_of_stock", "url")
+
+    def __init__(self, pid, title, description, selling_price, discount, actual_price,
+                 average_rating, out_of_stock, url):
+        self.pid = pid
+        self.title = title
+        self.description = description
+        self.selling_price = selling_price
+        self.discount = discount
+        self.actual_price = actual_price
+        self.average_rating = average_rating
+        self.out_of_stock = out_of_stock
+        self.url = url
+
+
+def _nan_to_none(values: List[float]) -> List[Optional[float]]:
+    return [None if v != v else v for v in values]
+
+
+class ProductStore:
+    """
+    Columnar product catalog, a drop-in for the `Dict[str, Document]` corpus.
+
+    Records are validated as `Document`s in batches (same parsing as before)
+    and then split into columns: float64 arrays (NaN = None) for the numeric
+    fields, a bool array for stock, offset-indexed UTF-8 blobs for free text,
+    interned codes for brand / category / seller and JSON blobs for the nested
+    fields. `record(s)` hands out slotted summary views for the result list;
+    `get(pid)` / `store[pid]` rebuild the full `Document` (product details page).
+    Products added or changed later (`upsert`) are kept as `Document`s next
+    to the columns, which are never rewritten.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self._pids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._updated: Dict[str, Document] = {}
+        numeric = {f: array("d") for f in NUMERIC_FIELDS}
+        stock = array("b")
+        self.text = {f: StringColumn() for f in TEXT_FIELDS}
+        self.categorical = {f: CategoryColumn() for f in CATEGORICAL_FIELDS}
+        self.nested = {f: StringColumn() for f in JSON_FIELDS}
+
+        for docs in self._batches(records):
+            for doc in docs:
+                # a later duplicate pid wins, like the dict corpus
+                self._rows[doc.pid] = len(self._pids)
+                self._pids.append(doc.pid)
+                for f in NUMERIC_FIELDS:
+                    v = getattr(doc, f)
+                    numeric[f].append(np.nan if v is None else v)
+                stock.append(doc.out_of_stock)
+                for f, col in self.text.items():
+                    col.append(getattr(doc, f))
+                for f, col in self.categorical.items():
+                    col.append(getattr(doc, f))
+                for f, col in self.nested.items():
+                    v = getattr(doc, f)
+                    col.append(None if v is None else json.dumps(v, ensure_ascii=False))
+
+        self.numeric = {f: np.frombuffer(a, dtype=np.float64).copy() for f, a in numeric.items()}
+        self.out_of_stock = np.frombuffer(stock, dtype=np.int8).astype(np.bool_)
+        for col in [*self.text.values(), *self.categorical.values(), *self.nested.values()]:
+            col.freeze()
+
+    @staticmethod
+    def _batches(records: Iterable[Dict[str, Any]]) -> Iterator[List[Document]]:
+        batch = []
+        for rec in records:
+            batch.append(rec)
+            if len(batch) >= _BATCH_SIZE:
+                yield _documents.validate_python(batch)
+                batch = []
+        if batch:
+            yield _documents.validate_python(batch)
+
+    # Updates
+    def upsert(self, records: Iterable[Dict[str, Any]]):
+        """Add or replace products (the old row, if any, is dropped from the pid index)."""
+        for docs in self._batches(records):
+            for doc in docs:
+                self._updated[doc.pid] = doc
+                self._rows.pop(doc.pid, None)
+
+    def delete(self, pids: Iterable[str]):
+        for pid in pids:
+            self._rows.pop(pid, None)
+            self._updated.pop(pid, None)
+
+    # Mapping interface (pid -> Document), as the dict corpus
+    def __len__(self) -> int:
+        return len(self._rows) + len(self._updated)
+
+    def __contains__(self, pid) -> bool:
+        return pid in self._rows or pid in self._updated
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._rows)
+        yield from list(self._updated)
+
+    def keys(self):
+        return self._rows.keys() if not self._updated else list(self)
+
+    def __getitem__(self, pid: str) -> Document:
+        doc = self.get(pid)
+        if doc is None:
+            raise KeyError(pid)
+        return doc
+
+    def get(self, pid: str, default=None) -> Optional[Document]:
+        doc = self._updated.get(pid)
+        if doc is not None:
+            return doc
+        row = self._rows.get(pid)
+        return default if row is None else self.document(row)
+
+    # Rows
+    def row(self, pid: str) -> Optional[int]:
+        return self._rows.get(pid)
+
+    def document(self, row: int) -> Document:
+        """Materialize the full Document of `row`."""
+        fields = {f: self.numeric[f][row].item() for f in NUMERIC_FIELDS}
+        fields = {f: None if v != v else v for f, v in fields.items()}
+        for f, col in [*self.text.items(), *self.categorical.items()]:
+            fields[f] = col[row]
+        for f, col in self.nested.items():
+            raw = col[row]
+            fields[f] = None if raw is None else json.loads(raw)
+        return Document(pid=self._pids[row], out_of_stock=bool(self.out_of_stock[row]), **fields)
+
+    def record(self, pid: str) -> Optional[ProductRecord]:
+        return self.records([pid])[0]
+
+    def records(self, pids: Sequence[str]) -> List[Optional[ProductRecord]]:
+        """Summary views for `pids` (None for unknown pids), numeric columns gathered in bulk."""
+        found = [self._rows.get(pid) for pid in pids]
+        rows = np.array([r for r in found if r is not None], dtype=np.int64)
+        cols = {f: _nan_to_none(self.numeric[f][rows].tolist())
+                for f in ("selling_price", "discount", "actual_price", "average_rating")}
+        stock = self.out_of_stock[rows].tolist()
+        title, description, url = (self.text[f].take(rows) for f in ("title", "description", "url"))
+
+        out: List[Optional[ProductRecord]] = []
+        j = 0
+        for pid, row in zip(pids, found):
+            if row is None:
+                doc = self._updated.get(pid)
+                out.append(None if doc is None else ProductRecord(
+                    doc.pid, doc.title, doc.description, doc.selling_price, doc.discount, doc.actual_price,
+                    doc.average_rating, doc.out_of_stock, doc.url
+                ))
+                continue
+            out.append(ProductRecord(
+                self._pids[row], title[j], description[j],
+                cols["selling_price"][j], cols["discount"][j], cols["actual_price"][j],
+                cols["average_rating"][j], stock[j], url[j]
+            ))
+            j += 1
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns (excluding the pid -> row dict)."""
+        cols = [*self.text.values(), *self.categorical.values(), *self.nested.values()]
+        return (sum(a.nbytes for a in self.numeric.values()) + self.out_of_stock.nbytes
+                + sum(c.nbytes for c in cols))
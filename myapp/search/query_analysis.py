@@ -0,0 +1,81 @@
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+from unidecode import unidecode
+
+# For repo imports
+import sys
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(REPO_ROOT / "project_progress"))
+from utils.preprocessing import STOPWORDS, STEMMER, URL_RE, preprocess_text_field
+
+
+# After lowercasing + unidecode, the separator / digit / punctuation / non-a-z
+# substitutions of `normalize_basic` all map to a space, so one pass is enough.
+_NON_ALPHA_RE = re.compile(r"[^a-z\s]+")
+
+# The only Treebank rules that fire on `[a-z ]` text (CONTRACTIONS2/3 without
+# an apostrophe). Everything else word_tokenize does is a whitespace split.
+TREEBANK_SPLITS = {
+    "cannot": ("can", "not"),
+    "gimme": ("gim", "me"),
+    "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"),
+    "lemme": ("lem", "me"),
+    "wanna": ("wan", "na"),
+}
+
+
+def fast_tokenize(cleaned: str) -> List[str]:
+    """word_tokenize for normalized (`[a-z ]` only) text."""
+    toks = []
+    for w in cleaned.split():
+        split = TREEBANK_SPLITS.get(w)
+        if split is None:
+            toks.append(w)
+        else:
+            toks.extend(split)
+    return toks
+
+
+class QueryAnalyzer:
+    """
+    Query-time equivalent of `preprocess_text_field(text)["tokens"]`:
+    precompiled single-pass normalization, whitespace tokenization and a
+    bounded memo for stems. Whole queries are memoized too (bounded LRU),
+    since popular queries repeat.
+    """
+
+    def __init__(self, stem_cache_size: int = 50_000, query_cache_size: int = 4096):
+        self._stem = lru_cache(maxsize=stem_cache_size)(STEMMER.stem)
+        self._analyze = lru_cache(maxsize=query_cache_size)(self._analyze_uncached)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        txt = unidecode(text.lower())
+        txt = URL_RE.sub(" ", txt)
+        return _NON_ALPHA_RE.sub(" ", txt)
+
+    def _analyze_uncached(self, text: str) -> Tuple[str, ...]:
+        stem = self._stem
+        return tuple(stem(t) for t in fast_tokenize(self.normalize(text)) if t not in STOPWORDS)
+
+    def tokens(self, text: str) -> List[str]:
+        if not text:
+            return []
+        return list(self._analyze(text))
+
+    def cache_info(self) -> dict:
+        return {"stems": self._stem.cache_info()._asdict(), "queries": self._analyze.cache_info()._asdict()}
+
+    def clear(self):
+        self._stem.cache_clear()
+        self._analyze.cache_clear()
+
+
+def verify_tokenizer(texts: Iterable[str], analyzer: QueryAnalyzer = None) -> List[str]:
+    """Texts where the fast path disagrees with `preprocess_text_field` (should be empty)."""
+    analyzer = analyzer or QueryAnalyzer(query_cache_size=0)
+    return [t for t in texts if analyzer.tokens(t) != preprocess_text_field(t)["tokens"]]
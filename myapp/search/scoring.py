@@ -0,0 +1,265 @@
+import math
+import threading
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from myapp.search.index_snapshot import IndexSnapshot
+from myapp.search.postings import PostingList
+
+
+class ScoringEngine:
+    """
+    Term-at-a-time BM25 / TF-IDF cosine scoring over the snapshot's CSR postings.
+
+    For every query term the postings slice (decoded doc ids + parallel tf /
+    tf-idf arrays) is scatter-added into a dense float64 accumulator of size
+    N_DOCS; candidates are then gathered from the accumulator in one shot.
+    Candidate sets much smaller than that work (e.g. narrowed by facet
+    filters) are scored doc-at-a-time instead, decoding only the postings
+    blocks that can hold them (`PostingList.find`).
+    Scores match the per-doc reference implementation up to float rounding.
+    `upper_bounds` can hand in per-term BM25 upper bounds known in advance
+    (they only need to be >= the true maxima for pruning to stay exact).
+    """
+
+    # doc-at-a-time when (candidates x terms x SPARSE_COST) < postings + N_DOCS
+    SPARSE_COST = 8
+    # MaxScore only pays off on large collections with long query postings; below
+    # either size one dense scatter-add beats the probe + essential-term passes
+    # (crossover measured on tiled copies of this corpus, benchmarks/bench_pruning.py)
+    PRUNE_MIN_DOCS = 20000
+    PRUNE_MIN_POSTINGS = 10000
+
+    def __init__(self, snapshot: IndexSnapshot, k1: float = 1.5, b: float = 0.75,
+                 upper_bounds: Optional[np.ndarray] = None):
+        self.snapshot = snapshot
+        self.k1 = k1
+        self.b = b
+        self._term_max = upper_bounds
+        self._term_max_lock = threading.Lock()
+        dl = snapshot.doc_len.astype(np.float64)
+        avg_doc_len = snapshot.avg_doc_len or 1.0
+        # BM25 length normalisation, k1 * (1 - b + b * dl / avgdl), per doc
+        self._len_norm = k1 * (1.0 - b + b * dl / avg_doc_len)
+        self._doc_norms = snapshot.doc_norms.astype(np.float64)
+
+    def _bm25_postings(self, ix: np.ndarray, docs: np.ndarray, idf: np.ndarray) -> np.ndarray:
+        """BM25 contribution of the postings at `ix`, of docs `docs` (idf given per posting or as a scalar)."""
+        f = self.snapshot.post_tf[ix].astype(np.float64)
+        return idf * (f * (self.k1 + 1.0) / (f + self._len_norm[docs]))
+
+    def _term_slice(self, t: str) -> Optional[Tuple[int, int, int]]:
+        tid = self.snapshot.term_ids.get(t)
+        if tid is None:
+            return None
+        return tid, int(self.snapshot.term_ptr[tid]), int(self.snapshot.term_ptr[tid + 1])
+
+    def _sparse(self, cand_ids: Optional[Sequence[int]], terms: List[Tuple[int, int, int]]) -> bool:
+        if cand_ids is None:
+            return False
+        work = self.snapshot.n_docs + sum(e - s for _, s, e in terms)
+        return len(cand_ids) * len(terms) * self.SPARSE_COST < work
+
+    def _positions(self, tid: int, docs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Which of the sorted `docs` are in the postings of `tid`, and their posting positions."""
+        return PostingList(self.snapshot, tid).find(docs)
+
+    @staticmethod
+    def _gather(acc: np.ndarray, cand_ids: Optional[Sequence[int]], touched: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if cand_ids is not None:
+            ids = np.asarray(cand_ids, dtype=np.int64)
+        elif touched:
+            ids = np.unique(np.concatenate(touched))
+        else:
+            ids = np.empty(0, dtype=np.int64)
+        return ids, acc[ids]
+
+    def bm25(self, q_terms: List[str], cand_ids: Optional[Sequence[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        BM25 scores for `cand_ids` (sorted doc ids), or for every doc matching
+        any query term if `cand_ids` is None. Returns (doc_ids, scores), zero
+        scores dropped, doc ids ascending.
+        """
+        snap = self.snapshot
+        terms = [sl for sl in map(self._term_slice, set(q_terms)) if sl is not None]
+        if self._sparse(cand_ids, terms):
+            ids = np.asarray(cand_ids, dtype=np.int64)
+            scores = self._score_docs(terms, ids)
+            keep = scores != 0
+            return ids[keep], scores[keep]
+
+        acc = np.zeros(snap.n_docs, dtype=np.float64)
+        touched = []
+        for tid, s, e in terms:
+            docs = snap.term_docs(tid)
+            acc[docs] += self._bm25_postings(slice(s, e), docs, float(snap.idf_bm25[tid]))
+            touched.append(docs)
+
+        ids, scores = self._gather(acc, cand_ids, touched)
+        keep = scores != 0
+        return ids[keep], scores[keep]
+
+    def tfidf(self, q_terms: List[str], cand_ids: Optional[Sequence[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """TF-IDF (log2) cosine scores, same contract as `bm25`."""
+        snap = self.snapshot
+        q_w = {}
+        q_sq = 0.0
+        for t, f in Counter(q_terms).items():
+            sl = self._term_slice(t)
+            w = (1.0 + math.log2(f)) * (float(snap.idf_tfidf[sl[0]]) if sl else 0.0)
+            if w != 0:
+                q_w[t] = (w, sl)
+                q_sq += w * w
+        q_norm = math.sqrt(q_sq)
+        if q_norm == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        if self._sparse(cand_ids, [sl for _, sl in q_w.values()]):
+            ids = np.asarray(cand_ids, dtype=np.int64)
+            dots = np.zeros(len(ids), dtype=np.float64)
+            for w, (tid, _, _) in q_w.values():
+                hit, pos = self._positions(tid, ids)
+                dots[hit] += w * snap.post_tfidf[pos].astype(np.float64)
+        else:
+            acc = np.zeros(snap.n_docs, dtype=np.float64)
+            touched = []
+            for w, (tid, s, e) in q_w.values():
+                docs = snap.term_docs(tid)
+                acc[docs] += w * snap.post_tfidf[s:e].astype(np.float64)
+                touched.append(docs)
+            ids, dots = self._gather(acc, cand_ids, touched)
+        keep = (dots > 0) & (self._doc_norms[ids] > 0)
+        ids = ids[keep]
+        return ids, dots[keep] / (q_norm * self._doc_norms[ids])
+
+    # Dynamic pruning (BM25)
+    def term_upper_bounds(self) -> np.ndarray:
+        """
+        Max BM25 contribution of every term over all of its postings (built
+        lazily once per engine, in chunks of ~1M postings; concurrent first
+        callers wait for a single build).
+        """
+        if self._term_max is not None:
+            return self._term_max
+        with self._term_max_lock:
+            if self._term_max is not None:
+                return self._term_max
+            snap = self.snapshot
+            term_max = np.zeros(snap.n_terms, dtype=np.float64)
+            lengths = np.diff(snap.term_ptr)
+            tid = 0
+            while tid < snap.n_terms:
+                end = int(np.searchsorted(snap.term_ptr, snap.term_ptr[tid] + (1 << 20), side="right"))
+                end = min(max(end - 1, tid + 1), snap.n_terms)
+                s, e = int(snap.term_ptr[tid]), int(snap.term_ptr[end])
+                chunk = np.arange(tid, end)
+                nonempty = chunk[lengths[tid:end] > 0]
+                if len(nonempty):
+                    idf = np.repeat(snap.idf_bm25[tid:end].astype(np.float64), lengths[tid:end])
+                    contrib = self._bm25_postings(slice(s, e), snap.term_docs(tid, end), idf)
+                    term_max[nonempty] = np.maximum.reduceat(contrib, snap.term_ptr[nonempty] - s)
+                tid = end
+            self._term_max = term_max
+        return self._term_max
+
+    def _score_docs(self, terms: List[Tuple[int, int, int]], docs: np.ndarray) -> np.ndarray:
+        """Exact BM25 of sorted `docs`, looking each doc up in every term's postings."""
+        acc = np.zeros(len(docs), dtype=np.float64)
+        for tid, _, _ in terms:
+            hit, pos = self._positions(tid, docs)
+            acc[hit] += self._bm25_postings(pos, docs[hit], float(self.snapshot.idf_bm25[tid]))
+        return acc
+
+    def bm25_top_k(self, q_terms: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k BM25 over the union of the query postings (OR semantics), with
+        MaxScore pruning when the collection and the query postings are large
+        enough for it to pay off. Same results as `top_k(*self.bm25(q_terms), k)`.
+        """
+        if not self._worth_pruning(q_terms):
+            return top_k(*self.bm25(q_terms), k)
+        ids, scores, _ = self._bm25_pruned(q_terms, k)
+        return top_k(ids, scores, k)
+
+    def _worth_pruning(self, q_terms: List[str]) -> bool:
+        if self.snapshot.n_docs < self.PRUNE_MIN_DOCS:
+            return False
+        slices = [sl for sl in map(self._term_slice, set(q_terms)) if sl is not None]
+        return len(slices) > 1 and sum(e - s for _, s, e in slices) >= self.PRUNE_MIN_POSTINGS
+
+    def _bm25_pruned(self, q_terms: List[str], k: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        MaxScore evaluation:
+          1) estimate the k-th best score (theta) by exactly scoring the docs
+             where the strongest query term contributes most;
+          2) terms whose upper bounds together stay below theta are
+             non-essential: a doc matching only those cannot reach the top k;
+          3) score exactly only the docs of the essential terms.
+        Returns (ids, scores, n_docs_scored).
+        """
+        snap = self.snapshot
+        ub = self.term_upper_bounds()
+        terms = []
+        for t in set(q_terms):
+            sl = self._term_slice(t)
+            if sl is not None and sl[2] > sl[1]:
+                terms.append(sl)
+        if not terms or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), 0
+        if len(terms) == 1:
+            ids, scores = self.bm25(q_terms)
+            return ids, scores, len(ids)
+
+        # 1) threshold estimate
+        tid0, s0, e0 = max(terms, key=lambda x: ub[x[0]])
+        probe = snap.term_docs(tid0)
+        n_probe = max(4 * k, 64)
+        if len(probe) > n_probe:
+            contrib = self._bm25_postings(slice(s0, e0), probe, float(snap.idf_bm25[tid0]))
+            probe = np.sort(probe[np.argpartition(-contrib, n_probe - 1)[:n_probe]])
+        probe_scores = self._score_docs(terms, probe)
+        n_scored = len(probe)
+        if len(probe_scores) < k:
+            ids, scores = self.bm25(q_terms)
+            return ids, scores, len(ids) + n_scored
+        theta = np.partition(probe_scores, len(probe_scores) - k)[len(probe_scores) - k]
+
+        # 2) non-essential terms: lowest upper bounds summing below theta
+        bound = 0.0
+        non_essential = set()
+        for tid, _, _ in sorted(terms, key=lambda x: ub[x[0]]):
+            # slack so float rounding in the bound can never prune a tying doc
+            if (bound + ub[tid]) * (1.0 + 1e-9) >= theta:
+                break
+            bound += ub[tid]
+            non_essential.add(tid)
+        if not non_essential:
+            ids, scores = self.bm25(q_terms)
+            return ids, scores, len(ids) + n_scored
+
+        # 3) exact scores for docs containing at least one essential term
+        cands = np.unique(np.concatenate([
+            snap.term_docs(tid) for tid, _, _ in terms if tid not in non_essential
+        ]))
+        scores = self._score_docs(terms, cands)
+        keep = scores != 0
+        return cands[keep], scores[keep], len(cands) + n_scored
+
+
+def top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k (ids, scores) by descending score, ties broken by ascending doc id
+    (the order `sorted(..., reverse=True)` gave over ascending candidates).
+    Uses argpartition so only the boundary needs a full sort.
+    """
+    if k <= 0 or not len(ids):
+        return ids[:0], scores[:0]
+    if len(ids) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        threshold = scores[part].min()
+        sel = np.flatnonzero(scores >= threshold)
+        ids, scores = ids[sel], scores[sel]
+    order = np.lexsort((ids, -scores))[:k]
+    return ids[order], scores[order]
@@ -1,8 +1,16 @@
 import random
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
 import numpy as np
 
-from myapp.search.objects import Document
-from myapp.search.algorithms import search_in_corpus
+from myapp.core.metrics import timed
+from myapp.search.objects import Document, SearchResults
+from myapp.search.algorithms import (
+    analyze_query, rank_documents, rank_documents_batch, rank_with_facets, build_results, details_url, index_version, index_view,
+    upsert_documents, delete_documents, index_stats
+)
+from myapp.search.cache import ResultCache
+from myapp.search.facets import FacetFilters
 
 
 def dummy_search(corpus: dict, search_id, num_results=20):
@@ -26,17 +34,77 @@ def dummy_search(corpus: dict, search_id, num_results=20):
 class SearchEngine:
     """Class that implements the search engine logic"""
 
-    def search(self, search_query, search_id, corpus):
+    def __init__(self, cache_size: int = 1024, cache_ttl: Optional[float] = None):
+        # results keyed on the analyzed query, without the per-search internal URLs
+        self.cache = ResultCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def search(self, search_query, search_id, corpus, method="bm25", k=20, use_and=True,
+               filters: Optional[FacetFilters] = None, facets: bool = False) -> SearchResults:
+        """
+        Top-k results of `search_query`. `filters` restrict them by brand,
+        category, price, rating or stock; with `facets=True` the returned
+        list's `facets` holds the facet counts of every match.
+        """
         print("Search query:", search_query)
 
-        # REAL SEARCH (BM25 default)
-        results = search_in_corpus(
-            query=search_query,
-            search_id=search_id,
-            corpus=corpus,
-            method="bm25",
-            k=20,
-            use_and=True
-        )
-
-        return results
+        with timed("search"):
+            q_terms, neg_terms = analyze_query(search_query)
+            filters = filters or None
+            key = (tuple(sorted(q_terms)), tuple(sorted(neg_terms)), method, k, use_and,
+                   filters.key() if filters else None, facets)
+
+            # one index view for the whole search, even if the index is updated meanwhile
+            view = index_view()
+            version = index_version(view)
+            with timed("cache_lookup"):
+                self.cache.set_version(version)
+                results = self.cache.get(key)
+            if results is None:
+                # REAL SEARCH (BM25 default)
+                counts = None
+                if facets:
+                    ids, scores, counts = rank_with_facets(q_terms, neg_terms, method=method, k=k, use_and=use_and,
+                                                           view=view, filters=filters)
+                else:
+                    ids, scores = rank_documents(q_terms, neg_terms, method=method, k=k, use_and=use_and, view=view,
+                                                 filters=filters)
+                results = SearchResults(build_results(ids, scores, corpus, view=view), counts)
+                self.cache.put(key, results, version=version)
+
+            # stamp this search's id into the internal links
+            with timed("stamp_urls"):
+                return SearchResults([r.model_copy(update={"url": details_url(r.pid, search_id)}) for r in results],
+                                     results.facets)
+
+    def search_batch(self, queries: Sequence[str], method="bm25", k=20, use_and=True, workers=1) -> List[List[Tuple[str, float]]]:
+        """
+        Rank many raw queries in one go (offline evaluation, query-log replay).
+        Returns the ranked (pid, score) list of every query, same ranking as
+        `search`. Bypasses the result cache.
+        """
+        analyzed = [analyze_query(q) for q in queries]
+        view = index_view()
+        ranked = rank_documents_batch(analyzed, method=method, k=k, use_and=use_and, workers=workers, view=view)
+        return [[(view.pid(did), score) for did, score in zip(ids.tolist(), scores.tolist())] for ids, scores in ranked]
+
+    # Catalog updates (no index rebuild or restart)
+    def upsert_products(self, records: Iterable[Dict[str, Any]], corpus=None) -> int:
+        """
+        Add or replace products in the live index, and in `corpus` (a
+        ProductStore) if given, so they show up in results right away.
+        """
+        records = list(records)
+        if corpus is not None:
+            corpus.upsert(records)
+        return upsert_documents(records)
+
+    def delete_products(self, pids: Iterable[str], corpus=None) -> int:
+        pids = list(pids)
+        n = delete_documents(pids)
+        if corpus is not None:
+            corpus.delete(pids)
+        return n
+
+    def index_stats(self) -> Dict[str, Any]:
+        """Size, pending changes, merges and reloads of the live index."""
+        return index_stats()
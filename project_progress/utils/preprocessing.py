@@ -20,16 +20,23 @@ _ensure_nltk()
 STOPWORDS = set(stopwords.words("english"))
 STEMMER = PorterStemmer()
 
+URL_RE = re.compile(r"http[s]?://\S+")
+SEPARATOR_RE = re.compile(r"[-_/]")
+DIGITS_RE = re.compile(r"\d+")
+PUNCT_RE = re.compile(r"[^\w\s]")
+NON_ALPHA_RE = re.compile(r"[^a-z\s]")
+SPACES_RE = re.compile(r"\s+")
+
 def normalize_basic(text: str) -> str:
     if not text:
         return ""
     txt = unidecode(text.lower())
-    txt = re.sub(r"http[s]?://\S+", " ", txt)
-    txt = re.sub(r"[-_/]", " ", txt)
-    txt = re.sub(r"\d+", " ", txt)
-    txt = re.sub(r"[^\w\s]", " ", txt)
-    txt = re.sub(r"[^a-z\s]", " ", txt)
-    txt = re.sub(r"\s+", " ", txt).strip()
+    txt = URL_RE.sub(" ", txt)
+    txt = SEPARATOR_RE.sub(" ", txt)
+    txt = DIGITS_RE.sub(" ", txt)
+    txt = PUNCT_RE.sub(" ", txt)
+    txt = NON_ALPHA_RE.sub(" ", txt)
+    txt = SPACES_RE.sub(" ", txt).strip()
     return txt
 
 def preprocess_text_field(text: str):
@@ -1,15 +1,21 @@
+import hmac
 import os
 import time
 from json import JSONEncoder
 
 import httpagentparser  # for getting the user agent as json
-from flask import Flask, render_template, session, request
+from flask import Flask, Response, abort, jsonify, render_template, session, request
 
 from myapp.analytics.analytics_data import AnalyticsData
-from myapp.search.load_corpus import load_corpus
-from myapp.search.objects import Document, StatsDocument
+from myapp.analytics.ingest import AnalyticsIngestQueue
+from myapp.core.metrics import instrument_app
+from myapp.search.facets import PRICE_BUCKETS, FacetFilters
+from myapp.search.index_reload import IndexReloader
+from myapp.search.load_corpus import load_product_store
+from myapp.search.objects import StatsDocument
 from myapp.search.search_engine import SearchEngine
 from myapp.generation.rag import RAGGenerator
+from myapp.generation.rag_jobs import RAGJobQueue
 from dotenv import load_dotenv
 
 load_dotenv()  # take environment variables from .env
@@ -25,32 +31,87 @@ JSONEncoder.default = _default
 
 # instantiate the Flask application
 app = Flask(__name__)
+# per-route / per-stage latency histograms, scraped from /metrics (METRICS_ENABLED=0 to disable)
+instrument_app(app)
 
 # random 'secret_key' is used for persisting data in secure cookie
 app.secret_key = os.getenv("SECRET_KEY")
 # open browser dev tool to see the cookies
 app.session_cookie_name = os.getenv("SESSION_COOKIE_NAME")
 
-# instantiate our search engine
-search_engine = SearchEngine()
-# instantiate our in memory persistence
-analytics_data = AnalyticsData()
-# instantiate RAG generator
+# instantiate our search engine (result cache: LRU size + optional TTL in seconds)
+search_engine = SearchEngine(
+    cache_size=int(os.getenv("SEARCH_CACHE_SIZE", "1024")),
+    cache_ttl=float(os.getenv("SEARCH_CACHE_TTL", "0")) or None
+)
+# instantiate our analytics persistence: SQLite event log (ANALYTICS_DB, relative to this file;
+# empty = in memory only), written in background batches, last ANALYTICS_HOT_WINDOW events kept in RAM
+_analytics_db = os.getenv("ANALYTICS_DB", "data/analytics.db")
+analytics_data = AnalyticsData(
+    db_path=os.path.join(os.path.dirname(os.path.realpath(__file__)), _analytics_db) if _analytics_db else None,
+    hot_window=int(os.getenv("ANALYTICS_HOT_WINDOW", "10000")),
+    batch_size=int(os.getenv("ANALYTICS_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1.0"))
+)
+# analytics writes are queued and applied by a background thread (ANALYTICS_ASYNC=0 writes inline);
+# on overflow ANALYTICS_OVERFLOW=drop_newest|drop_oldest|block decides, and drops are counted
+ANALYTICS_ASYNC = os.getenv("ANALYTICS_ASYNC", "1") != "0"
+analytics_ingest = AnalyticsIngestQueue(
+    analytics_data,
+    maxsize=int(os.getenv("ANALYTICS_QUEUE_SIZE", "10000")),
+    policy=os.getenv("ANALYTICS_OVERFLOW", "drop_newest")
+) if ANALYTICS_ASYNC else analytics_data
+# instantiate RAG generator (answer cache: RAG_CACHE_SIZE entries, on disk if RAG_CACHE_PATH is set)
 rag_generator = RAGGenerator()
-
-# load documents corpus into memory.
+# RAG runs off the request path: the results page renders at once and fetches the summary
+# from /rag/<job_id> (RAG_ASYNC=0 restores the blocking call)
+RAG_ASYNC = os.getenv("RAG_ASYNC", "1") != "0"
+rag_jobs = RAGJobQueue(
+    rag_generator,
+    workers=int(os.getenv("RAG_WORKERS", "4")),
+    timeout=float(os.getenv("RAG_TIMEOUT", "20")),
+    max_pending=int(os.getenv("RAG_MAX_PENDING", "32"))
+)
+
+# load documents corpus into memory (columnar store; full Documents are built on demand).
 full_path = os.path.realpath(__file__)
 path, filename = os.path.split(full_path)
 file_path = path + "/" + os.getenv("DATA_FILE_PATH")
-corpus = load_corpus(file_path)
+corpus = load_product_store(file_path)
+_corpus_mtime = os.stat(file_path).st_mtime_ns
+
+print("\nCorpus is loaded... \n First element:\n", corpus.document(0))
+
+
+def _reload_corpus():
+    """
+    Once a new index snapshot has loaded: reload the product store too if its
+    file changed. Returns the swap of the global corpus, run with the index swap.
+    """
+    mtime = os.stat(file_path).st_mtime_ns
+    if mtime == _corpus_mtime:
+        return None
+    store = load_product_store(file_path)
 
-print("\nCorpus is loaded... \n First element:\n", list(corpus.values())[0])
+    def swap():
+        global corpus, _corpus_mtime
+        corpus, _corpus_mtime = store, mtime
+    return swap
+
+# hot index reload (no restart): POST /admin/index/reload, or a poll of the snapshot file every
+# INDEX_WATCH_INTERVAL seconds (0 = off); in-flight searches finish on the old snapshot
+index_reloader = IndexReloader(interval=float(os.getenv("INDEX_WATCH_INTERVAL", "0")), on_load=_reload_corpus)
+# admin routes are disabled unless ADMIN_TOKEN is set (sent as the X-Admin-Token header)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 
 # Log every request automatically (Part 4 analytics)
 @app.before_request
 def log_request():
-    analytics_data.register_request(
+    # summary polling and metric scrapes are machine traffic
+    if request.path.startswith(("/rag/", "/metrics")):
+        return
+    analytics_ingest.register_request(
         path=request.path,
         method=request.method,
         user_agent=request.headers.get("User-Agent", ""),
@@ -91,7 +152,7 @@ def search_form_post():
     # If user had clicked before, compute dwell time
     if "last_click_time" in session and "last_clicked_pid" in session:
         dwell = time.time() - session["last_click_time"]
-        analytics_data.register_dwell(
+        analytics_ingest.register_dwell(
             pid=session["last_clicked_pid"],
             search_id=session.get("last_search_id", -1),
             dwell_seconds=dwell
@@ -106,7 +167,7 @@ def search_form_post():
 
     # generate search_id + automatically register query terms
     #search_id = analytics_data.save_query_terms(search_query)
-    search_id = analytics_data.save_query_terms(
+    search_id = analytics_ingest.save_query_terms(
         terms=search_query,
         ip=request.remote_addr,
         user_agent=request.headers.get("User-Agent", ""),
@@ -117,12 +178,17 @@ def search_form_post():
 
     session["last_search_id"] = search_id
 
-    # Search
-    results = search_engine.search(search_query, search_id, corpus)
+    # Search (brand / category / price / rating / stock filters come from the results page's facet form)
+    filters = FacetFilters.from_args(request.form)
+    results = search_engine.search(search_query, search_id, corpus, filters=filters, facets=True)
 
     # generate RAG response based on user query and retrieved results
-    rag_response = rag_generator.generate_response(search_query, results)
-    print("RAG response:", rag_response)
+    rag_response, rag_job = None, None
+    if RAG_ASYNC:
+        rag_job = rag_jobs.submit(search_query, results)
+    else:
+        rag_response = rag_generator.generate_response(search_query, results)
+        print("RAG response:", rag_response)
 
     found_count = len(results)
     session['last_found_count'] = found_count
@@ -134,10 +200,36 @@ def search_form_post():
         results_list=results,
         page_title="Results",
         found_counter=found_count,
-        rag_response=rag_response
+        rag_response=rag_response,
+        rag_job=rag_job,
+        search_query=search_query,
+        facets=results.facets,
+        filters=filters.to_dict(),
+        price_buckets=PRICE_BUCKETS
     )
 
 
+@app.route('/rag/<job_id>', methods=['GET'])
+def rag_status(job_id):
+    """
+    State and text so far of an asynchronous RAG summary (polled by the results page)
+    """
+    job = rag_jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job)
+
+
+@app.route('/rag/<job_id>/stream', methods=['GET'])
+def rag_stream(job_id):
+    """
+    The RAG summary as server-sent events, token chunks as they are generated
+    (needs a threaded server: the response stays open until the summary is done)
+    """
+    return Response(rag_jobs.events(job_id), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.route('/doc_details', methods=['GET'])
 def doc_details():
     """
@@ -155,7 +247,7 @@ def doc_details():
     doc_obj = corpus.get(pid)
 
     # Register click analytics + query + ranking
-    analytics_data.register_click(
+    analytics_ingest.register_click(
         pid=pid,
         search_id=int(search_id) if search_id else -1,
         rank=getattr(doc_obj, "ranking", None),
@@ -184,9 +276,10 @@ def stats():
     Show clicked docs ordered by number of clicks
     """
     docs = []
-    for pid in analytics_data.fact_clicks:
-        row: Document = corpus[pid]
-        count = analytics_data.fact_clicks[pid]
+    for pid, count in analytics_data.click_counts().items():
+        row = corpus.record(pid)
+        if row is None:
+            continue
         doc = StatsDocument(
             pid=row.pid,
             title=row.title,
@@ -209,6 +302,9 @@ def dashboard():
     funnel = analytics_data.funnel_metrics()
     paths = analytics_data.session_paths()
     intents = analytics_data.intent_clusters()
+    cache = search_engine.cache.stats()
+    rag_cache = rag_generator.cache.stats() if rag_generator.cache is not None else None
+    ingest = analytics_ingest.stats() if ANALYTICS_ASYNC else None
 
     return render_template(
         'dashboard.html',
@@ -216,11 +312,35 @@ def dashboard():
         stats=stats,
         funnel=funnel,
         paths=paths,
-        intents=intents
+        intents=intents,
+        cache=cache,
+        rag_cache=rag_cache,
+        ingest=ingest
     )
 
 
 
+def _require_admin():
+    if not ADMIN_TOKEN:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        abort(403)
+
+
+@app.route('/admin/index', methods=['GET'])
+def admin_index():
+    _require_admin()
+    return jsonify(index=search_engine.index_stats(), reloader=index_reloader.stats())
+
+
+@app.route('/admin/index/reload', methods=['POST'])
+def admin_index_reload():
+    """Load the snapshot file again in the background and swap it in."""
+    _require_admin()
+    queued = index_reloader.trigger()
+    return jsonify(queued=queued, reloader=index_reloader.stats()), 202
+
+
 # Altair plot for views per document (used in dashboard iframe)
 @app.route('/plot_number_of_views', methods=['GET'])
 def plot_number_of_views():
@@ -247,4 +367,6 @@ def plot_term_heatmap():
 
 
 if __name__ == "__main__":
-    app.run(port=8088, host="0.0.0.0", threaded=False, debug=os.getenv("DEBUG"))
+    # one thread per request (THREADED=0 serves one request at a time): the index is a read-only
+    # mmap shared by every thread, analytics / caches / RAG state are lock-protected
+    app.run(port=8088, host="0.0.0.0", threaded=os.getenv("THREADED", "1") != "0", debug=os.getenv("DEBUG"))